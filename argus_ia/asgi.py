@@ -0,0 +1,15 @@
+"""
+ASGI config for argus_ia project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+This is the production entry point (Procfile / Dockerfile run it under
+gunicorn with uvicorn workers); ``argus_ia.wsgi`` remains for local use.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'argus_ia.settings')
+
+application = get_asgi_application()
@@ -29,8 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'detection.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'detection.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,9 +64,13 @@ WSGI_APPLICATION = 'argus_ia.wsgi.application'
 # ================= DATABASE =====================
 if 'DATABASE_URL' in os.environ:
     import dj_database_url
+    # Produção roda em ASGI: o Django 4.2 executa o trabalho síncrono de cada requisição numa
+    # thread própria, e uma conexão persistente aberta nela nunca é fechada (esgota o PostgreSQL).
+    # Por isso o padrão é 0 (conexão por requisição); para reaproveitar conexões use um pooler
+    # (ex.: PgBouncer) ou DB_CONN_MAX_AGE > 0 só sob WSGI.
     DATABASES = {
         'default': dj_database_url.config(
-            conn_max_age=600,
+            conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', 0)),
             conn_health_checks=True,
             ssl_require=False 
         )
@@ -105,10 +110,84 @@ if DEBUG:
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 WHITENOISE_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Relatórios gerados (cache de exportações)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# ================= MODELOS / API =====================
+ARGUS_MODEL_DIR = os.environ.get('ARGUS_MODEL_DIR', os.path.join(BASE_DIR, 'models'))
+ARGUS_MODEL_VERSION = os.environ.get('ARGUS_MODEL_VERSION', 'default')
+# Classificador do detector: random_forest, logistic_regression ou hist_gradient_boosting
+# (compare com `manage.py compare_classifiers`)
+ARGUS_CLASSIFIER_BACKEND = os.environ.get('ARGUS_CLASSIFIER_BACKEND', 'random_forest')
+# Token opcional exigido pela API (header "Authorization: Bearer <token>")
+ARGUS_API_TOKEN = os.environ.get('ARGUS_API_TOKEN', '')
+ARGUS_API_MAX_CHUNK_SIZE = int(os.environ.get('ARGUS_API_MAX_CHUNK_SIZE', 5000))
+# Threads para o trabalho de CPU (parsing, treino, predição) das views assíncronas
+ARGUS_CPU_WORKERS = int(os.environ.get('ARGUS_CPU_WORKERS', 2))
+# Threads por análise para as etapas independentes (agregações e gravações de cada tabela)
+ARGUS_PIPELINE_WORKERS = int(os.environ.get('ARGUS_PIPELINE_WORKERS', 4))
+# Controle de admissão das análises (um orçamento para todos os workers, via banco): memória
+# (0 desliga), tamanho dos blocos do modo em blocos, análises na fila e espera máxima na fila (s)
+ARGUS_ANALYSIS_MEMORY_BUDGET_MB = int(os.environ.get('ARGUS_ANALYSIS_MEMORY_BUDGET_MB', 1024))
+ARGUS_ANALYSIS_CHUNK_SIZE = int(os.environ.get('ARGUS_ANALYSIS_CHUNK_SIZE', 50000))
+ARGUS_ADMISSION_MAX_QUEUE = int(os.environ.get('ARGUS_ADMISSION_MAX_QUEUE', 10))
+ARGUS_ADMISSION_QUEUE_TIMEOUT = int(os.environ.get('ARGUS_ADMISSION_QUEUE_TIMEOUT', 120))
+# Idade (dias) a partir da qual compact_analyses arquiva os detalhes de uma análise
+ARGUS_ARCHIVE_AFTER_DAYS = int(os.environ.get('ARGUS_ARCHIVE_AFTER_DAYS', 90))
+
+
+# ================= LOGS / MÉTRICAS =====================
+ARGUS_LOG_LEVEL = os.environ.get('ARGUS_LOG_LEVEL', 'INFO')
+ARGUS_METRICS_ALLOWED_IPS = [
+    ip.strip()
+    for ip in os.environ.get('ARGUS_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {'()': 'detection.utils.metrics.StructuredFormatter'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'structured'},
+    },
+    'loggers': {
+        'detection': {'handlers': ['console'], 'level': ARGUS_LOG_LEVEL, 'propagate': False},
+    },
+}
+
+
+# ================= CACHE =====================
+# Local-memory por padrão (um cache por processo); ARGUS_CACHE_DIR ativa o backend em arquivo,
+# compartilhado entre workers. As chaves dos resultados levam a revisão da análise, então uma
+# mudança feita por um processo nunca deixa outro servindo a versão antiga.
+ARGUS_CACHE_MAX_ENTRIES = int(os.environ.get('ARGUS_CACHE_MAX_ENTRIES', 1000))
+ARGUS_RESULTS_CACHE_TIMEOUT = int(os.environ.get('ARGUS_RESULTS_CACHE_TIMEOUT', 60 * 60 * 24))
+
+if os.environ.get('ARGUS_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['ARGUS_CACHE_DIR'],
+            'OPTIONS': {'MAX_ENTRIES': ARGUS_CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': 4},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'argus-ia',
+            'OPTIONS': {'MAX_ENTRIES': ARGUS_CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': 4},
+        }
+    }
+
+
 # ================= SESSION =====================
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 3600
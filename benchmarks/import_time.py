@@ -0,0 +1,103 @@
+"""
+Relatório de tempo de importação do ARGUS IA.
+
+Uso:
+    python benchmarks/import_time.py [--top 20]
+
+Mede (com `python -X importtime`) o custo de `django.setup()` + URLconf, que é
+o que todo worker do gunicorn e todo `manage.py` pagam, e verifica que o
+dashboard e a lista de análises são servidos sem carregar as bibliotecas de
+ML/dataframes. Sai com código 1 se alguma delas for importada.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ['pandas', 'numpy', 'sklearn', 'scipy', 'joblib', 'openpyxl', 'pyarrow']
+
+BOOT_CODE = """
+import django
+django.setup()
+import argus_ia.urls
+"""
+
+PAGES_CODE = """
+import json, sys
+import django
+django.setup()
+from django.core.management import call_command
+from django.test import Client
+call_command('migrate', verbosity=0)
+client = Client()
+status = {{path: client.get(path).status_code for path in ('/', '/analyses/')}}
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{'status': status, 'loaded': loaded}}))
+"""
+
+
+def _environment(workdir):
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = 'argus_ia.settings'
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'import.sqlite3')}"
+    env['PYTHONPATH'] = str(BASE_DIR)
+    env['ALLOWED_HOSTS'] = 'testserver'
+    env['ARGUS_LOG_LEVEL'] = 'WARNING'
+    return env
+
+
+def parse_importtime(stderr):
+    """Converte a saída do -X importtime em [(módulo, self_us, cumulativo_us)]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # O nome vem indentado conforme a profundidade; nível zero = sem indentação
+        modules.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Relatório de tempo de importação')
+    parser.add_argument('--top', type=int, default=20, help='Módulos mais caros a listar')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='argus-import-') as workdir:
+        env = _environment(workdir)
+        boot = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_CODE],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        pages = subprocess.run(
+            [sys.executable, '-c', PAGES_CODE.format(heavy=HEAVY_MODULES)],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+
+    modules = parse_importtime(boot.stderr)
+    top_level = [m for m in modules if not m[0].startswith(' ')]
+    total_ms = sum(cumulative for _, _, cumulative in top_level) / 1000
+
+    print(f"Importação no boot (django.setup + URLconf): {total_ms:.1f} ms, {len(modules)} módulos")
+    print(f"\n{'cumulativo (ms)':>16}  módulo")
+    for name, _, cumulative in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:>16.1f}  {name.strip()}")
+
+    boot_heavy = sorted({
+        name.strip().split('.')[0] for name, _, _ in modules
+        if name.strip().split('.')[0] in HEAVY_MODULES
+    })
+    result = json.loads(pages.stdout.strip().splitlines()[-1])
+
+    print(f"\nPesados no boot: {', '.join(boot_heavy) or 'nenhum'}")
+    print(f"Pesados após dashboard/lista {result['status']}: {', '.join(result['loaded']) or 'nenhum'}")
+    return 1 if boot_heavy or result['loaded'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+Teste de carga local dos fluxos web do ARGUS IA.
+
+Uso:
+    python benchmarks/load_test.py --concurrency 1 2 4 --iterations 2 --label asgi-2w
+    python benchmarks/load_test.py --server wsgi --label wsgi-2w
+    python benchmarks/load_test.py --label asgi-4w \\
+        --server "gunicorn argus_ia.asgi:application -k uvicorn.workers.UvicornWorker --workers 4 --timeout 600"
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --label local
+    python benchmarks/load_test.py --compare benchmarks/load_reports/wsgi-2w.json benchmarks/load_reports/asgi-2w.json
+
+Sem --url, sobe o servidor (--server; o harness acrescenta o --bind) num
+SQLite temporário já migrado. Com DATABASE_URL apontando para um PostgreSQL
+local, usa e migra esse banco. Cada usuário virtual tem sessão própria e
+percorre página → generate → upload → analyze → results → export, enviando um
+dataset sintético semeado do DataGenerator (um por usuário). A concorrência
+sobe em degraus (--concurrency); em cada degrau são medidos a vazão e a
+latência p50/p95/p99 por endpoint. O relatório JSON vai para
+benchmarks/load_reports/ (ou --output), para comparar configurações do
+gunicorn e mudanças de código com --compare.
+"""
+
+import argparse
+import atexit
+import http.client
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.cookies import SimpleCookie
+from pathlib import Path
+from urllib.parse import urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REPORTS_DIR = BASE_DIR / 'benchmarks' / 'load_reports'
+# Comandos prontos para --server; o padrão é o mesmo modo da produção (Procfile / Dockerfile)
+SERVER_PRESETS = {
+    'asgi': 'gunicorn argus_ia.asgi:application -k uvicorn.workers.UvicornWorker --workers 2 --timeout 600',
+    'wsgi': 'gunicorn argus_ia.wsgi:application --workers 2 --timeout 600',
+}
+DEFAULT_SERVER = 'asgi'
+ENDPOINTS = ['page', 'generate', 'upload', 'analyze', 'results', 'export']
+PERCENTILES = (50, 95, 99)
+
+# hash() dos usernames entra nos dados gerados: fixa a semente antes de tudo
+if os.environ.get('PYTHONHASHSEED') != '0':
+    os.environ['PYTHONHASHSEED'] = '0'
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def percentile(sorted_values, p):
+    """Percentil com interpolação linear (valores já ordenados)"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def build_datasets(count, posts, comments, suspicious_ratio, seed):
+    """CSVs (posts, comments) semeados do DataGenerator, um por usuário virtual"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'argus_ia.settings')
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    import logging
+    django.setup()
+    logging.getLogger('detection').setLevel(logging.WARNING)
+
+    import numpy as np
+    from detection.ml.data_generator import DataGenerator
+
+    datasets = []
+    for user in range(count):
+        random.seed(seed + user)
+        np.random.seed(seed + user)
+        posts_df, comments_df, _ = DataGenerator.generate_dataset(posts, comments, suspicious_ratio)
+        datasets.append((posts_df.to_csv(index=False).encode(), comments_df.to_csv(index=False).encode()))
+    return datasets
+
+
+def _multipart(files):
+    boundary = uuid.uuid4().hex
+    body = b''
+    for field, (filename, content) in files.items():
+        body += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n'
+        ).encode() + content + b'\r\n'
+    return body + f'--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+
+class VirtualUser:
+    """Cliente HTTP com sessão própria.
+
+    Os cookies são guardados à mão: fora do DEBUG eles são Secure e o
+    http.cookiejar não os enviaria de volta por HTTP.
+    """
+
+    def __init__(self, base_url, timeout, record):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+        self.cookies = {}
+        self.record = record
+
+    def request(self, endpoint, method, path, body=None, content_type=None):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+            headers['Content-Type'] = content_type or 'application/json'
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.connection.close()
+            self.record(endpoint, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+            return None
+        elapsed = time.perf_counter() - start
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        error = None if 200 <= response.status < 300 else f'HTTP {response.status}'
+        data = payload
+        if response.headers.get_content_type() == 'application/json':
+            data = json.loads(payload)
+            if data.get('success', True) is False or 'error' in data:
+                error = f"HTTP {response.status}: {data.get('error')}"
+        self.record(endpoint, elapsed, error)
+        return None if error else data
+
+    def run_flow(self, dataset, generate_options):
+        """Um fluxo completo; para no primeiro passo que falhar"""
+        if self.request('page', 'GET', '/analyze/') is None:
+            return False
+        if self.request('generate', 'POST', '/generate-download/', json.dumps(generate_options)) is None:
+            return False
+        body, content_type = _multipart({'posts_file': ('posts.csv', dataset[0]), 'comments_file': ('comments.csv', dataset[1])})
+        if self.request('upload', 'POST', '/upload-dataset/', body, content_type) is None:
+            return False
+        result = self.request('analyze', 'POST', '/analyze-dataset/', '{}')
+        if result is None:
+            return False
+        analysis_id = result['analysis']['id']
+        if self.request('results', 'GET', f'/results/{analysis_id}/') is None:
+            return False
+        return self.request('export', 'GET', f'/export/{analysis_id}/?format=csv') is not None
+
+
+def run_step(base_url, concurrency, iterations, datasets, generate_options, timeout):
+    samples = []
+    lock = threading.Lock()
+    flows = {'ok': 0, 'failed': 0}
+
+    def record(endpoint, elapsed, error):
+        with lock:
+            samples.append((endpoint, elapsed, error))
+
+    def user_loop(index):
+        user = VirtualUser(base_url, timeout, record)
+        for _ in range(iterations):
+            ok = user.run_flow(datasets[index % len(datasets)], generate_options)
+            with lock:
+                flows['ok' if ok else 'failed'] += 1
+        user.connection.close()
+
+    threads = [threading.Thread(target=user_loop, args=(index,)) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        latencies = sorted(elapsed for name, elapsed, error in samples if name == endpoint and not error)
+        errors = [error for name, _, error in samples if name == endpoint and error]
+        if not latencies and not errors:
+            continue
+        stats = {
+            'requests': len(latencies) + len(errors),
+            'errors': len(errors),
+            'throughput_per_s': round(len(latencies) / wall_time, 3),
+            'mean_s': round(sum(latencies) / len(latencies), 4) if latencies else None,
+            'max_s': round(latencies[-1], 4) if latencies else None,
+        }
+        for p in PERCENTILES:
+            value = percentile(latencies, p)
+            stats[f'p{p}_s'] = round(value, 4) if value is not None else None
+        if errors:
+            stats['error_samples'] = sorted(set(errors))[:5]
+        endpoints[endpoint] = stats
+
+    return {
+        'concurrency': concurrency,
+        'wall_time_s': round(wall_time, 3),
+        'flows': flows['ok'],
+        'failed_flows': flows['failed'],
+        'flows_per_s': round(flows['ok'] / wall_time, 3),
+        'requests_per_s': round(sum(1 for _, _, error in samples if not error) / wall_time, 3),
+        'endpoints': endpoints,
+    }
+
+
+def print_step(step):
+    print(f"\nconcorrência {step['concurrency']}: {step['flows']} fluxos ({step['failed_flows']} com falha) "
+          f"em {step['wall_time_s']:.1f}s, {step['flows_per_s']:.2f} fluxos/s, {step['requests_per_s']:.2f} req/s")
+    print(f"  {'endpoint':<10}{'req':>6}{'erros':>7}{'req/s':>9}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}")
+    for endpoint, stats in step['endpoints'].items():
+        p50, p95, p99 = (f"{stats[f'p{p}_s']:.3f}" if stats[f'p{p}_s'] is not None else '-' for p in PERCENTILES)
+        print(f"  {endpoint:<10}{stats['requests']:>6}{stats['errors']:>7}{stats['throughput_per_s']:>9.2f}"
+              f"{p50:>10}{p95:>10}{p99:>10}")
+        for error in stats.get('error_samples', []):
+            print(f'    ! {error}')
+
+
+def compare(before_path, after_path):
+    """Lado a lado por degrau e endpoint: req/s e p50/p95/p99, com a variação relativa"""
+    before, after = (json.loads(Path(path).read_text()) for path in (before_path, after_path))
+    print(f"{before.get('label')} ({before.get('server')}) → {after.get('label')} ({after.get('server')})")
+    before_steps = {step['concurrency']: step for step in before['steps']}
+    for step in after['steps']:
+        base = before_steps.get(step['concurrency'])
+        if base is None:
+            continue
+        print(f"\nconcorrência {step['concurrency']}: fluxos/s {base['flows_per_s']:.2f} → {step['flows_per_s']:.2f}")
+        for endpoint, stats in step['endpoints'].items():
+            base_stats = base['endpoints'].get(endpoint)
+            if base_stats is None:
+                continue
+            cells = []
+            for metric in ['throughput_per_s'] + [f'p{p}_s' for p in PERCENTILES]:
+                old, new = base_stats.get(metric), stats.get(metric)
+                change = f' ({(new - old) / old * 100:+.0f}%)' if old and new is not None else ''
+                cells.append(f"{metric.replace('_s', '').replace('throughput_per', 'req/s')} {old} → {new}{change}")
+            if base_stats['errors'] or stats['errors']:
+                cells.append(f"erros {base_stats['errors']} → {stats['errors']}")
+            print(f"  {endpoint:<10}" + '  '.join(cells))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def start_server(command, workdir):
+    """Migra o banco e sobe o servidor; devolve (url, processo, log)"""
+    env = dict(os.environ, ARGUS_LOG_LEVEL=os.environ.get('ARGUS_LOG_LEVEL', 'WARNING'))
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'load.sqlite3')}")
+    env.setdefault('MEDIA_ROOT', os.path.join(workdir, 'media'))
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=BASE_DIR, env=env, check=True)
+
+    port = _free_port()
+    log_path = os.path.join(workdir, 'server.log')
+    log = open(log_path, 'wb')
+    process = subprocess.Popen(
+        shlex.split(command) + ['--bind', f'127.0.0.1:{port}'], cwd=BASE_DIR, env=env, stdout=log, stderr=log
+    )
+    atexit.register(_stop_server, process)
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                return url, process, env['DATABASE_URL']
+        except OSError:
+            time.sleep(0.5)
+    sys.exit(f'O servidor não respondeu; log em {log_path}:\n' + Path(log_path).read_text()[-2000:])
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga local dos fluxos web do ARGUS IA')
+    parser.add_argument('--url', help='Servidor já rodando (senão o harness sobe --server)')
+    parser.add_argument('--server', default=DEFAULT_SERVER,
+                        help="'asgi' (padrão, como em produção), 'wsgi' ou o comando do servidor, sem --bind")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4], help='Usuários por degrau')
+    parser.add_argument('--iterations', type=int, default=2, help='Fluxos por usuário em cada degrau')
+    parser.add_argument('--posts', type=int, default=100, help='Posts do dataset de cada usuário')
+    parser.add_argument('--comments', type=int, default=5000, help='Comentários do dataset de cada usuário')
+    parser.add_argument('--suspicious-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=600, help='Timeout de cada requisição (s)')
+    parser.add_argument('--label', help='Nome do relatório (padrão: data e hora)')
+    parser.add_argument('--output', help='Arquivo JSON do relatório (padrão: benchmarks/load_reports/<label>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'DEPOIS'), help='Compara dois relatórios e sai')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    print(f'Gerando {max(args.concurrency)} dataset(s) semeado(s)...')
+    datasets = build_datasets(max(args.concurrency), args.posts, args.comments, args.suspicious_ratio, args.seed)
+    generate_options = {
+        'posts_count': args.posts, 'comments_count': args.comments, 'suspicious_ratio': args.suspicious_ratio
+    }
+
+    if args.url:
+        url, server, database_url = args.url.rstrip('/'), args.url, os.environ.get('DATABASE_URL')
+    else:
+        workdir = tempfile.mkdtemp(prefix='argus-load-')
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+        server = SERVER_PRESETS.get(args.server, args.server)
+        url, _, database_url = start_server(server, workdir)
+    print(f'Servidor: {server} ({url})')
+
+    steps = []
+    for concurrency in args.concurrency:
+        step = run_step(url, concurrency, args.iterations, datasets, generate_options, args.timeout)
+        print_step(step)
+        steps.append(step)
+
+    label = args.label or datetime.now().strftime('%Y%m%d-%H%M%S')
+    report = {
+        'label': label,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'server': server,
+        'database': urlsplit(database_url).scheme if database_url else None,
+        'cpu_count': os.cpu_count(),
+        'dataset': {**generate_options, 'seed': args.seed},
+        'iterations': args.iterations,
+        'steps': steps,
+    }
+    output = Path(args.output) if args.output else REPORTS_DIR / f'{label}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f'\nRelatório salvo em {output}')
+    return 1 if any(step['failed_flows'] for step in steps) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Benchmark das etapas do ARGUS IA: gerador, detector, agregação, grafo, séries temporais, persistência e exportadores,
+mais o fluxo completo pelas views (upload e AnalyzeDatasetView).
+
+Uso:
+    python benchmarks/run.py
+    python benchmarks/run.py --sizes 10000 100000 1000000
+    python benchmarks/run.py --sizes 10000 --save-baseline
+    python benchmarks/run.py --sizes 10000 --threshold 0.25
+
+Roda localmente em um SQLite temporário, sem rede. Os dados são sintéticos e
+semeados (--seed). Para cada etapa registra tempo de parede, vazão
+(comentários/s) e pico de memória (tracemalloc, em todas as threads), e
+compara com o baseline salvo (benchmarks/baseline.json): sai com código 1 se
+alguma etapa piorar além do limite. Cada medição guarda o perfil da máquina;
+etapas sem medição no baseline, ou medidas em outra máquina, são listadas
+como não comparadas.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = BASE_DIR / 'benchmarks' / 'baseline.json'
+# Etapas de poucos milissegundos oscilam mais que o limite relativo: abaixo disso não é regressão
+MIN_WALL_TIME_DELTA_S = 0.05
+
+# hash() dos usernames entra nos dados gerados: fixa a semente antes de tudo
+if os.environ.get('PYTHONHASHSEED') != '0':
+    os.environ['PYTHONHASHSEED'] = '0'
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+_workdir = tempfile.mkdtemp(prefix='argus-bench-')
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'bench.sqlite3')}"
+os.environ['MEDIA_ROOT'] = os.path.join(_workdir, 'media')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'argus_ia.settings')
+sys.path.insert(0, str(BASE_DIR))
+
+import django  # noqa: E402
+import logging  # noqa: E402
+
+django.setup()
+# Os logs estruturados por etapa iriam para o stderr a cada medição
+logging.getLogger('detection').setLevel(logging.WARNING)
+
+import numpy as np  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.test import Client  # noqa: E402
+
+from detection.ml.data_generator import DataGenerator  # noqa: E402
+from detection.ml.detector import SuspiciousPatternDetector  # noqa: E402
+from detection.ml.graph import find_coordinated_clusters  # noqa: E402
+from detection.ml.timeseries import build_time_series  # noqa: E402
+from detection.models import Dataset, AnalysisSession  # noqa: E402
+from detection.services import build_labels, persist_analysis_results  # noqa: E402
+from detection.utils.exporters import build_excel_report, export_to_columnar, export_to_csv  # noqa: E402
+
+
+def machine_profile():
+    """CPUs, memória, arquitetura e Python da máquina: tempos só se comparam no mesmo perfil"""
+    try:
+        memory_gb = round(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3, 1)
+    except (AttributeError, ValueError, OSError):
+        memory_gb = None
+    return {
+        'cpus': os.cpu_count(),
+        'memory_gb': memory_gb,
+        'arch': platform.machine(),
+        'python': platform.python_version(),
+    }
+
+
+MACHINE = machine_profile()
+
+
+def measure(name, size, func, results):
+    """Executa uma etapa e registra tempo, vazão e pico de memória"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = func()
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results.append({
+        'stage': name,
+        'size': size,
+        'machine': MACHINE,
+        'wall_time_s': round(wall_time, 4),
+        'throughput_per_s': round(size / wall_time, 1) if wall_time > 0 else None,
+        'peak_memory_mb': round(peak / (1024 * 1024), 2),
+    })
+    print(f"  {name:<20} {wall_time:>9.3f}s {size / wall_time:>12.0f}/s {peak / (1024 * 1024):>9.1f} MB")
+    return value
+
+
+def _consume(response):
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def _post_json(client, path, **data):
+    response = client.post(path, data, secure=True)
+    payload = response.json()
+    if not payload.get('success'):
+        raise RuntimeError(f"{path}: HTTP {response.status_code} {payload.get('error')}")
+    return payload
+
+
+def run_views(size, posts_df, comments_df, results):
+    """Fluxo de ponta a ponta pelas views: upload dos CSVs e AnalyzeDatasetView (admissão, executor, gravação)"""
+    client = Client(SERVER_NAME='localhost')
+    posts_csv = posts_df.to_csv(index=False).encode('utf-8')
+    comments_csv = comments_df.to_csv(index=False).encode('utf-8')
+    measure('view_upload', size, lambda: _post_json(
+        client, '/upload-dataset/',
+        posts_file=SimpleUploadedFile('posts.csv', posts_csv, 'text/csv'),
+        comments_file=SimpleUploadedFile('comments.csv', comments_csv, 'text/csv'),
+    ), results)
+    measure('view_analyze', size, lambda: _post_json(client, '/analyze-dataset/'), results)
+
+
+def run_size(size, seed, results):
+    random.seed(seed)
+    np.random.seed(seed)
+    print(f"\n{size} comentários")
+
+    posts_df, comments_df, _ = measure(
+        'generator', size,
+        lambda: DataGenerator.generate_dataset(max(100, size // 50), size, 0.05),
+        results
+    )
+
+    detector = SuspiciousPatternDetector()
+    labels = build_labels(comments_df)
+    measure('detector_train', size, lambda: detector.train(comments_df, labels), results)
+    predictions, probabilities, detected_patterns = measure(
+        'detector_predict', size, lambda: detector.predict(comments_df), results
+    )
+
+    user_behaviors_data, post_analyses_data = measure('aggregation', size, lambda: (
+        detector.analyze_user_behavior(comments_df, predictions, detected_patterns),
+        detector.analyze_posts_targeted(posts_df, comments_df, predictions),
+    ), results)
+
+    clusters_data = measure(
+        'graph_clusters', size, lambda: find_coordinated_clusters(comments_df, predictions), results
+    )
+    time_series_data = measure(
+        'time_series', size, lambda: build_time_series(comments_df, predictions), results
+    )
+
+    dataset = Dataset.objects.create(
+        name=f'Benchmark_{size}', posts_count=len(posts_df), comments_count=len(comments_df)
+    )
+    session = AnalysisSession.objects.create(dataset=dataset, total_comments=size, status='RUNNING')
+    measure('persistence', size, lambda: persist_analysis_results(
+        session, comments_df, predictions, probabilities, detected_patterns,
+        user_behaviors_data, post_analyses_data, posts_df, clusters_data, time_series_data
+    ), results)
+
+    measure('export_csv', size, lambda: _consume(
+        export_to_csv(session.suspicious_comments.all(), session)
+    ), results)
+    measure('export_excel', size, lambda: len(build_excel_report(session).getvalue()), results)
+    measure('export_parquet', size, lambda: _consume(export_to_columnar(session)), results)
+
+    run_views(size, posts_df, comments_df, results)
+
+
+def compare(results, baseline, threshold):
+    """Etapas cujo tempo ou memória ultrapassaram o baseline em mais de `threshold`,
+    e as que ficaram sem comparação (sem baseline ou medidas em outra máquina)"""
+    reference = {(r['stage'], r['size']): r for r in baseline.get('results', [])}
+    regressions, unchecked = [], []
+    for result in results:
+        base = reference.get((result['stage'], result['size']))
+        if base is None:
+            unchecked.append(f"{result['stage']}@{result['size']}: sem baseline")
+            continue
+        if base.get('machine') != result['machine']:
+            unchecked.append(f"{result['stage']}@{result['size']}: baseline de outra máquina {base.get('machine')}")
+            continue
+        for metric in ('wall_time_s', 'peak_memory_mb'):
+            if metric == 'wall_time_s' and result[metric] - base[metric] < MIN_WALL_TIME_DELTA_S:
+                continue
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{result['stage']}@{result['size']}: {metric} {base[metric]} -> {result[metric]}"
+                )
+    return regressions, unchecked
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das etapas do ARGUS IA')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='Tamanhos medidos (o padrão é o que o baseline versionado cobre)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    parser.add_argument('--threshold', type=float, default=0.2, help='Piora tolerada (0.2 = 20%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='Grava os resultados como novo baseline')
+    parser.add_argument('--output', help='Arquivo JSON para os resultados desta execução')
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+
+    results = []
+    for size in args.sizes:
+        run_size(size, args.seed, results)
+
+    report = {'seed': args.seed, 'sizes': args.sizes, 'results': results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline salvo em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nSem baseline para comparar (use --save-baseline)")
+        return 0
+
+    regressions, unchecked = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+    if unchecked:
+        print(f"\nNão comparadas ({len(unchecked)}):")
+        for entry in unchecked:
+            print(f"  {entry}")
+    if regressions:
+        print(f"\nRegressões acima de {args.threshold * 100:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nSem regressões em relação ao baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
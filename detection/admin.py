@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Dataset, AnalysisSession, SuspiciousComment, UserBehavior, PostAnalysis
+from .models import Dataset, AnalysisSession, SuspiciousComment, UserBehavior, PostAnalysis, AnalysisArchive
+from .utils.search import matching_texts
 
 @admin.register(Dataset)
 class DatasetAdmin(admin.ModelAdmin):
@@ -9,15 +10,29 @@ class DatasetAdmin(admin.ModelAdmin):
 
 @admin.register(AnalysisSession)
 class AnalysisSessionAdmin(admin.ModelAdmin):
-    list_display = ['dataset', 'created_at', 'total_comments', 'suspicious_count', 'accuracy', 'status']
-    list_filter = ['status', 'created_at']
+    list_display = ['dataset', 'created_at', 'total_comments', 'suspicious_count', 'accuracy', 'status', 'archived_at']
+    list_filter = ['status', 'created_at', 'archived_at']
     readonly_fields = ['created_at']
 
 @admin.register(SuspiciousComment)
 class SuspiciousCommentAdmin(admin.ModelAdmin):
     list_display = ['username', 'comment_text', 'probability', 'session']
     list_filter = ['session']
-    search_fields = ['username', 'comment_text']
+    list_select_related = ['text', 'session']
+    search_fields = ['username']
+    search_help_text = 'Usuário exato ou palavras do comentário (busca indexada); "user:conta" busca só o usuário'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Texto pelo índice de busca em vez de LIKE '%...%' em todas as análises. Um OR com
+        # username impediria o uso do índice de text: cada lado usa o seu índice e os ids se juntam num UNION.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.startswith('user:'):
+            return queryset.filter(username=search_term[len('user:'):].strip()), False
+        by_username = SuspiciousComment.objects.filter(username=search_term).order_by().values('pk')
+        by_text = SuspiciousComment.objects.filter(text__in=matching_texts(search_term)).order_by().values('pk')
+        return queryset.filter(pk__in=by_username.union(by_text)), False
 
 @admin.register(UserBehavior)
 class UserBehaviorAdmin(admin.ModelAdmin):
@@ -29,4 +44,9 @@ class UserBehaviorAdmin(admin.ModelAdmin):
 class PostAnalysisAdmin(admin.ModelAdmin):
     list_display = ['post_id', 'username', 'suspicious_comments_count', 'total_comments', 'suspicion_ratio']
     list_filter = ['analysis_session']
-    search_fields = ['username', 'caption']
\ No newline at end of file
+    search_fields = ['username', 'caption']
+
+@admin.register(AnalysisArchive)
+class AnalysisArchiveAdmin(admin.ModelAdmin):
+    list_display = ['analysis_session', 'created_at', 'raw_bytes', 'row_counts']
+    readonly_fields = ['analysis_session', 'created_at', 'raw_bytes', 'row_counts']
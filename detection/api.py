@@ -0,0 +1,159 @@
+import hmac
+import json
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from .models import UserRiskIndex
+from .utils.streaming import serve_streaming
+
+API_VERSION = 'v1'
+DEFAULT_CHUNK_SIZE = 500
+MAX_LINE_BYTES = 64 * 1024
+
+
+def _authorized(request):
+    token = settings.ARGUS_API_TOKEN
+    if not token:
+        return True
+    # Comparação em tempo constante: não vaza o prefixo correto do token
+    return hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode())
+
+
+def _read_lines(stream):
+    """Linhas do corpo lidas com limite: uma linha grande demais vira None sem ser lida inteira na memória"""
+    while True:
+        line = stream.readline(MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_LINE_BYTES:
+            # Descarta o resto da linha em pedaços de no máximo MAX_LINE_BYTES + 1
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(MAX_LINE_BYTES + 1)
+            yield None
+        else:
+            yield line
+
+
+def _read_chunks(stream, chunk_size):
+    """Lê o corpo NDJSON linha a linha, entregando blocos de até chunk_size registros"""
+    chunk = []
+    for line_number, raw_line in enumerate(_read_lines(stream), start=1):
+        if raw_line is None:
+            chunk.append((line_number, None, 'Linha excede o tamanho máximo'))
+        elif raw_line.strip():
+            try:
+                record = json.loads(raw_line)
+                if not isinstance(record, dict) or 'comment_text' not in record:
+                    raise ValueError("campo 'comment_text' ausente")
+            except ValueError as e:
+                chunk.append((line_number, None, f'JSON inválido: {e}'))
+            else:
+                # Validado antes de pontuar: um erro no meio do streaming cortaria a resposta
+                if record['comment_text'] is not None and not isinstance(record['comment_text'], str):
+                    chunk.append((line_number, None, "'comment_text' deve ser texto ou null"))
+                else:
+                    chunk.append((line_number, record, None))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _score_chunks(detector, chunks):
+    """Pontua cada bloco pelo caminho de predição do detector e devolve NDJSON"""
+    import pandas as pd
+
+    for chunk in chunks:
+        valid = [(line_number, record) for line_number, record, error in chunk if error is None]
+        scores = {}
+        if valid:
+            comments_df = pd.DataFrame([record for _, record in valid])
+            predictions, probabilities, detected_patterns = detector.predict(comments_df)
+            for i, (line_number, record) in enumerate(valid):
+                scores[line_number] = {
+                    'comment_id': record.get('comment_id'),
+                    'is_suspicious': bool(predictions[i] == 1),
+                    'probability': float(probabilities[i]),
+                    'detected_patterns': detected_patterns[i],
+                }
+
+        lines = []
+        for line_number, _, error in chunk:
+            result = scores.get(line_number) or {'line': line_number, 'error': error}
+            lines.append(json.dumps(result, ensure_ascii=False))
+        # O próximo bloco só é lido depois que este foi consumido pelo servidor (backpressure)
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ScoreCommentsView(View):
+    """API v1: recebe comentários em NDJSON e devolve as pontuações em NDJSON, por blocos
+
+    Cada linha de entrada precisa de 'comment_text' (e opcionalmente 'comment_id');
+    linhas inválidas geram uma linha de erro sem interromper o lote.
+    """
+    def post(self, request):
+        if not _authorized(request):
+            return JsonResponse({'error': 'Não autorizado'}, status=401)
+
+        try:
+            chunk_size = int(request.GET.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        except ValueError:
+            return JsonResponse({'error': 'chunk_size inválido'}, status=400)
+        chunk_size = max(1, min(chunk_size, settings.ARGUS_API_MAX_CHUNK_SIZE))
+
+        from .ml.model_trainer import ModelNotReady, get_scoring_detector
+
+        try:
+            # Não treina durante a requisição: o modelo padrão é treinado no deploy (train_scoring_model)
+            detector = get_scoring_detector(request.GET.get('model'), train_missing=False)
+        except FileNotFoundError as e:
+            return JsonResponse({'error': str(e)}, status=404)
+        except ModelNotReady as e:
+            response = JsonResponse({'error': str(e)}, status=503)
+            response['Retry-After'] = '60'
+            return response
+
+        # Itera o corpo da requisição sem carregá-lo inteiro (não usa request.body)
+        response = StreamingHttpResponse(
+            _score_chunks(detector, _read_chunks(request, chunk_size)),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        response['X-Argus-API-Version'] = API_VERSION
+        return serve_streaming(request, response)
+
+
+def user_risk_payload(entry):
+    return {
+        'username': entry.username,
+        'user_id': entry.user_id,
+        'suspicious_comments_count': entry.suspicious_comments_count,
+        'total_comments': entry.total_comments,
+        'suspicion_score': entry.suspicion_score(),
+        'analyses_count': entry.analyses_count,
+        'detected_patterns': entry.detected_patterns(),
+        'pattern_mask': entry.pattern_mask,
+        'first_seen': entry.first_seen.isoformat(),
+        'last_seen': entry.last_seen.isoformat(),
+        'last_analysis_id': str(entry.last_analysis_id) if entry.last_analysis_id else None,
+    }
+
+
+class UserRiskView(View):
+    """API v1: risco acumulado de um username entre todas as análises (busca pela chave única)"""
+    async def get(self, request, username):
+        if not _authorized(request):
+            return JsonResponse({'error': 'Não autorizado'}, status=401)
+
+        try:
+            entry = await UserRiskIndex.objects.aget(username=username)
+        except UserRiskIndex.DoesNotExist:
+            return JsonResponse({'error': 'Usuário não encontrado no índice'}, status=404)
+
+        response = JsonResponse(user_risk_payload(entry))
+        response['X-Argus-API-Version'] = API_VERSION
+        return response
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class DetectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'detection'
-    verbose_name = 'Detection System'
\ No newline at end of file
+    verbose_name = 'Detection System'
+
+    def ready(self):
+        from . import signals  # noqa: F401
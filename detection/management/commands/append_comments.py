@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.ml.model_trainer import get_scoring_detector
+from detection.ml.schema import COMMENT_SCHEMA, POST_SCHEMA
+from detection.models import AnalysisSession
+from detection.services import append_comments
+
+from .batch_analyze import load_frame
+
+
+class Command(BaseCommand):
+    help = 'Acrescenta comentários novos a uma análise concluída, pontuando apenas o delta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('analysis_id', help='ID da análise (AnalysisSession)')
+        parser.add_argument('comments', help='Comentários novos (CSV, JSON, NDJSON ou Parquet)')
+        parser.add_argument('--posts', default=None, help='Posts novos referenciados pelos comentários')
+        parser.add_argument('--model-version', default=None, help='Versão do modelo em ARGUS_MODEL_DIR')
+
+    def handle(self, *args, **options):
+        try:
+            session = AnalysisSession.objects.get(id=options['analysis_id'])
+        except (AnalysisSession.DoesNotExist, ValueError):
+            raise CommandError(f"Análise não encontrada: {options['analysis_id']}")
+
+        comments_df = load_frame(options['comments'], COMMENT_SCHEMA)
+        posts_df = load_frame(options['posts'], POST_SCHEMA) if options['posts'] else None
+
+        try:
+            detector = get_scoring_detector(options['model_version'])
+            result = append_comments(session, comments_df, posts_df, detector)
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e))
+
+        session.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['comments']} comentário(s) acrescentado(s), {result['suspicious']} suspeito(s), "
+            f"{result['new_posts']} post(s) novo(s), {result['skipped']} já presente(s) ignorado(s); análise {session.id}: "
+            f"{session.suspicious_count}/{session.total_comments} suspeitos"
+        ))
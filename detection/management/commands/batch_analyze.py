@@ -0,0 +1,213 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from detection.ml.graph import find_coordinated_clusters
+from detection.ml.model_trainer import get_scoring_detector
+from detection.ml.schema import COMMENT_SCHEMA, POST_SCHEMA, apply_schema, read_csv
+from detection.ml.timeseries import build_time_series
+from detection.models import Dataset, AnalysisSession
+from detection.services import (
+    REQUIRED_COMMENT_COLUMNS, REQUIRED_POST_COLUMNS, build_labels, persist_analysis_results
+)
+
+SUPPORTED_EXTENSIONS = ('.csv', '.json', '.ndjson', '.jsonl', '.parquet')
+
+_worker_detector = None
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(model_version):
+    """Inicializa cada processo do pool com o detector já treinado"""
+    global _worker_detector
+    django.setup()
+    _worker_detector = get_scoring_detector(model_version)
+
+
+def _score_chunk(texts):
+    comments_df = pd.DataFrame({'comment_text': texts})
+    return _worker_detector.predict(comments_df)
+
+
+def load_frame(path, schema):
+    """Lê posts/comentários em CSV, JSON, NDJSON ou Parquet conforme a extensão, com o esquema compacto"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return read_csv(path, schema)
+    if extension == '.json':
+        return apply_schema(pd.read_json(path), schema)
+    if extension in ('.ndjson', '.jsonl'):
+        return apply_schema(pd.read_json(path, lines=True), schema)
+    if extension == '.parquet':
+        return apply_schema(pd.read_parquet(path), schema)
+    raise CommandError(f'Formato não suportado: {path}')
+
+
+def _is_within(path, directories):
+    path = os.path.realpath(path)
+    return any(path == directory or path.startswith(directory + os.sep) for directory in directories)
+
+
+def find_dataset_pairs(paths, exclude=()):
+    """Agrupa arquivos '*comments*' com o '*posts*' de mesmo nome no mesmo diretório
+
+    Diretórios em exclude (a saída do próprio comando) ficam de fora da varredura.
+    """
+    excluded = [os.path.realpath(directory) for directory in exclude]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                if _is_within(root, excluded):
+                    dirs[:] = []
+                    continue
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise CommandError(f'Caminho não encontrado: {path}')
+
+    files = [
+        f for f in files
+        if os.path.splitext(f)[1].lower() in SUPPORTED_EXTENSIONS and not _is_within(f, excluded)
+    ]
+    available = set(files)
+    pairs = []
+    for comments_path in files:
+        directory, name = os.path.split(comments_path)
+        if 'comments' not in name:
+            continue
+        posts_path = os.path.join(directory, name.replace('comments', 'posts'))
+        if posts_path not in available:
+            raise CommandError(f'Arquivo de posts correspondente não encontrado para {comments_path}')
+        pairs.append((posts_path, comments_path))
+    return pairs
+
+
+class Command(BaseCommand):
+    help = 'Analisa arquivos de posts/comentários offline, pontuando em paralelo com um pool de processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Arquivos ou diretórios com pares *posts* / *comments*')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos de pontuação')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Comentários por tarefa do pool')
+        parser.add_argument('--model-version', default=None, help='Versão do modelo em ARGUS_MODEL_DIR')
+        parser.add_argument('--output-dir', default=None, help='Diretório da saída Parquet por comentário')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size deve ser >= 1')
+        self.model_version = options['model_version']
+        output_dir = options['output_dir'] or os.path.join(settings.MEDIA_ROOT, 'batch')
+        # Os '<id>_comments.parquet' gravados na saída não são entradas de uma nova execução
+        pairs = find_dataset_pairs(options['paths'], exclude=[output_dir])
+        if not pairs:
+            raise CommandError('Nenhum par de arquivos posts/comments encontrado')
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Carrega (ou treina) o modelo antes de criar o pool, para que os workers só o leiam
+        try:
+            get_scoring_detector(options['model_version'])
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"📊 {len(pairs)} dataset(s), {options['workers']} worker(s)")
+        failures = []
+        with ProcessPoolExecutor(
+            max_workers=max(1, options['workers']),
+            initializer=_init_worker,
+            initargs=(options['model_version'],)
+        ) as executor:
+            for posts_path, comments_path in pairs:
+                # Um par com erro não interrompe o lote: segue para o próximo e entra no resumo final
+                try:
+                    session = self.analyze_pair(executor, posts_path, comments_path, output_dir, options['chunk_size'])
+                except Exception as e:
+                    logger.exception('Erro na análise em lote', extra={'comments_path': comments_path})
+                    self.stderr.write(f'❌ {os.path.basename(comments_path)}: {e}')
+                    failures.append((comments_path, e))
+                    continue
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {os.path.basename(comments_path)}: {session.suspicious_count}/{session.total_comments} "
+                    f"suspeitos (análise {session.id})"
+                ))
+
+        if failures:
+            summary = '\n'.join(f'  {path}: {error}' for path, error in failures)
+            raise CommandError(f'{len(failures)} de {len(pairs)} dataset(s) falharam:\n{summary}')
+
+    def analyze_pair(self, executor, posts_path, comments_path, output_dir, chunk_size):
+        posts_df = load_frame(posts_path, POST_SCHEMA)
+        comments_df = load_frame(comments_path, COMMENT_SCHEMA)
+        # Falha o par logo aqui, com as colunas que faltam, em vez de um KeyError no meio do pandas
+        missing = [f'comments.{col}' for col in REQUIRED_COMMENT_COLUMNS if col not in comments_df.columns]
+        missing += [f'posts.{col}' for col in REQUIRED_POST_COLUMNS if col not in posts_df.columns]
+        if missing:
+            raise CommandError(f"Colunas ausentes: {', '.join(missing)}")
+
+        dataset = Dataset.objects.create(
+            name=f"Batch_{os.path.splitext(os.path.basename(comments_path))[0]}",
+            description=f"Dataset processado em lote - {len(posts_df)} posts, {len(comments_df)} comentários",
+            posts_count=len(posts_df),
+            comments_count=len(comments_df)
+        )
+        session = AnalysisSession.objects.create(
+            dataset=dataset,
+            total_comments=len(comments_df),
+            status='RUNNING'
+        )
+
+        try:
+            texts = comments_df['comment_text'].tolist()
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            predictions, probabilities, detected_patterns = [], [], []
+            for chunk_predictions, chunk_probabilities, chunk_patterns in executor.map(_score_chunk, chunks):
+                predictions.append(chunk_predictions)
+                probabilities.append(chunk_probabilities)
+                detected_patterns.extend(chunk_patterns)
+            predictions = np.concatenate(predictions) if predictions else np.array([], dtype=int)
+            probabilities = np.concatenate(probabilities) if probabilities else np.array([])
+
+            # Modelo pré-treinado: a acurácia é a concordância com as labels disponíveis
+            labels = build_labels(comments_df)
+            session.accuracy = float((labels == predictions).mean()) if len(labels) else 0.0
+
+            detector = get_scoring_detector(self.model_version)
+            user_behaviors_data = detector.analyze_user_behavior(comments_df, predictions, detected_patterns)
+            post_analyses_data = detector.analyze_posts_targeted(posts_df, comments_df, predictions)
+            clusters_data = find_coordinated_clusters(comments_df, predictions)
+            time_series_data = build_time_series(comments_df, predictions)
+
+            with transaction.atomic():
+                persist_analysis_results(
+                    session, comments_df, predictions, probabilities, detected_patterns,
+                    user_behaviors_data, post_analyses_data, posts_df, clusters_data, time_series_data
+                )
+        except Exception:
+            session.status = 'FAILED'
+            session.save()
+            raise
+
+        self.write_comment_scores(session, comments_df, predictions, probabilities, detected_patterns, output_dir)
+        return session
+
+    def write_comment_scores(self, session, comments_df, predictions, probabilities, detected_patterns, output_dir):
+        """Saída colunar com a pontuação de todos os comentários (não só os suspeitos)"""
+        columns = [c for c in ('comment_id', 'post_id', 'user_id', 'username') if c in comments_df.columns]
+        scores_df = comments_df[columns].copy()
+        scores_df['is_suspicious'] = predictions.astype(bool)
+        scores_df['probability'] = probabilities
+        scores_df['detected_patterns'] = detected_patterns
+        path = os.path.join(output_dir, f'{session.id}_comments.parquet')
+        scores_df.to_parquet(path, index=False)
+        self.stdout.write(f'💾 Pontuações por comentário: {path}')
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from detection.models import AnalysisSession
+from detection.services import compact_analysis
+
+
+class Command(BaseCommand):
+    help = 'Compacta os detalhes de análises antigas em um arquivo comprimido e os remove das tabelas quentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.ARGUS_ARCHIVE_AFTER_DAYS,
+            help='Idade mínima da análise (padrão: ARGUS_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Máximo de análises nesta execução')
+        parser.add_argument('--dry-run', action='store_true', help='Só lista as análises que seriam compactadas')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        sessions = AnalysisSession.objects.filter(
+            status='COMPLETED', archived_at__isnull=True, created_at__lt=cutoff
+        ).order_by('created_at')
+        if options['limit']:
+            sessions = sessions[:options['limit']]
+
+        archived = 0
+        for session in sessions.iterator():
+            if options['dry_run']:
+                self.stdout.write(f'{session.id}  {session.created_at:%Y-%m-%d}  {session.total_comments} comentários')
+                continue
+            # Uma transação por análise: uma falha não desfaz as anteriores
+            archive = compact_analysis(session)
+            if archive is None:
+                continue
+            archived += 1
+            self.stdout.write(
+                f'{session.id}: {sum(archive.row_counts.values())} linhas, '
+                f'{archive.raw_bytes / 1e6:.1f} MB -> {len(archive.data) / 1e6:.1f} MB'
+            )
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {archived} análise(s) compactada(s)'))
@@ -0,0 +1,105 @@
+import io
+import random
+import time
+
+import joblib
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from sklearn.metrics import accuracy_score, precision_score, recall_score
+from sklearn.model_selection import train_test_split
+
+from detection.ml.backends import CLASSIFIER_BACKENDS, create_classifier
+from detection.ml.data_generator import DataGenerator
+from detection.ml.detector import SuspiciousPatternDetector
+from detection.services import build_labels
+
+
+def _model_size(classifier):
+    buffer = io.BytesIO()
+    joblib.dump(classifier, buffer)
+    return buffer.tell()
+
+
+class Command(BaseCommand):
+    help = (
+        'Treina cada backend de classificação com os mesmos dados sintéticos semeados e compara '
+        'tempo de treino, vazão de inferência, tamanho do modelo e acurácia/recall'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', choices=list(CLASSIFIER_BACKENDS),
+                            default=list(CLASSIFIER_BACKENDS), help='Backends comparados (padrão: todos)')
+        parser.add_argument('--comments', type=int, default=20000, help='Comentários gerados')
+        parser.add_argument('--suspicious-ratio', type=float, default=0.1, help='Proporção de suspeitos')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador e da divisão treino/teste')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Repetições da inferência (vale a melhor, para reduzir ruído)')
+        parser.add_argument('--recall-floor', type=float, default=0.9,
+                            help='Recall mínimo (classe suspeita) para um backend ser recomendado')
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        random.seed(seed)
+        np.random.seed(seed)
+        _, comments_df, _ = DataGenerator.generate_dataset(
+            max(100, options['comments'] // 50), options['comments'], options['suspicious_ratio']
+        )
+        labels = build_labels(comments_df)
+
+        # As features são as mesmas para todos: extraídas uma vez, fora das medições
+        features, _ = SuspiciousPatternDetector().prepare_features(comments_df)
+        X_train, X_test, y_train, y_test = train_test_split(
+            features, labels, test_size=0.2, random_state=seed, stratify=labels
+        )
+        self.stdout.write(
+            f'{len(X_train)} linhas de treino, {len(X_test)} de teste, {features.shape[1]} features, '
+            f'{int(np.sum(y_test))} suspeitos no teste\n'
+        )
+
+        results = [self._measure(name, X_train, X_test, y_train, y_test, options['repeat'])
+                   for name in options['backends']]
+
+        self.stdout.write(
+            f"{'backend':<24}{'treino (s)':>12}{'inferência (linhas/s)':>24}{'tamanho (KB)':>14}"
+            f"{'acurácia':>10}{'precisão':>10}{'recall':>8}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['backend']:<24}{result['fit_seconds']:>12.3f}{result['rows_per_second']:>24,.0f}"
+                f"{result['size_bytes'] / 1024:>14.1f}{result['accuracy']:>10.4f}"
+                f"{result['precision']:>10.4f}{result['recall']:>8.4f}"
+            )
+
+        eligible = [result for result in results if result['recall'] >= options['recall_floor']]
+        if not eligible:
+            raise CommandError(f"Nenhum backend atingiu recall >= {options['recall_floor']}")
+        best = max(eligible, key=lambda result: result['rows_per_second'])
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Mais rápido com recall >= {options['recall_floor']}: {best['backend']} "
+            f"(ARGUS_CLASSIFIER_BACKEND={best['backend']})"
+        ))
+
+    @staticmethod
+    def _measure(name, X_train, X_test, y_train, y_test, repeat):
+        classifier = create_classifier(name)
+        start = time.perf_counter()
+        classifier.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+
+        # O mesmo trabalho de SuspiciousPatternDetector.predict: classe e probabilidade
+        elapsed = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            y_pred = classifier.predict(X_test)
+            classifier.predict_proba(X_test)
+            elapsed.append(time.perf_counter() - start)
+
+        return {
+            'backend': name,
+            'fit_seconds': fit_seconds,
+            'rows_per_second': len(X_test) / min(elapsed),
+            'size_bytes': _model_size(classifier),
+            'accuracy': accuracy_score(y_test, y_pred),
+            'precision': precision_score(y_test, y_pred, zero_division=0),
+            'recall': recall_score(y_test, y_pred, zero_division=0),
+        }
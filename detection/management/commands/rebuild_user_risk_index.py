@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from detection.ml.patterns import patterns_to_mask
+from detection.models import AnalysisSession, UserRiskIndex
+from detection.services import BULK_BATCH_SIZE
+from detection.utils.archive import iter_archived_rows
+
+COUNTER_FIELDS = ('username', 'user_id', 'suspicious_comments_count', 'total_comments', 'detected_patterns')
+
+
+class Command(BaseCommand):
+    help = 'Refaz o índice global de risco por usuário a partir de todas as análises concluídas'
+
+    def handle(self, *args, **options):
+        entries = {}
+        sessions = AnalysisSession.objects.filter(status='COMPLETED', is_approximate=False).order_by('created_at')
+        for session in sessions.iterator():
+            for username, user_id, suspicious_count, total_count, patterns in self._user_rows(session):
+                entry = entries.get(username)
+                if entry is None:
+                    entry = entries[username] = UserRiskIndex(
+                        username=username, first_seen=session.created_at, last_seen=session.created_at
+                    )
+                entry.user_id = user_id
+                entry.suspicious_comments_count += suspicious_count
+                entry.total_comments += total_count
+                entry.analyses_count += 1
+                entry.pattern_mask |= patterns_to_mask(patterns)
+                entry.last_seen = session.created_at
+                entry.last_analysis = session
+
+        with transaction.atomic():
+            UserRiskIndex.objects.all().delete()
+            UserRiskIndex.objects.bulk_create(entries.values(), batch_size=BULK_BATCH_SIZE)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Índice de risco refeito: {len(entries)} usuário(s)'))
+
+    @staticmethod
+    def _user_rows(session):
+        if session.archived_at is not None:
+            # Análise compactada: os mesmos contadores, lidos do arquivo
+            for table in ('user_counters', 'users'):
+                rows = [tuple(row[field] for field in COUNTER_FIELDS) for row in iter_archived_rows(session, table)]
+                if rows:
+                    return rows
+            return []
+
+        rows = session.user_counters.values_list(*COUNTER_FIELDS)
+        if not rows.exists():
+            # Análises anteriores aos contadores incrementais: só o top de usuários foi gravado
+            rows = session.user_behaviors.values_list(*COUNTER_FIELDS)
+        return rows.iterator()
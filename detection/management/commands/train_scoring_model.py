@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from detection.ml.model_trainer import get_scoring_detector, model_path
+
+
+class Command(BaseCommand):
+    help = 'Treina e salva o modelo de pontuação padrão se ainda não existir (rodar no deploy, antes de subir o servidor)'
+
+    def handle(self, *args, **options):
+        # Treina só se faltar o modelo ou se ARGUS_CLASSIFIER_BACKEND mudou; senão apenas o carrega
+        detector = get_scoring_detector()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Modelo '{settings.ARGUS_MODEL_VERSION}' ({detector.backend}) pronto em {model_path()}"
+        ))
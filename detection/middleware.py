@@ -0,0 +1,111 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .utils.metrics import REQUEST_DB_QUERIES, REQUEST_DB_SECONDS, REQUEST_DURATION
+
+# Contador da requisição atual; no ASGI as consultas rodam em outras threads, que herdam o contexto
+_request_queries = ContextVar('argus_request_queries', default=None)
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def _count_queries(execute, sql, params, many, context):
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.count += 1
+        queries.seconds += time.perf_counter() - start
+
+
+def install_query_counter(db_connection):
+    """Instala (uma vez) o contador de consultas em uma conexão"""
+    if _count_queries not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(_count_queries)
+
+
+class InstrumentationMiddleware:
+    """Registra latência e número/tempo de consultas ao banco de cada requisição (WSGI e ASGI)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Conexões abertas antes do middleware carregar não passaram pelo sinal connection_created
+        install_query_counter(connection)
+        queries = _QueryCounter()
+        token = _request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, queries, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        queries = _QueryCounter()
+        token = _request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, queries, time.perf_counter() - start)
+        return response
+
+    def _observe(self, request, response, queries, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        REQUEST_DURATION.observe(duration, view=view, method=request.method, status=response.status_code)
+        REQUEST_DB_QUERIES.observe(queries.count, view=view)
+        REQUEST_DB_SECONDS.observe(queries.seconds, view=view)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise que também roda em modo assíncrono.
+
+    O middleware original é só síncrono e, no ASGI, forçaria toda a pilha (e as
+    views async) a rodar em thread. Fora do modo autorefresh (DEBUG) a busca do
+    arquivo é só uma consulta ao índice em memória.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
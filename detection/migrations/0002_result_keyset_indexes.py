@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='postanalysis',
+            options={'ordering': ['-suspicion_ratio', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='suspiciouscomment',
+            options={'ordering': ['-probability', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='userbehavior',
+            options={'ordering': ['-suspicion_score', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='postanalysis',
+            index=models.Index(fields=['analysis_session', '-suspicion_ratio', '-id'], name='postan_session_ratio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postanalysis',
+            index=models.Index(fields=['analysis_session', 'username'], name='postan_session_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suspiciouscomment',
+            index=models.Index(fields=['session', '-probability', '-id'], name='susp_session_prob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suspiciouscomment',
+            index=models.Index(fields=['session', 'username'], name='susp_session_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbehavior',
+            index=models.Index(fields=['analysis_session', '-suspicion_score', '-id'], name='userbeh_session_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbehavior',
+            index=models.Index(fields=['analysis_session', 'username'], name='userbeh_session_user_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0002_result_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysissession',
+            index=models.Index(fields=['-created_at', '-id'], name='session_created_idx'),
+        ),
+    ]
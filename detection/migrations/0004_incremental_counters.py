@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0003_analysis_session_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.IntegerField()),
+                ('caption', models.TextField(blank=True)),
+                ('username', models.CharField(max_length=100)),
+                ('suspicious_comments_count', models.IntegerField(default=0)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('suspicion_ratio', models.FloatField(default=0.0)),
+                ('analysis_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_counters', to='detection.analysissession')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100)),
+                ('user_id', models.IntegerField()),
+                ('suspicious_comments_count', models.IntegerField(default=0)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('suspicion_score', models.FloatField(default=0.0)),
+                ('detected_patterns', models.JSONField(default=list)),
+                ('analysis_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_counters', to='detection.analysissession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['analysis_session', '-suspicion_score', 'id'], name='usercounter_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usercounter',
+            constraint=models.UniqueConstraint(fields=('analysis_session', 'username'), name='usercounter_session_user_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='postcounter',
+            index=models.Index(fields=['analysis_session', '-suspicion_ratio', 'id'], name='postcounter_ratio_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='postcounter',
+            constraint=models.UniqueConstraint(fields=('analysis_session', 'post_id'), name='postcounter_session_post_uniq'),
+        ),
+    ]
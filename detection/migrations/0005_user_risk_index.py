@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0004_incremental_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRiskIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100, unique=True)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('suspicious_comments_count', models.IntegerField(default=0)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('analyses_count', models.IntegerField(default=0)),
+                ('pattern_mask', models.BigIntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('last_analysis', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='detection.analysissession')),
+            ],
+            options={
+                'ordering': ['username'],
+            },
+        ),
+    ]
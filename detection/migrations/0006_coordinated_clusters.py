@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0005_user_risk_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoordinatedCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.IntegerField()),
+                ('size', models.IntegerField()),
+                ('usernames', models.JSONField(default=list)),
+                ('post_ids', models.JSONField(default=list)),
+                ('shared_posts_count', models.IntegerField(default=0)),
+                ('suspicious_comments_count', models.IntegerField(default=0)),
+                ('density', models.FloatField(default=0.0)),
+                ('mean_similarity', models.FloatField(default=0.0)),
+                ('analysis_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clusters', to='detection.analysissession')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['analysis_session', 'rank'], name='cluster_session_rank_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0006_coordinated_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuspicionTimeSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('H', 'Hora'), ('D', 'Dia')], max_length=1)),
+                ('post_id', models.IntegerField(blank=True, null=True)),
+                ('start', models.DateTimeField()),
+                ('step_seconds', models.IntegerField()),
+                ('total_counts', models.BinaryField()),
+                ('suspicious_counts', models.BinaryField()),
+                ('bursts', models.JSONField(default=list)),
+                ('analysis_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='time_series', to='detection.analysissession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['analysis_session', 'frequency'], name='timeseries_session_freq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0007_suspicion_time_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysissession',
+            name='is_approximate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='analysissession',
+            name='sample_size',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='analysissession',
+            name='suspicious_ci_high',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analysissession',
+            name='suspicious_ci_low',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='postanalysis',
+            name='suspicious_ci_high',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='postanalysis',
+            name='suspicious_ci_low',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userbehavior',
+            name='suspicious_ci_high',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userbehavior',
+            name='suspicious_ci_low',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
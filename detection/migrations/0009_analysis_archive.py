@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0008_preview_sampling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysissession',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='AnalysisArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('row_counts', models.JSONField(default=dict)),
+                ('raw_bytes', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('analysis_session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='detection.analysissession')),
+            ],
+        ),
+    ]
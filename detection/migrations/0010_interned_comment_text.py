@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Etapa 1 de 3 (só esquema): cria CommentText e a referência, ainda anulável.
+# A cópia dos textos fica em 0011 e a remoção da coluna antiga em 0012.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0009_analysis_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=32, unique=True)),
+                ('text', models.TextField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='suspiciouscomment',
+            name='text',
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='detection.commenttext'
+            ),
+        ),
+        # Anulável durante a cópia: na reversão a coluna volta vazia e é preenchida por restore_texts
+        migrations.AlterField(
+            model_name='suspiciouscomment',
+            name='comment_text',
+            field=models.TextField(null=True),
+        ),
+    ]
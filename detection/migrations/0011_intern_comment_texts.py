@@ -0,0 +1,56 @@
+import hashlib
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def _digest(text):
+    # O mesmo hash de CommentText.digest_for
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def intern_existing_texts(apps, schema_editor):
+    """Move os textos já gravados para CommentText, em blocos por id"""
+    SuspiciousComment = apps.get_model('detection', 'SuspiciousComment')
+    CommentText = apps.get_model('detection', 'CommentText')
+    text_ids = {}
+    last_pk = 0
+    while True:
+        rows = list(
+            SuspiciousComment.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'comment_text')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        by_digest = {}
+        for pk, text in rows:
+            by_digest.setdefault(_digest(text), (text, []))[1].append(pk)
+        missing = [digest for digest in by_digest if digest not in text_ids]
+        CommentText.objects.bulk_create(
+            [CommentText(digest=digest, text=by_digest[digest][0]) for digest in missing], ignore_conflicts=True
+        )
+        text_ids.update(CommentText.objects.filter(digest__in=missing).values_list('digest', 'id'))
+        for digest, (_, pks) in by_digest.items():
+            SuspiciousComment.objects.filter(pk__in=pks).update(text_id=text_ids[digest])
+
+
+def restore_texts(apps, schema_editor):
+    SuspiciousComment = apps.get_model('detection', 'SuspiciousComment')
+    CommentText = apps.get_model('detection', 'CommentText')
+    for text in CommentText.objects.iterator():
+        SuspiciousComment.objects.filter(text_id=text.id).update(comment_text=text.text)
+
+
+# Etapa 2 de 3 (só dados), em transação própria: no PostgreSQL, atualizar e alterar a
+# mesma tabela na mesma transação falha com "pending trigger events".
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0010_interned_comment_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(intern_existing_texts, restore_texts),
+    ]
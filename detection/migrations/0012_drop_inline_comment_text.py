@@ -0,0 +1,24 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Etapa 3 de 3 (só esquema): remove o texto por extenso e torna a referência obrigatória.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0011_intern_comment_texts'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='suspiciouscomment',
+            name='comment_text',
+        ),
+        migrations.AlterField(
+            model_name='suspiciouscomment',
+            name='text',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT, related_name='+', to='detection.commenttext'
+            ),
+        ),
+    ]
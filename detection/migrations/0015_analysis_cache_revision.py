@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0014_shared_admission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysissession',
+            name='cache_revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
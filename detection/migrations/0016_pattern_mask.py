@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+# Etapa 1 de 2 (só esquema): as colunas nascem zeradas e a 0017 as preenche.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0015_analysis_cache_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suspiciouscomment',
+            name='pattern_mask',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userbehavior',
+            name='pattern_mask',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
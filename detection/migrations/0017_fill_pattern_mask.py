@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from detection.ml.patterns import patterns_to_mask
+
+BATCH_SIZE = 2000
+
+
+def fill_pattern_masks(apps, schema_editor):
+    """Calcula a máscara a partir de detected_patterns, em blocos por id"""
+    for model_name in ('SuspiciousComment', 'UserBehavior'):
+        model = apps.get_model('detection', model_name)
+        last_pk = 0
+        while True:
+            rows = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'detected_patterns')[:BATCH_SIZE])
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+            for row in rows:
+                row.pattern_mask = patterns_to_mask(row.detected_patterns)
+            model.objects.bulk_update(rows, ['pattern_mask'], batch_size=BATCH_SIZE)
+
+
+# Etapa 2 de 2 (só dados), em transação própria, como na 0011
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0016_pattern_mask'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_pattern_masks, migrations.RunPython.noop),
+    ]
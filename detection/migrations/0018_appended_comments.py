@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0017_fill_pattern_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppendedComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment_id', models.IntegerField()),
+                ('analysis_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appended_comments', to='detection.analysissession')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='appendedcomment',
+            constraint=models.UniqueConstraint(fields=('analysis_session', 'comment_id'), name='appended_session_comment_uniq'),
+        ),
+    ]
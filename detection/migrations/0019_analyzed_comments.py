@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_appended_count(apps, schema_editor):
+    """Até aqui a tabela só tinha ids de appends: a contagem por sessão é o total acrescentado"""
+    AnalysisSession = apps.get_model('detection', 'AnalysisSession')
+    AnalyzedComment = apps.get_model('detection', 'AnalyzedComment')
+    counts = AnalyzedComment.objects.filter(analysis_session=OuterRef('pk')).order_by().values(
+        'analysis_session'
+    ).annotate(n=Count('id')).values('n')
+    AnalysisSession.objects.filter(analyzed_comments__isnull=False).distinct().update(
+        appended_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+# Renomeia em vez de recriar: os ids já acrescentados são preservados
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0018_appended_comments'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='appendedcomment',
+            name='appended_session_comment_uniq',
+        ),
+        migrations.RenameModel(
+            old_name='AppendedComment',
+            new_name='AnalyzedComment',
+        ),
+        migrations.AlterField(
+            model_name='analyzedcomment',
+            name='analysis_session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analyzed_comments', to='detection.analysissession'),
+        ),
+        migrations.AddConstraint(
+            model_name='analyzedcomment',
+            constraint=models.UniqueConstraint(fields=('analysis_session', 'comment_id'), name='analyzed_session_comment_uniq'),
+        ),
+        migrations.AddField(
+            model_name='analysissession',
+            name='appended_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_appended_count, migrations.RunPython.noop),
+    ]
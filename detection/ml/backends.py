@@ -0,0 +1,55 @@
+"""
+Backends de classificação do SuspiciousPatternDetector.
+
+Cada backend é uma fábrica sem argumentos que devolve um estimador do
+scikit-learn com predict/predict_proba, treinado sobre as mesmas features
+densas de prepare_features. O padrão (random_forest) é o classificador
+original; os outros são alternativas mais leves para a pontuação. Use
+`manage.py compare_classifiers` para medir tempo de treino, vazão de
+inferência, tamanho e acurácia/recall de cada um com os mesmos dados.
+"""
+
+from django.conf import settings
+
+DEFAULT_BACKEND = 'random_forest'
+
+
+def _random_forest():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=100, random_state=42)
+
+
+def _logistic_regression():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    # text_length tem outra escala que as contagens: sem padronizar, o solver converge mal
+    return make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+
+
+def _hist_gradient_boosting():
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return HistGradientBoostingClassifier(random_state=42)
+
+
+CLASSIFIER_BACKENDS = {
+    'random_forest': _random_forest,
+    'logistic_regression': _logistic_regression,
+    'hist_gradient_boosting': _hist_gradient_boosting,
+}
+
+
+def resolve_backend(name=None):
+    """Nome do backend (ARGUS_CLASSIFIER_BACKEND quando não informado), validado"""
+    name = name or getattr(settings, 'ARGUS_CLASSIFIER_BACKEND', DEFAULT_BACKEND)
+    if name not in CLASSIFIER_BACKENDS:
+        raise ValueError(
+            f"Backend de classificação desconhecido: '{name}' (disponíveis: {', '.join(CLASSIFIER_BACKENDS)})"
+        )
+    return name
+
+
+def create_classifier(name=None):
+    """Estimador novo (não treinado) do backend"""
+    return CLASSIFIER_BACKENDS[resolve_backend(name)]()
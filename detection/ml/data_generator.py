@@ -2,13 +2,23 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 from django.utils import timezone
+import logging
 import numpy as np
 
+from ..utils.metrics import stage_timer
+from .schema import COMMENT_SCHEMA, POST_SCHEMA, apply_schema
+
+logger = logging.getLogger(__name__)
+
 class DataGenerator:
     @staticmethod
     def generate_dataset(posts_count=1000, comments_count=5000, suspicious_ratio=0.05):
         """Gera dataset completo para teste com taxa de suspeitos precisa e natural"""
-        
+        with stage_timer('generate', int(comments_count)):
+            return DataGenerator._generate_dataset(posts_count, comments_count, suspicious_ratio)
+    
+    @staticmethod
+    def _generate_dataset(posts_count, comments_count, suspicious_ratio):
         # Garantir que os valores são inteiros
         posts_count = int(posts_count)
         comments_count = int(comments_count)
@@ -22,12 +32,10 @@ class DataGenerator:
         if suspicious_ratio > 0 and actual_suspicious < 1:
             actual_suspicious = 1
         
-        print(f"🎯 Gerando dataset:")
-        print(f"   📊 Posts: {posts_count}")
-        print(f"   💬 Comentários: {comments_count}")
-        print(f"   🚨 Taxa suspeita: {suspicious_ratio*100}%")
-        print(f"   🎯 Esperados: {expected_suspicious} comentários suspeitos")
-        print(f"   📈 Com variação: {actual_suspicious} comentários suspeitos")
+        logger.info('Gerando dataset', extra={
+            'posts': posts_count, 'comments': comments_count, 'suspicious_ratio': suspicious_ratio,
+            'expected_suspicious': expected_suspicious, 'target_suspicious': actual_suspicious
+        })
 
         # Gerar posts
         posts_data = []
@@ -111,13 +119,14 @@ class DataGenerator:
         
         # Verificação final
         actual_ratio = suspicious_comments_generated / comments_count
-        print(f"✅ Dataset gerado:")
-        print(f"   🎯 Esperados: {expected_suspicious} suspeitos")
-        print(f"   📈 Gerados: {suspicious_comments_generated} suspeitos")
-        print(f"   📊 Taxa real: {actual_ratio*100:.2f}%")
+        logger.info('Dataset gerado', extra={
+            'expected_suspicious': expected_suspicious,
+            'generated_suspicious': suspicious_comments_generated,
+            'actual_ratio': round(actual_ratio, 4)
+        })
         
-        posts_df = pd.DataFrame(posts_data)
-        comments_df = pd.DataFrame(comments_data)
+        posts_df = apply_schema(pd.DataFrame(posts_data), POST_SCHEMA)
+        comments_df = apply_schema(pd.DataFrame(comments_data), COMMENT_SCHEMA)
         
         return posts_df, comments_df, suspicious_comments_generated
     
@@ -1,33 +1,35 @@
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
+import logging
 import re
 
+from ..utils.metrics import stage_timer
+from .backends import DEFAULT_BACKEND, create_classifier, resolve_backend
+from .patterns import SUSPICIOUS_PATTERNS, get_all_keywords
+
+logger = logging.getLogger(__name__)
+
 class SuspiciousPatternDetector:
-    def __init__(self):
+    def __init__(self, backend=None):
         self.vectorizer = TfidfVectorizer(
             max_features=1000,
             stop_words=None,
             ngram_range=(1, 2)
         )
-        self.classifier = RandomForestClassifier(n_estimators=100, random_state=42)
+        # Backend de classificação (ver backends.py); o padrão vem de ARGUS_CLASSIFIER_BACKEND
+        self.backend = resolve_backend(backend)
+        self.classifier = create_classifier(self.backend)
         self.suspicious_patterns = {
-            'emoji_hearts_girls': ['👧💕', '💜💜', '👧🏻💖', '💕👧', '💖💖', '❤️👧'],
-            'emoji_spiral_boys': ['🌀👦', '👦🌀', '💙🌀', '🌀💙', '👦💙', '🌀💙👦'],
-            'suspicious_text_girls': ['menina linda', 'garotinha fofa', 'linda menina', 'fofa garotinha'],
-            'suspicious_text_boys': ['menino bonito', 'garoto lindo', 'bonito menino', 'lindo garoto']
+            pattern_type: list(patterns) for pattern_type, patterns in SUSPICIOUS_PATTERNS.items()
         }
     
     def get_all_keywords(self):
         """Retorna todas as keywords suspeitas"""
-        all_keywords = []
-        for pattern_list in self.suspicious_patterns.values():
-            all_keywords.extend(pattern_list)
-        return all_keywords
+        return get_all_keywords(self.suspicious_patterns)
     
     def extract_features(self, text):
         """Extrai características do texto"""
@@ -60,44 +62,70 @@ class SuspiciousPatternDetector:
     
     def prepare_features(self, df):
         """Prepara as features para o modelo"""
-        feature_list = []
-        all_detected_patterns = []
-        
-        for _, row in df.iterrows():
-            features, patterns = self.extract_features(row['comment_text'])
-            feature_list.append(features)
-            all_detected_patterns.append(patterns)
-        
-        feature_df = pd.DataFrame(feature_list)
+        texts = df['comment_text']
+
+        with stage_timer('feature_extraction', len(df)):
+            if isinstance(texts.dtype, pd.CategoricalDtype):
+                # Texto codificado em dicionário: extrai uma vez por texto distinto e expande pelos
+                # códigos (-1 = ausente, a última entrada). As listas de padrões são compartilhadas.
+                # Blocos e amostras herdam as categorias do DataFrame inteiro: só as usadas contam.
+                texts = texts.cat.remove_unused_categories()
+                extracted = [self.extract_features(text) for text in texts.cat.categories]
+                extracted.append(self.extract_features(None))
+                codes = texts.cat.codes.to_numpy().copy()
+                codes[codes < 0] = len(extracted) - 1
+                feature_df = pd.DataFrame([features for features, _ in extracted]).iloc[codes].reset_index(drop=True)
+                all_detected_patterns = [extracted[code][1] for code in codes]
+            else:
+                feature_list = []
+                all_detected_patterns = []
+                for text in texts:
+                    features, patterns = self.extract_features(text)
+                    feature_list.append(features)
+                    all_detected_patterns.append(patterns)
+                feature_df = pd.DataFrame(feature_list)
         return feature_df, all_detected_patterns
     
     def train(self, comments_df, labels):
         """Treina o modelo"""
-        print("Preparando features...")
         features, _ = self.prepare_features(comments_df)
         
-        print("Treinando modelo...")
         X_train, X_test, y_train, y_test = train_test_split(
             features, labels, test_size=0.2, random_state=42
         )
         
-        self.classifier.fit(X_train, y_train)
+        with stage_timer('fit', len(X_train)):
+            self.classifier.fit(X_train, y_train)
         
         # Avaliação
         y_pred = self.classifier.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         
-        print(f"Acurácia do modelo: {accuracy:.4f}")
-        print("\nRelatório de Classificação:")
-        print(classification_report(y_test, y_pred))
+        logger.info('Modelo treinado', extra={'accuracy': round(accuracy, 4), 'train_rows': len(X_train)})
+        logger.debug('Relatório de classificação\n%s', classification_report(y_test, y_pred))
         
         return accuracy
     
-    def predict(self, comments_df):
-        """Faz predições em novos dados"""
+    def predict(self, comments_df, chunk_size=None):
+        """Faz predições em novos dados
+
+        Com chunk_size, pontua em blocos: só as features de um bloco ficam em memória.
+        """
+        if chunk_size and len(comments_df) > chunk_size:
+            parts = [
+                self.predict(comments_df.iloc[start:start + chunk_size])
+                for start in range(0, len(comments_df), chunk_size)
+            ]
+            return (
+                np.concatenate([predictions for predictions, _, _ in parts]),
+                np.concatenate([probabilities for _, probabilities, _ in parts]),
+                [patterns for _, _, chunk_patterns in parts for patterns in chunk_patterns],
+            )
+
         features, detected_patterns = self.prepare_features(comments_df)
-        predictions = self.classifier.predict(features)
-        probabilities = self.classifier.predict_proba(features)
+        with stage_timer('predict', len(features)):
+            predictions = self.classifier.predict(features)
+            probabilities = self.classifier.predict_proba(features)
         
         return predictions, probabilities[:, 1], detected_patterns
     
@@ -105,9 +133,8 @@ class SuspiciousPatternDetector:
         """Analisa comportamento dos usuários"""
         user_stats = {}
         
-        for i, (_, row) in enumerate(comments_df.iterrows()):
-            username = row['username']
-            user_id = row['user_id']
+        # Só as colunas usadas: iterrows montaria uma Series (e datas/categorias) por linha
+        for i, (username, user_id) in enumerate(zip(comments_df['username'], comments_df['user_id'])):
             is_suspicious = predictions[i] == 1
             
             if username not in user_stats:
@@ -180,8 +207,7 @@ class SuspiciousPatternDetector:
             }
         
         # Contar comentários por post
-        for i, (_, comment) in enumerate(comments_df.iterrows()):
-            post_id = comment['post_id']
+        for i, post_id in enumerate(comments_df['post_id']):
             if post_id in post_stats:
                 post_stats[post_id]['total_count'] += 1
                 if predictions[i] == 1:
@@ -207,6 +233,7 @@ class SuspiciousPatternDetector:
         """Salva o modelo treinado"""
         model_data = {
             'classifier': self.classifier,
+            'backend': self.backend,
             'vectorizer': self.vectorizer,
             'suspicious_patterns': self.suspicious_patterns
         }
@@ -216,6 +243,8 @@ class SuspiciousPatternDetector:
         """Carrega um modelo salvo"""
         model_data = joblib.load(filepath)
         self.classifier = model_data['classifier']
+        # Modelos salvos antes dos backends são sempre random forest
+        self.backend = model_data.get('backend', DEFAULT_BACKEND)
         self.vectorizer = model_data['vectorizer']
         self.suspicious_patterns = model_data['suspicious_patterns']
 
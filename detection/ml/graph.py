@@ -0,0 +1,127 @@
+"""
+Grafo usuário × post para detectar grupos coordenados de contas.
+
+Cada comentário suspeito é uma aresta usuário→post. A similaridade de co-alvo
+entre dois usuários é o Jaccard dos posts que ambos atacaram (B @ B.T, com B
+binária). Usuários ligados por similaridade alta formam componentes conexos,
+que são os clusters. O produto é feito em blocos de linhas com orçamento de
+não-zeros, então a memória fica limitada mesmo com milhões de arestas.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+logger = logging.getLogger(__name__)
+
+MIN_SHARED_POSTS = 2        # Posts em comum para ligar dois usuários
+MIN_SIMILARITY = 0.5        # Jaccard mínimo entre os conjuntos de posts atacados
+MAX_POST_DEGREE = 1000      # Posts virais (muitos atacantes) não dizem nada sobre coordenação
+BLOCK_NNZ_BUDGET = 5_000_000  # Não-zeros por bloco do produto B @ B.T
+TOP_CLUSTERS = 20
+MAX_CLUSTER_MEMBERS = 100   # Usernames / posts gravados por cluster
+
+
+def build_interaction_matrix(comments_df, predictions):
+    """Matriz esparsa usuários × posts com o número de comentários suspeitos de cada par"""
+    suspicious = np.asarray(predictions) == 1
+    user_codes, usernames = pd.factorize(comments_df['username'].values[suspicious])
+    post_codes, post_ids = pd.factorize(comments_df['post_id'].values[suspicious])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(user_codes), dtype=np.float32), (user_codes, post_codes)),
+        shape=(len(usernames), len(post_ids))
+    )
+    matrix.sum_duplicates()
+    return matrix, usernames, post_ids
+
+
+def _row_blocks(work, budget):
+    """Divide as linhas em blocos cujo trabalho estimado cabe no orçamento"""
+    start, acc = 0, 0
+    for row, cost in enumerate(work):
+        if acc and acc + cost > budget:
+            yield start, row
+            start, acc = row, 0
+        acc += cost
+    if start < len(work):
+        yield start, len(work)
+
+
+def co_targeting_edges(matrix, min_shared=MIN_SHARED_POSTS, min_similarity=MIN_SIMILARITY,
+                       max_post_degree=MAX_POST_DEGREE, budget=BLOCK_NNZ_BUDGET):
+    """Pares (i, j, jaccard) de usuários com i < j que atacaram os mesmos posts"""
+    binary = (matrix > 0).astype(np.float32).tocsc()
+    post_degree = np.asarray(binary.sum(axis=0)).ravel()
+    binary = binary[:, np.flatnonzero(post_degree <= max_post_degree)].tocsr()
+    binary_t = binary.T.tocsr()
+    user_degree = np.asarray(binary.sum(axis=1)).ravel()
+
+    # Limite superior de não-zeros que cada linha gera no produto
+    work = binary @ np.asarray(binary.sum(axis=0)).ravel()
+
+    rows, cols, weights = [], [], []
+    for start, end in _row_blocks(work, budget):
+        shared = (binary[start:end] @ binary_t).tocoo()
+        i = shared.row + start
+        keep = (shared.col > i) & (shared.data >= min_shared)
+        i, j, both = i[keep], shared.col[keep], shared.data[keep]
+        jaccard = both / (user_degree[i] + user_degree[j] - both)
+        keep = jaccard >= min_similarity
+        rows.append(i[keep])
+        cols.append(j[keep])
+        weights.append(jaccard[keep].astype(np.float32))
+
+    if not rows:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([], dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(weights)
+
+
+def find_coordinated_clusters(comments_df, predictions, top_n=TOP_CLUSTERS):
+    """Clusters de contas que atacam os mesmos posts, ordenados por tamanho e volume suspeito"""
+    matrix, usernames, post_ids = build_interaction_matrix(comments_df, predictions)
+    n_users = matrix.shape[0]
+    if n_users < 2:
+        return []
+
+    rows, cols, weights = co_targeting_edges(matrix)
+    if len(rows) == 0:
+        return []
+
+    adjacency = sparse.coo_matrix((weights, (rows, cols)), shape=(n_users, n_users)).tocsr()
+    _, labels = connected_components(adjacency, directed=False)
+
+    sizes = np.bincount(labels)
+    edge_label = labels[rows]
+    edge_count = np.bincount(edge_label, minlength=len(sizes))
+    similarity_sum = np.bincount(edge_label, weights=weights, minlength=len(sizes))
+    user_suspicious = np.asarray(matrix.sum(axis=1)).ravel()
+    suspicious_by_label = np.bincount(labels, weights=user_suspicious, minlength=len(sizes))
+
+    candidates = np.flatnonzero(sizes >= 2)
+    order = np.lexsort((-suspicious_by_label[candidates], -sizes[candidates]))
+    clusters = []
+    for label in candidates[order][:top_n]:
+        members = np.flatnonzero(labels == label)
+        member_rows = matrix[members]
+        post_hits = np.asarray((member_rows > 0).sum(axis=0)).ravel()
+        shared_posts = np.flatnonzero(post_hits >= 2)
+        shared_posts = shared_posts[np.argsort(-post_hits[shared_posts], kind='stable')]
+        member_order = members[np.argsort(-user_suspicious[members], kind='stable')]
+        size = int(sizes[label])
+        clusters.append({
+            'size': size,
+            'usernames': [str(name) for name in usernames[member_order[:MAX_CLUSTER_MEMBERS]]],
+            'post_ids': [int(post_id) for post_id in post_ids[shared_posts[:MAX_CLUSTER_MEMBERS]]],
+            'shared_posts_count': len(shared_posts),
+            'suspicious_comments_count': int(suspicious_by_label[label]),
+            'density': float(edge_count[label] / (size * (size - 1) / 2)),
+            'mean_similarity': float(similarity_sum[label] / edge_count[label]),
+        })
+
+    logger.info('Clusters de co-alvo', extra={
+        'users': n_users, 'edges': int(matrix.nnz), 'similar_pairs': len(rows), 'clusters': len(candidates)
+    })
+    return clusters
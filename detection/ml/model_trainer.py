@@ -1,7 +1,21 @@
+import logging
+import os
+import threading
 import pandas as pd
+from django.conf import settings
+from .backends import resolve_backend
+from .data_generator import DataGenerator
 from .detector import SuspiciousPatternDetector
 import joblib
 
+logger = logging.getLogger(__name__)
+
+_scoring_detectors = {}
+_scoring_lock = threading.Lock()
+
+class ModelNotReady(Exception):
+    """A versão padrão ainda não foi treinada (ou precisa ser retreinada) e o chamador não pode esperar"""
+
 def create_training_data(comments_df):
     """Cria dados de treinamento rotulados baseados nos padrões suspeitos"""
     labels = []
@@ -22,21 +36,53 @@ def create_training_data(comments_df):
 
 def train_and_save_model(comments_df, model_path='suspicious_pattern_detector.pkl'):
     """Treina e salva o modelo"""
-    print("Criando dados de treinamento...")
     labels = create_training_data(comments_df)
     
-    print("Treinando modelo...")
     detector = SuspiciousPatternDetector()
     accuracy = detector.train(comments_df, labels)
     
-    print("Salvando modelo...")
     detector.save_model(model_path)
     
-    print(f"Modelo salvo em {model_path} com acurácia: {accuracy:.4f}")
+    logger.info('Modelo salvo', extra={
+        'model_path': model_path, 'backend': detector.backend, 'accuracy': round(accuracy, 4)
+    })
     return detector, accuracy
 
 def load_trained_model(model_path='suspicious_pattern_detector.pkl'):
     """Carrega um modelo treinado"""
     detector = SuspiciousPatternDetector()
     detector.load_model(model_path)
-    return detector
\ No newline at end of file
+    return detector
+
+def model_path(version=None):
+    """Caminho do modelo salvo para uma versão"""
+    version = version or settings.ARGUS_MODEL_VERSION
+    return os.path.join(settings.ARGUS_MODEL_DIR, f'{version}.pkl')
+
+def get_scoring_detector(version=None, train_missing=True):
+    """Detector treinado compartilhado pelo processo (API e processamento em lote)
+
+    A versão padrão é treinada com dados sintéticos e salva na primeira vez (e de
+    novo se o backend configurado mudar); outras versões precisam existir em
+    ARGUS_MODEL_DIR e usam o backend com que foram salvas. Com train_missing=False
+    (requisições web) o treino não acontece: levanta ModelNotReady.
+    """
+    version = version or settings.ARGUS_MODEL_VERSION
+    with _scoring_lock:
+        if version not in _scoring_detectors:
+            path = model_path(version)
+            detector = load_trained_model(path) if os.path.exists(path) else None
+            is_default = version == settings.ARGUS_MODEL_VERSION
+            if detector is None and not is_default:
+                raise FileNotFoundError(f"Modelo '{version}' não encontrado em {path}")
+            if is_default and (detector is None or detector.backend != resolve_backend()):
+                # Sem modelo salvo, ou ARGUS_CLASSIFIER_BACKEND mudou: retreina a versão padrão
+                if not train_missing:
+                    raise ModelNotReady(
+                        f"Modelo '{version}' ainda não treinado; execute python manage.py train_scoring_model"
+                    )
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _, comments_df, _ = DataGenerator.generate_dataset(500, 10000, 0.1)
+                detector, _ = train_and_save_model(comments_df, path)
+            _scoring_detectors[version] = detector
+        return _scoring_detectors[version]
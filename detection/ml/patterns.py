@@ -0,0 +1,32 @@
+# Padrões monitorados, sem dependências pesadas (usados por páginas que não carregam o modelo)
+SUSPICIOUS_PATTERNS = {
+    'emoji_hearts_girls': ['👧💕', '💜💜', '👧🏻💖', '💕👧', '💖💖', '❤️👧'],
+    'emoji_spiral_boys': ['🌀👦', '👦🌀', '💙🌀', '🌀💙', '👦💙', '🌀💙👦'],
+    'suspicious_text_girls': ['menina linda', 'garotinha fofa', 'linda menina', 'fofa garotinha'],
+    'suspicious_text_boys': ['menino bonito', 'garoto lindo', 'bonito menino', 'lindo garoto']
+}
+
+def get_all_keywords(patterns=SUSPICIOUS_PATTERNS):
+    """Retorna todas as keywords suspeitas"""
+    all_keywords = []
+    for pattern_list in patterns.values():
+        all_keywords.extend(pattern_list)
+    return all_keywords
+
+
+# Bit de cada keyword nas máscaras de padrões do índice de risco (UserRiskIndex).
+# A ordem segue get_all_keywords(): novas keywords devem entrar no fim da última
+# categoria, ou o índice precisa ser refeito (manage.py rebuild_user_risk_index).
+PATTERN_BITS = {keyword: 1 << bit for bit, keyword in enumerate(get_all_keywords())}
+
+
+def patterns_to_mask(patterns):
+    """Converte uma lista de padrões detectados em máscara de bits (padrões desconhecidos são ignorados)"""
+    mask = 0
+    for pattern in patterns:
+        mask |= PATTERN_BITS.get(pattern, 0)
+    return mask
+
+
+def mask_to_patterns(mask):
+    return [keyword for keyword, bit in PATTERN_BITS.items() if mask & bit]
@@ -0,0 +1,167 @@
+"""
+Amostragem estratificada para a prévia de análises grandes.
+
+Os estratos cruzam a atividade do autor (comentários do usuário) e a do post
+(comentários no post), em faixas log2. Cada estrato é amostrado por Bernoulli
+com taxa proporcional ao tamanho e um mínimo por estrato, então contas e posts
+muito ativos (raros, mas onde os ataques se concentram) sempre aparecem. As
+estimativas pesam cada comentário por N_h / n_h do seu estrato; os intervalos
+são normais (95%) com correção de população finita.
+"""
+
+import numpy as np
+import pandas as pd
+
+PREVIEW_SAMPLE_SIZE = 2000   # Comentários pontuados na prévia (aprox.)
+MIN_STRATUM_SAMPLE = 30      # Mínimo por estrato (ou o estrato inteiro, se menor)
+MAX_ACTIVITY_BIN = 10        # Faixas log2 de atividade: 1, 2-3, 4-7, ..., 1024+
+Z_95 = 1.96
+SAMPLE_SEED = 42
+
+
+def _activity(values):
+    """Número de comentários da chave de cada linha e sua faixa log2"""
+    codes, _ = pd.factorize(values)
+    counts = np.bincount(codes)[codes]
+    return counts, np.minimum(np.log2(counts).astype(np.int64), MAX_ACTIVITY_BIN)
+
+
+def draw_stratified_sample(comments_df, sample_size=PREVIEW_SAMPLE_SIZE, seed=SAMPLE_SEED):
+    """Amostra dos comentários e os estratos como [(estrato, N_h, n_h)].
+
+    A amostra ganha as colunas _stratum, _user_activity e _post_activity. O
+    custo é O(n), sem ordenação: roda no upload de datasets com milhões de linhas.
+    """
+    user_activity, user_bin = _activity(comments_df['username'].to_numpy())
+    post_activity, post_bin = _activity(comments_df['post_id'].to_numpy())
+    strata = user_bin * (MAX_ACTIVITY_BIN + 1) + post_bin
+
+    population = np.bincount(strata)
+    target = np.minimum(population, np.maximum(MIN_STRATUM_SAMPLE, sample_size * population / len(strata)))
+    rate = np.divide(target, population, out=np.zeros(len(population)), where=population > 0)
+    chosen = np.flatnonzero(np.random.default_rng(seed).random(len(strata)) < rate[strata])
+    sampled = np.bincount(strata[chosen], minlength=len(population))
+
+    sample = comments_df.iloc[chosen].copy()
+    sample['_stratum'] = strata[chosen]
+    sample['_user_activity'] = user_activity[chosen]
+    sample['_post_activity'] = post_activity[chosen]
+    strata_sizes = [
+        (int(h), int(population[h]), int(sampled[h])) for h in np.flatnonzero(sampled)
+    ]
+    return sample, strata_sizes
+
+
+def estimate_totals(sample, strata_sizes, keys, values):
+    """Total estimado de `values` por chave e a meia-largura do IC 95%.
+
+    Estimador estratificado de total de domínio: sum_h N_h/n_h * sum(y) com
+    variância sum_h N_h^2 (1 - n_h/N_h) s_h^2 / n_h. Linhas com valor zero não
+    contribuem, então basta passar as linhas de interesse (ex.: as suspeitas).
+    """
+    population = np.zeros(max(h for h, _, _ in strata_sizes) + 1)
+    sampled = np.zeros_like(population)
+    for h, population_h, sampled_h in strata_sizes:
+        population[h], sampled[h] = population_h, sampled_h
+
+    values = np.asarray(values, dtype='float64')
+    frame = pd.DataFrame({
+        'key': keys, 'stratum': sample['_stratum'].to_numpy(), 'y': values, 'y2': values ** 2
+    })
+    sums = frame.groupby(['key', 'stratum'], sort=False)[['y', 'y2']].sum()
+    h = sums.index.get_level_values('stratum').to_numpy()
+    population_h, sampled_h = population[h], sampled[h]
+
+    spread = (sums['y2'] - sums['y'] ** 2 / sampled_h).clip(lower=0) / np.maximum(sampled_h - 1, 1)
+    estimates = pd.DataFrame({
+        'estimate': population_h / sampled_h * sums['y'],
+        'variance': population_h ** 2 * (1 - sampled_h / population_h) / sampled_h * spread,
+        'observed': sums['y'],
+    }).groupby(level='key', sort=False).sum()
+    estimates['margin'] = Z_95 * np.sqrt(estimates['variance'])
+    return estimates[['estimate', 'margin', 'observed']]
+
+
+def interval(estimate, margin, observed, upper_bound):
+    """IC 95% inteiro, limitado ao que foi observado na amostra e ao total conhecido"""
+    low = max(float(observed), estimate - margin)
+    high = min(float(upper_bound), estimate + margin)
+    return int(np.floor(low)), int(np.ceil(max(high, low)))
+
+
+def _ranked(estimates, totals, top_n):
+    """Chaves com IC, ordenadas pelo limite inferior (as que a amostra mais garante)"""
+    rows = []
+    for key, row in estimates.iterrows():
+        total = int(totals[key])
+        estimate = min(row['estimate'], total)
+        low, high = interval(estimate, row['margin'], row['observed'], total)
+        rows.append((key, total, estimate, low, high))
+    rows.sort(key=lambda r: (r[3], r[2]), reverse=True)
+    return rows[:top_n]
+
+
+def preview_estimates(sample, strata_sizes, posts_df, predictions, detected_patterns, top_n=100):
+    """Taxa de suspeitos, top usuários e top posts estimados a partir da amostra pontuada"""
+    total_comments = sum(population_h for _, population_h, _ in strata_sizes)
+    flagged_rows = np.flatnonzero(np.asarray(predictions) == 1)
+    flagged = sample.iloc[flagged_rows]
+    if flagged.empty:
+        return {'suspicious_count': 0, 'suspicious_low': 0, 'suspicious_high': 0, 'users': [], 'posts': []}
+
+    ones = np.ones(len(flagged))
+    overall = estimate_totals(flagged, strata_sizes, np.zeros(len(flagged), dtype=np.int64), ones).iloc[0]
+    low, high = interval(overall['estimate'], overall['margin'], overall['observed'], total_comments)
+
+    patterns = {}
+    for username, row in zip(flagged['username'], flagged_rows):
+        patterns.setdefault(username, set()).update(detected_patterns[row])
+    # observed=True: com username categórico, só os usuários presentes na amostra suspeita
+    user_ids = flagged.groupby('username', sort=False, observed=True)['user_id'].first()
+    user_totals = flagged.groupby('username', sort=False, observed=True)['_user_activity'].first()
+    users = [
+        {
+            'username': username,
+            'user_id': int(user_ids[username]),
+            'suspicious_count': int(round(estimate)),
+            'total_count': total,
+            'suspicion_score': estimate / total * 100,
+            'patterns': sorted(patterns[username]),
+            'suspicious_low': user_low,
+            'suspicious_high': user_high,
+        }
+        for username, total, estimate, user_low, user_high in _ranked(
+            estimate_totals(flagged, strata_sizes, flagged['username'].to_numpy(), ones), user_totals, top_n
+        )
+    ]
+
+    if 'post_id' not in posts_df.columns:
+        posts_df = pd.DataFrame(columns=['post_id', 'caption', 'username'])
+    post_info = posts_df.drop_duplicates('post_id').set_index('post_id')
+    flagged_posts = flagged[flagged['post_id'].isin(post_info.index)]
+    post_totals = flagged_posts.groupby('post_id', sort=False, observed=True)['_post_activity'].first()
+    posts = [
+        {
+            'post_id': int(post_id),
+            'caption': post_info.at[post_id, 'caption'] if pd.notna(post_info.at[post_id, 'caption']) else '',
+            'username': post_info.at[post_id, 'username'],
+            'suspicious_count': int(round(estimate)),
+            'total_count': total,
+            'suspicion_ratio': estimate / total * 100,
+            'suspicious_low': post_low,
+            'suspicious_high': post_high,
+        }
+        for post_id, total, estimate, post_low, post_high in _ranked(
+            estimate_totals(
+                flagged_posts, strata_sizes, flagged_posts['post_id'].to_numpy(), np.ones(len(flagged_posts))
+            ), post_totals, top_n
+        )
+    ] if len(flagged_posts) else []
+
+    return {
+        'suspicious_count': int(round(overall['estimate'])),
+        'suspicious_low': low,
+        'suspicious_high': high,
+        'users': users,
+        'posts': posts,
+    }
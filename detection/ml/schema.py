@@ -0,0 +1,97 @@
+"""
+Esquema compacto dos DataFrames de posts e comentários.
+
+Com os dtypes padrão do pandas, usernames, textos e datas viram colunas de
+objetos Python (dezenas de bytes por célula) e os ids viram int64. Aqui os
+valores repetidos viram categorias (códigos inteiros + dicionário de valores
+distintos), os inteiros são reduzidos ao menor tipo que comporta os dados e as
+datas viram datetime64. Colunas fora do esquema ficam como estão.
+
+O dataset guardado na sessão entre o upload e a análise usa o mesmo caminho:
+to_payload grava CSV e read_payload o relê já no esquema.
+"""
+
+import io
+
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_float_dtype, is_integer_dtype, is_numeric_dtype
+
+# Tipos: 'int' (inteiro estreito), 'category' (codificado em dicionário, valores com o tipo
+# inferido), 'text' (categoria de strings, montada já pelo parser do CSV) e 'datetime'
+POST_SCHEMA = {
+    'post_id': 'int',            # Único por post: a categoria não economiza nada
+    'user_id': 'int',
+    'username': 'text',
+    'post_date': 'datetime',
+    'likes_count': 'int',
+}
+COMMENT_SCHEMA = {
+    'comment_id': 'int',
+    'post_id': 'category',
+    'user_id': 'int',
+    'username': 'text',
+    'comment_text': 'text',      # Spam e campanhas repetem os mesmos textos
+    'comment_date': 'datetime',
+}
+
+
+def _narrow_int(column):
+    if is_float_dtype(column):
+        # Inteiros lidos como float (ex.: JSON com nulos): só converte se não houver nulos nem frações
+        if column.isna().any() or not (column % 1 == 0).all():
+            return column
+    elif not is_integer_dtype(column):
+        return column
+    return pd.to_numeric(column, downcast='integer')
+
+
+def _to_datetime(column):
+    if is_datetime64_any_dtype(column):
+        return column
+    if is_numeric_dtype(column):
+        # DataFrame.to_json grava datas como epoch em milissegundos
+        return pd.to_datetime(column, unit='ms', errors='coerce')
+    parsed = pd.to_datetime(column, errors='coerce')
+    if not is_datetime64_any_dtype(parsed):
+        # Fusos horários misturados: normaliza tudo para UTC
+        parsed = pd.to_datetime(column, errors='coerce', utc=True)
+    return parsed
+
+
+_CONVERTERS = {
+    'int': _narrow_int,
+    'category': lambda column: column.astype('category'),
+    'text': lambda column: column.astype('category'),
+    'datetime': _to_datetime,
+}
+
+
+def apply_schema(df, schema):
+    """Converte (no próprio DataFrame) as colunas do esquema presentes em `df` e o retorna"""
+    for column, kind in schema.items():
+        if column in df.columns:
+            df[column] = _CONVERTERS[kind](df[column])
+    return df
+
+
+def read_csv(source, schema, **options):
+    """CSV com as colunas de texto já categóricas na leitura (sem materializar uma string por linha)"""
+    text_columns = {column: 'category' for column, kind in schema.items() if kind == 'text'}
+    return apply_schema(pd.read_csv(source, dtype=text_columns, **options), schema)
+
+
+def to_payload(df):
+    """Serializa o DataFrame para a sessão.
+
+    CSV em vez de JSON de registros: volta pelo parser em C direto para o
+    esquema, sem um dict Python por linha (o pico de memória da leitura).
+    """
+    return df.to_csv(index=False)
+
+
+def read_payload(data, schema):
+    """Lê o que to_payload gravou (ou o JSON de registros de sessões antigas)"""
+    if data.lstrip()[:1] == '[':
+        return apply_schema(pd.read_json(io.StringIO(data)), schema)
+    # Os valores ausentes já foram resolvidos na leitura do upload: só o campo vazio é nulo
+    return read_csv(io.StringIO(data), schema, keep_default_na=False, na_values=[''])
@@ -0,0 +1,105 @@
+"""
+Séries temporais de suspeição a partir de `comment_date`.
+
+Os timestamps viram códigos de hora por divisão inteira e são contados com
+np.bincount (O(n), sem ordenar); a série diária é o resample da horária, que
+já é pequena. Dezenas de milhões de comentários levam poucos segundos.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+HOUR_NS = 3600 * 10**9
+MAX_SPAN_DAYS = 3660         # Timestamps mais antigos que isso (antes do mais recente) são descartados
+MAX_BUCKETS = 5000           # Séries maiores não são gravadas naquela frequência
+TOP_POSTS = 5                # Posts (mais comentários suspeitos) com série própria
+BURST_WINDOWS = {'H': 24, 'D': 14}
+BURST_Z = 4.0
+MIN_BURST_COUNT = 5
+
+
+def detect_bursts(suspicious, window):
+    """Índices dos buckets cujo volume suspeito supera a média móvel anterior em BURST_Z desvios"""
+    counts = pd.Series(suspicious, dtype='float64')
+    baseline = counts.shift(1).rolling(window, min_periods=3)
+    mean = baseline.mean()
+    # Desvio de janelas curtas é ruidoso: usa no mínimo o de uma contagem de Poisson (sqrt da média)
+    deviation = np.maximum(baseline.std(), np.sqrt(mean.clip(lower=1.0)))
+    threshold = mean + BURST_Z * deviation
+    bursts = (counts >= MIN_BURST_COUNT) & (counts > threshold)
+    return np.flatnonzero(bursts.to_numpy()).tolist()
+
+
+def _series(frequency, start, total, suspicious, post_id=None):
+    return {
+        'frequency': frequency,
+        'post_id': post_id,
+        'start': start,
+        'total': total.astype(np.int32),
+        'suspicious': suspicious.astype(np.int32),
+        'bursts': detect_bursts(suspicious, BURST_WINDOWS[frequency]),
+    }
+
+
+def build_time_series(comments_df, predictions, top_posts=TOP_POSTS):
+    """Séries por hora e por dia (global e dos posts mais atacados); vazio se não houver datas"""
+    if 'comment_date' not in comments_df.columns:
+        return []
+
+    stamps = pd.to_datetime(comments_df['comment_date'], errors='coerce', utc=True).to_numpy(dtype='datetime64[ns]')
+    ns = stamps.view(np.int64)
+    valid = ~np.isnat(stamps)
+    if not valid.any():
+        return []
+    valid &= ns >= ns[valid].max() - MAX_SPAN_DAYS * 24 * HOUR_NS
+
+    suspicious = (np.asarray(predictions) == 1)[valid]
+    origin = ns[valid].min() // HOUR_NS
+    hours = ns[valid] // HOUR_NS - origin
+    n_hours = int(hours.max()) + 1
+    start = pd.Timestamp(origin * HOUR_NS, tz='UTC')
+    index = pd.date_range(start, periods=n_hours, freq='H')
+
+    hourly = pd.DataFrame({
+        'total': np.bincount(hours, minlength=n_hours),
+        'suspicious': np.bincount(hours, weights=suspicious, minlength=n_hours).astype(np.int64),
+    }, index=index)
+
+    # Posts com mais comentários suspeitos: uma contagem (post, hora) por bincount
+    post_ids = comments_df['post_id'].to_numpy()[valid]
+    post_codes, unique_posts = pd.factorize(post_ids)
+    ranking = np.argsort(-np.bincount(post_codes, weights=suspicious, minlength=len(unique_posts)), kind='stable')
+    top = ranking[:top_posts]
+    rank_of = np.full(len(unique_posts), -1)
+    rank_of[top] = np.arange(len(top))
+    in_top = rank_of[post_codes] >= 0
+    cells = rank_of[post_codes[in_top]] * n_hours + hours[in_top]
+    post_total = np.bincount(cells, minlength=len(top) * n_hours).reshape(len(top), n_hours)
+    post_suspicious = np.bincount(
+        cells, weights=suspicious[in_top], minlength=len(top) * n_hours
+    ).reshape(len(top), n_hours)
+
+    series = []
+    frames = {'H': hourly, 'D': hourly.resample('D').sum()}
+    for frequency, frame in frames.items():
+        if len(frame) > MAX_BUCKETS:
+            continue
+        series.append(_series(frequency, frame.index[0], frame['total'].to_numpy(), frame['suspicious'].to_numpy()))
+        for rank, code in enumerate(top):
+            post_frame = pd.DataFrame({'total': post_total[rank], 'suspicious': post_suspicious[rank]}, index=index)
+            if frequency == 'D':
+                post_frame = post_frame.resample('D').sum()
+            series.append(_series(
+                frequency, post_frame.index[0], post_frame['total'].to_numpy(),
+                post_frame['suspicious'].to_numpy(), post_id=int(unique_posts[code])
+            ))
+
+    logger.info('Séries temporais', extra={
+        'comments': int(valid.sum()), 'hours': n_hours, 'series': len(series),
+        'bursts': sum(len(s['bursts']) for s in series if s['post_id'] is None)
+    })
+    return series
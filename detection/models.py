@@ -1,6 +1,10 @@
 from django.db import models
+import hashlib
 import uuid
 
+from .ml.patterns import mask_to_patterns
+from .utils.timeline import unpack_counts
+
 class Dataset(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200)
@@ -15,6 +19,7 @@ class Dataset(models.Model):
 class AnalysisSession(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
+        ('QUEUED', 'Queued'),
         ('RUNNING', 'Running'),
         ('COMPLETED', 'Completed'),
         ('FAILED', 'Failed')
@@ -27,25 +32,89 @@ class AnalysisSession(models.Model):
     suspicious_count = models.IntegerField(default=0)
     accuracy = models.FloatField(default=0.0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    # Prévia: contagens estimadas a partir de uma amostra estratificada, com IC 95%
+    is_approximate = models.BooleanField(default=False)
+    sample_size = models.IntegerField(default=0)
+    suspicious_ci_low = models.IntegerField(null=True, blank=True)
+    suspicious_ci_high = models.IntegerField(null=True, blank=True)
+    # Preenchido quando os detalhes foram compactados em AnalysisArchive
+    archived_at = models.DateTimeField(null=True, blank=True)
+    # Incrementada a cada mudança nos dados já gravados (acréscimo, compactação). Entra nas
+    # chaves de cache: os outros processos passam a usar chaves novas sem precisar de invalidação
+    cache_revision = models.PositiveIntegerField(default=0)
+    # Comentários acrescentados depois da análise original: grupos coordenados e séries
+    # temporais não são recalculados nos appends e cobrem só a análise original
+    appended_count = models.IntegerField(default=0)
+    # Controle de admissão (compartilhado entre processos pelo banco): memória reservada,
+    # bloco escolhido e o último sinal de vida do processo que roda ou espera a análise
+    reserved_bytes = models.BigIntegerField(default=0)
+    admission_chunk_size = models.IntegerField(null=True, blank=True)
+    admission_heartbeat = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='session_created_idx'),
+        ]
     
     def suspicious_percentage(self):
         if self.total_comments > 0:
             return (self.suspicious_count / self.total_comments) * 100
         return 0
     
+    def suspicious_percentage_interval(self):
+        """IC 95% da taxa de suspeitos (em %) de uma prévia; None para análises completas"""
+        if not self.is_approximate or self.suspicious_ci_low is None or self.total_comments <= 0:
+            return None
+        return (
+            self.suspicious_ci_low / self.total_comments * 100,
+            self.suspicious_ci_high / self.total_comments * 100
+        )
+    
     def __str__(self):
         return f"Analysis {self.id} - {self.status}"
 
+class AdmissionLock(models.Model):
+    """Linha única atualizada no começo de cada decisão de admissão: serializa as decisões entre processos"""
+    updated_at = models.DateTimeField(auto_now=True)
+
+class CommentText(models.Model):
+    """Texto de comentário guardado uma única vez, endereçado pelo hash (compartilhado entre análises)"""
+    digest = models.CharField(max_length=32, unique=True)  # blake2b-128 do texto em UTF-8, em hex
+    text = models.TextField()
+    
+    @staticmethod
+    def digest_for(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def __str__(self):
+        return self.text
+
 class SuspiciousComment(models.Model):
     session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='suspicious_comments')
     comment_id = models.IntegerField()
     username = models.CharField(max_length=100)
-    comment_text = models.TextField()
+    text = models.ForeignKey(CommentText, on_delete=models.PROTECT, related_name='+')
     probability = models.FloatField()
     detected_patterns = models.JSONField(default=list)
+    # Os mesmos padrões em bits (ml.patterns.PATTERN_BITS), para filtrar sem ler o JSON
+    pattern_mask = models.BigIntegerField(default=0)
+    
+    @property
+    def comment_text(self):
+        """Texto do comentário (use select_related('text') ao listar)"""
+        return self.text.text
+    
+    @comment_text.setter
+    def comment_text(self, value):
+        # Linhas lidas de um arquivo compactado trazem o texto em vez da referência
+        self.text = CommentText(text=value)
     
     class Meta:
-        ordering = ['-probability']
+        ordering = ['-probability', '-id']
+        indexes = [
+            models.Index(fields=['session', '-probability', '-id'], name='susp_session_prob_idx'),
+            models.Index(fields=['session', 'username'], name='susp_session_user_idx'),
+        ]
 
 class UserBehavior(models.Model):
     analysis_session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='user_behaviors')
@@ -55,9 +124,17 @@ class UserBehavior(models.Model):
     total_comments = models.IntegerField(default=0)
     suspicion_score = models.FloatField(default=0.0)
     detected_patterns = models.JSONField(default=list)
+    pattern_mask = models.BigIntegerField(default=0)
+    # Só em prévias: IC 95% da contagem estimada de suspeitos
+    suspicious_ci_low = models.IntegerField(null=True, blank=True)
+    suspicious_ci_high = models.IntegerField(null=True, blank=True)
     
     class Meta:
-        ordering = ['-suspicion_score']
+        ordering = ['-suspicion_score', '-id']
+        indexes = [
+            models.Index(fields=['analysis_session', '-suspicion_score', '-id'], name='userbeh_session_score_idx'),
+            models.Index(fields=['analysis_session', 'username'], name='userbeh_session_user_idx'),
+        ]
 
 class PostAnalysis(models.Model):
     analysis_session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='post_analyses')
@@ -67,6 +144,143 @@ class PostAnalysis(models.Model):
     suspicious_comments_count = models.IntegerField(default=0)
     total_comments = models.IntegerField(default=0)
     suspicion_ratio = models.FloatField(default=0.0)
+    # Só em prévias: IC 95% da contagem estimada de suspeitos
+    suspicious_ci_low = models.IntegerField(null=True, blank=True)
+    suspicious_ci_high = models.IntegerField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-suspicion_ratio', '-id']
+        indexes = [
+            models.Index(fields=['analysis_session', '-suspicion_ratio', '-id'], name='postan_session_ratio_idx'),
+            models.Index(fields=['analysis_session', 'username'], name='postan_session_user_idx'),
+        ]
+
+class UserCounter(models.Model):
+    """Contadores de todos os usuários da análise (o top N fica em UserBehavior), base do modo incremental"""
+    analysis_session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='user_counters')
+    username = models.CharField(max_length=100)
+    user_id = models.IntegerField()
+    suspicious_comments_count = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    suspicion_score = models.FloatField(default=0.0)
+    detected_patterns = models.JSONField(default=list)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['analysis_session', 'username'], name='usercounter_session_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['analysis_session', '-suspicion_score', 'id'], name='usercounter_score_idx'),
+        ]
+
+class PostCounter(models.Model):
+    """Contadores de todos os posts da análise (o top N fica em PostAnalysis), base do modo incremental"""
+    analysis_session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='post_counters')
+    post_id = models.IntegerField()
+    caption = models.TextField(blank=True)
+    username = models.CharField(max_length=100)
+    suspicious_comments_count = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    suspicion_ratio = models.FloatField(default=0.0)
     
     class Meta:
-        ordering = ['-suspicion_ratio']
\ No newline at end of file
+        constraints = [
+            models.UniqueConstraint(fields=['analysis_session', 'post_id'], name='postcounter_session_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['analysis_session', '-suspicion_ratio', 'id'], name='postcounter_ratio_idx'),
+        ]
+
+class AnalyzedComment(models.Model):
+    """comment_id já contado na análise (original ou append): um append não conta o mesmo comentário duas vezes"""
+    analysis_session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='analyzed_comments')
+    comment_id = models.IntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['analysis_session', 'comment_id'], name='analyzed_session_comment_uniq'),
+        ]
+
+class UserRiskIndex(models.Model):
+    """Índice global de risco por username, acumulado entre todas as análises (consulta por chave única)"""
+    username = models.CharField(max_length=100, unique=True)
+    user_id = models.IntegerField(null=True, blank=True)
+    suspicious_comments_count = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    analyses_count = models.IntegerField(default=0)
+    pattern_mask = models.BigIntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    last_analysis = models.ForeignKey(
+        AnalysisSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    
+    class Meta:
+        ordering = ['username']
+    
+    def suspicion_score(self):
+        if self.total_comments > 0:
+            return (self.suspicious_comments_count / self.total_comments) * 100
+        return 0
+    
+    def detected_patterns(self):
+        return mask_to_patterns(self.pattern_mask)
+    
+    def __str__(self):
+        return f"{self.username} - {self.suspicious_comments_count}/{self.total_comments}"
+
+class CoordinatedCluster(models.Model):
+    """Grupo de contas que atacam os mesmos posts (componente do grafo de co-alvo da análise)"""
+    analysis_session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='clusters')
+    rank = models.IntegerField()
+    size = models.IntegerField()
+    usernames = models.JSONField(default=list)
+    post_ids = models.JSONField(default=list)
+    shared_posts_count = models.IntegerField(default=0)
+    suspicious_comments_count = models.IntegerField(default=0)
+    density = models.FloatField(default=0.0)
+    mean_similarity = models.FloatField(default=0.0)
+    
+    class Meta:
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=['analysis_session', 'rank'], name='cluster_session_rank_idx'),
+        ]
+
+class SuspicionTimeSeries(models.Model):
+    """Comentários totais e suspeitos por bucket de tempo (global ou de um post), em arrays int32"""
+    FREQUENCY_CHOICES = [
+        ('H', 'Hora'),
+        ('D', 'Dia')
+    ]
+    
+    analysis_session = models.ForeignKey(AnalysisSession, on_delete=models.CASCADE, related_name='time_series')
+    frequency = models.CharField(max_length=1, choices=FREQUENCY_CHOICES)
+    post_id = models.IntegerField(null=True, blank=True)  # None = série global
+    start = models.DateTimeField()
+    step_seconds = models.IntegerField()
+    total_counts = models.BinaryField()
+    suspicious_counts = models.BinaryField()
+    bursts = models.JSONField(default=list)  # Índices dos buckets com pico de suspeitos
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['analysis_session', 'frequency'], name='timeseries_session_freq_idx'),
+        ]
+    
+    def totals(self):
+        return unpack_counts(self.total_counts)
+    
+    def suspicious(self):
+        return unpack_counts(self.suspicious_counts)
+
+class AnalysisArchive(models.Model):
+    """Detalhes compactados de uma análise antiga (zip com um NDJSON por tabela), fora das tabelas quentes"""
+    analysis_session = models.OneToOneField(AnalysisSession, on_delete=models.CASCADE, related_name='archive')
+    data = models.BinaryField()
+    row_counts = models.JSONField(default=dict)  # Linhas arquivadas por tabela
+    raw_bytes = models.BigIntegerField(default=0)  # Tamanho do NDJSON antes da compressão
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Archive {self.analysis_session_id} - {len(self.data)} bytes"
@@ -0,0 +1,787 @@
+import contextlib
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .ml.detector import SuspiciousPatternDetector
+from .ml.graph import find_coordinated_clusters
+from .ml.timeseries import build_time_series
+from .ml.model_trainer import create_training_data, get_scoring_detector
+from .ml.patterns import patterns_to_mask
+from .ml.sampling import PREVIEW_SAMPLE_SIZE, draw_stratified_sample, preview_estimates
+from .ml.schema import COMMENT_SCHEMA, POST_SCHEMA, read_payload, to_payload
+from .models import (
+    Dataset, AnalysisSession, CommentText, SuspiciousComment, UserBehavior, PostAnalysis, UserCounter, PostCounter,
+    UserRiskIndex, CoordinatedCluster, SuspicionTimeSeries, AnalysisArchive, AnalyzedComment
+)
+from .utils.archive import ARCHIVE_TABLES, build_archive
+from .utils.comment_texts import delete_orphan_comment_texts, session_comment_text_ids
+from .utils.metrics import stage_timer
+from .utils.pipeline import Stage, run_stages
+from .utils.timeline import pack_counts
+
+TOP_RESULTS_LIMIT = 100  # Top 100 usuários / posts gravados por análise
+BULK_BATCH_SIZE = 2000
+COUNTER_LOOKUP_BATCH = 500  # Chaves por consulta IN ao buscar contadores existentes
+REQUIRED_POST_COLUMNS = ['post_id', 'user_id', 'username', 'caption']
+REQUIRED_COMMENT_COLUMNS = ['comment_id', 'post_id', 'user_id', 'username', 'comment_text']
+UPSERT_VENDORS = ('sqlite', 'postgresql')  # Suportam INSERT ... ON CONFLICT DO UPDATE
+RISK_INDEX_COLUMNS = [
+    'username', 'user_id', 'suspicious_comments_count', 'total_comments', 'analyses_count',
+    'pattern_mask', 'first_seen', 'last_seen', 'last_analysis',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def build_labels(comments_df):
+    """Labels reais quando disponíveis; senão, labels baseadas nos padrões conhecidos"""
+    if 'is_suspicious_actual' in comments_df.columns:
+        return comments_df['is_suspicious_actual'].astype(int).values
+    return np.array(create_training_data(comments_df))
+
+
+def intern_comment_texts(texts):
+    """Ids de CommentText para cada texto (mesma ordem), criando em lote os que faltam.
+
+    Cada texto distinto é resolvido uma vez, com consultas IN por blocos de hashes;
+    o custo depende dos textos distintos, não das linhas.
+    """
+    digests = {text: CommentText.digest_for(text) for text in dict.fromkeys(texts)}
+    text_ids = _text_ids(list(digests.values()))
+    missing = [text for text, digest in digests.items() if digest not in text_ids]
+    if missing:
+        # ignore_conflicts: outra análise pode ter gravado o mesmo texto em paralelo
+        CommentText.objects.bulk_create(
+            [CommentText(digest=digests[text], text=text) for text in missing],
+            batch_size=BULK_BATCH_SIZE, ignore_conflicts=True
+        )
+        text_ids.update(_text_ids([digests[text] for text in missing]))
+    return [text_ids[digests[text]] for text in texts]
+
+
+def _text_ids(digests):
+    text_ids = {}
+    for offset in range(0, len(digests), COUNTER_LOOKUP_BATCH):
+        text_ids.update(CommentText.objects.filter(
+            digest__in=digests[offset:offset + COUNTER_LOOKUP_BATCH]
+        ).values_list('digest', 'id'))
+    return text_ids
+
+
+def save_suspicious_comments(session, comments_df, predictions, probabilities, detected_patterns):
+    """Grava apenas os comentários classificados como suspeitos (texto internado em CommentText)"""
+    indexes = np.flatnonzero(np.asarray(predictions) == 1)
+    if len(indexes) == 0:
+        return 0
+
+    comment_ids = comments_df['comment_id'].values[indexes].tolist()
+    usernames = comments_df['username'].values[indexes].tolist()
+    texts = comments_df['comment_text'].iloc[indexes].astype(object).fillna('').astype(str).tolist()
+    text_ids = intern_comment_texts(texts)
+    suspicious_comments = [
+        SuspiciousComment(
+            session=session,
+            comment_id=comment_ids[n],
+            username=usernames[n],
+            text_id=text_ids[n],
+            probability=float(probabilities[i]),
+            detected_patterns=detected_patterns[i],
+            pattern_mask=patterns_to_mask(detected_patterns[i])
+        )
+        for n, i in enumerate(indexes)
+    ]
+    SuspiciousComment.objects.bulk_create(suspicious_comments, batch_size=BULK_BATCH_SIZE)
+    return len(suspicious_comments)
+
+
+def save_user_behaviors(session, user_behaviors_data):
+    user_behavior_objs = [
+        UserBehavior(
+            analysis_session=session,
+            username=user_behavior['username'],
+            user_id=user_behavior['user_id'],
+            suspicious_comments_count=user_behavior['suspicious_count'],
+            total_comments=user_behavior['total_count'],
+            suspicion_score=user_behavior['suspicion_score'],
+            detected_patterns=user_behavior['patterns'],
+            pattern_mask=patterns_to_mask(user_behavior['patterns']),
+            suspicious_ci_low=user_behavior.get('suspicious_low'),
+            suspicious_ci_high=user_behavior.get('suspicious_high')
+        )
+        for user_behavior in user_behaviors_data[:TOP_RESULTS_LIMIT]
+    ]
+    if user_behavior_objs:
+        UserBehavior.objects.bulk_create(user_behavior_objs, batch_size=BULK_BATCH_SIZE)
+    return len(user_behavior_objs)
+
+
+def save_post_analyses(session, post_analyses_data):
+    post_analysis_objs = [
+        PostAnalysis(
+            analysis_session=session,
+            post_id=post_analysis['post_id'],
+            caption=post_analysis['caption'],
+            username=post_analysis['username'],
+            suspicious_comments_count=post_analysis['suspicious_count'],
+            total_comments=post_analysis['total_count'],
+            suspicion_ratio=post_analysis['suspicion_ratio'],
+            suspicious_ci_low=post_analysis.get('suspicious_low'),
+            suspicious_ci_high=post_analysis.get('suspicious_high')
+        )
+        for post_analysis in post_analyses_data[:TOP_RESULTS_LIMIT]
+    ]
+    if post_analysis_objs:
+        PostAnalysis.objects.bulk_create(post_analysis_objs, batch_size=BULK_BATCH_SIZE)
+    return len(post_analysis_objs)
+
+
+def save_clusters(session, clusters_data):
+    CoordinatedCluster.objects.bulk_create([
+        CoordinatedCluster(analysis_session=session, rank=rank, **cluster)
+        for rank, cluster in enumerate(clusters_data, start=1)
+    ])
+    return len(clusters_data)
+
+
+def save_time_series(session, time_series_data):
+    SuspicionTimeSeries.objects.bulk_create([
+        SuspicionTimeSeries(
+            analysis_session=session,
+            frequency=series['frequency'],
+            post_id=series['post_id'],
+            start=series['start'].to_pydatetime(),
+            step_seconds=3600 if series['frequency'] == 'H' else 86400,
+            total_counts=pack_counts(series['total']),
+            suspicious_counts=pack_counts(series['suspicious']),
+            bursts=series['bursts']
+        )
+        for series in time_series_data
+    ])
+    return len(time_series_data)
+
+
+def save_analyzed_comment_ids(session, comments_df):
+    """Registra os comment_id da análise original: appends com exportações sobrepostas os ignoram"""
+    comment_ids = pd.unique(comments_df['comment_id'].to_numpy())
+    for start in range(0, len(comment_ids), BULK_BATCH_SIZE):
+        AnalyzedComment.objects.bulk_create([
+            AnalyzedComment(analysis_session=session, comment_id=int(comment_id))
+            for comment_id in comment_ids[start:start + BULK_BATCH_SIZE]
+        ])
+    return len(comment_ids)
+
+
+def save_user_counters(session, user_behaviors_data):
+    """Grava os contadores de todos os usuários da análise"""
+    UserCounter.objects.bulk_create([
+        UserCounter(
+            analysis_session=session,
+            username=user_behavior['username'],
+            user_id=user_behavior['user_id'],
+            suspicious_comments_count=user_behavior['suspicious_count'],
+            total_comments=user_behavior['total_count'],
+            suspicion_score=user_behavior['suspicion_score'],
+            detected_patterns=user_behavior['patterns']
+        )
+        for user_behavior in user_behaviors_data
+    ], batch_size=BULK_BATCH_SIZE)
+    return len(user_behaviors_data)
+
+
+def save_post_counters(session, post_analyses_data, posts_df=None):
+    """Grava os contadores de todos os posts (inclusive posts ainda sem comentários)"""
+    post_stats = {post_analysis['post_id']: post_analysis for post_analysis in post_analyses_data}
+    if posts_df is not None:
+        posts = posts_df.drop_duplicates('post_id').fillna({'caption': ''})
+        posts = posts[['post_id', 'caption', 'username']].to_dict('records')
+    else:
+        posts = post_analyses_data
+    post_counters = []
+    for post in posts:
+        stats = post_stats.get(post['post_id'], {})
+        post_counters.append(PostCounter(
+            analysis_session=session,
+            post_id=post['post_id'],
+            caption=post['caption'],
+            username=post['username'],
+            suspicious_comments_count=stats.get('suspicious_count', 0),
+            total_comments=stats.get('total_count', 0),
+            suspicion_ratio=stats.get('suspicion_ratio', 0.0)
+        ))
+    PostCounter.objects.bulk_create(post_counters, batch_size=BULK_BATCH_SIZE)
+    return len(post_counters)
+
+
+def _risk_index_upsert_sql(n_rows):
+    """INSERT ... ON CONFLICT (username) que soma os contadores na própria linha do índice"""
+    qn = connection.ops.quote_name
+    table = qn(UserRiskIndex._meta.db_table)
+    columns = [qn(UserRiskIndex._meta.get_field(name).column) for name in RISK_INDEX_COLUMNS]
+    (username, user_id, suspicious, total, analyses, mask, first_seen, last_seen, last_analysis) = columns
+    row = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row] * n_rows)} "
+        f"ON CONFLICT ({username}) DO UPDATE SET "
+        f"{user_id} = excluded.{user_id}, "
+        f"{suspicious} = {table}.{suspicious} + excluded.{suspicious}, "
+        f"{total} = {table}.{total} + excluded.{total}, "
+        f"{analyses} = {table}.{analyses} + CASE WHEN {table}.{last_analysis} = excluded.{last_analysis} "
+        f"THEN 0 ELSE 1 END, "
+        f"{mask} = {table}.{mask} | excluded.{mask}, "
+        f"{first_seen} = CASE WHEN excluded.{first_seen} < {table}.{first_seen} "
+        f"THEN excluded.{first_seen} ELSE {table}.{first_seen} END, "
+        f"{last_seen} = CASE WHEN excluded.{last_seen} > {table}.{last_seen} "
+        f"THEN excluded.{last_seen} ELSE {table}.{last_seen} END, "
+        f"{last_analysis} = excluded.{last_analysis}"
+    )
+
+
+def _update_user_risk_index_orm(session, deltas, seen_at):
+    """Caminho genérico (outros bancos): cria as linhas que faltam, trava e soma em Python"""
+    usernames = list(deltas)
+    with transaction.atomic():
+        # Cria as linhas que faltam antes de travar: inserções concorrentes não perdem contagens
+        UserRiskIndex.objects.bulk_create(
+            [UserRiskIndex(username=username, first_seen=seen_at, last_seen=seen_at) for username in usernames],
+            batch_size=BULK_BATCH_SIZE, ignore_conflicts=True
+        )
+        entries = _existing_counters(UserRiskIndex.objects.select_for_update(), 'username', usernames)
+
+        for username, (_, user_id, suspicious_count, total_count, patterns) in deltas.items():
+            entry = entries[username]
+            if entry.last_analysis_id != session.pk:
+                entry.analyses_count += 1
+            entry.user_id = int(user_id)
+            entry.suspicious_comments_count += int(suspicious_count)
+            entry.total_comments += int(total_count)
+            entry.pattern_mask |= patterns_to_mask(patterns)
+            entry.first_seen = min(entry.first_seen, seen_at)
+            entry.last_seen = max(entry.last_seen, seen_at)
+            entry.last_analysis = session
+
+        UserRiskIndex.objects.bulk_update(entries.values(), RISK_INDEX_COLUMNS[1:], batch_size=BULK_BATCH_SIZE)
+    return len(entries)
+
+
+def update_user_risk_index(session, user_deltas, seen_at=None):
+    """Acumula no índice global os contadores de uma análise (ou de um append).
+
+    user_deltas: (username, user_id, suspeitos, total, padrões) por usuário. first_seen e
+    last_seen usam o created_at da análise (também nos appends), como o
+    rebuild_user_risk_index, para o índice refeito bater com o atualizado. O custo
+    depende dos usuários da análise, não do número de análises já feitas. No SQLite
+    e no PostgreSQL cada lote é um único upsert que soma na própria linha (atômico,
+    sem SELECT nem trava explícita).
+    """
+    deltas = {delta[0]: delta for delta in user_deltas}
+    if not deltas:
+        return 0
+    seen_at = seen_at or session.created_at
+    if connection.vendor not in UPSERT_VENDORS:
+        return _update_user_risk_index_orm(session, deltas, seen_at)
+
+    fields = [UserRiskIndex._meta.get_field(name) for name in RISK_INDEX_COLUMNS]
+    rows = [
+        (username, int(user_id), int(suspicious_count), int(total_count), 1,
+         patterns_to_mask(patterns), seen_at, seen_at, session.pk)
+        for username, user_id, suspicious_count, total_count, patterns in deltas.values()
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, len(rows), COUNTER_LOOKUP_BATCH):
+            batch = rows[offset:offset + COUNTER_LOOKUP_BATCH]
+            params = [
+                field.get_db_prep_save(value, connection)
+                for row in batch for field, value in zip(fields, row)
+            ]
+            cursor.execute(_risk_index_upsert_sql(len(batch)), params)
+    return len(rows)
+
+
+def _timed(stage, func, rows=None, atomic=False):
+    """Etapa do pipeline medida por stage_timer; com atomic, grava numa transação própria"""
+    def run(*args):
+        with stage_timer(stage, rows), (transaction.atomic() if atomic else contextlib.nullcontext()):
+            return func(*args)
+    return run
+
+
+def _pipeline_options():
+    """Workers e trava de escrita do pipeline de etapas.
+
+    Dentro de uma transação (ex.: batch_analyze) tudo roda em linha: as threads
+    do pool usariam outras conexões, fora dela. No SQLite as gravações são
+    serializadas pela trava (um escritor por vez), mas ainda se sobrepõem aos
+    cálculos.
+    """
+    if connection.in_atomic_block:
+        return {'max_workers': 1}
+    db_lock = threading.Lock() if connection.vendor == 'sqlite' else None
+    return {'max_workers': settings.ARGUS_PIPELINE_WORKERS, 'db_lock': db_lock}
+
+
+def _persist_stages(session, comments_df, predictions, probabilities, detected_patterns, posts_df=None):
+    """Gravações da análise; as de usuários, posts, grupos e séries esperam a etapa de cálculo correspondente"""
+    suspicious_total = int(np.asarray(predictions).sum())
+    return [
+        Stage('bulk_insert_comments', _timed('bulk_insert_comments', lambda: save_suspicious_comments(
+            session, comments_df, predictions, probabilities, detected_patterns
+        ), suspicious_total, atomic=True), db=True),
+        Stage('bulk_insert_comment_ids', _timed('bulk_insert_comment_ids', lambda: save_analyzed_comment_ids(
+            session, comments_df
+        ), len(comments_df), atomic=True), db=True),
+        Stage('bulk_insert_users', _timed('bulk_insert_users', lambda users: save_user_behaviors(session, users),
+                                          atomic=True), requires=['aggregation_users'], db=True),
+        Stage('bulk_insert_posts', _timed('bulk_insert_posts', lambda posts: save_post_analyses(session, posts),
+                                          atomic=True), requires=['aggregation_posts'], db=True),
+        Stage('bulk_insert_user_counters', _timed(
+            'bulk_insert_user_counters', lambda users: save_user_counters(session, users), atomic=True
+        ), requires=['aggregation_users'], db=True),
+        Stage('bulk_insert_post_counters', _timed(
+            'bulk_insert_post_counters', lambda posts: save_post_counters(session, posts, posts_df), atomic=True
+        ), requires=['aggregation_posts'], db=True),
+        Stage('save_clusters', _timed('save_clusters', lambda clusters: save_clusters(session, clusters or []),
+                                      atomic=True), requires=['graph_clusters'], db=True),
+        Stage('save_time_series', _timed(
+            'save_time_series', lambda series: save_time_series(session, series or []), atomic=True
+        ), requires=['time_series'], db=True),
+    ]
+
+
+def _complete_analysis(session, predictions, user_behaviors_data):
+    """Índice global de risco e status, juntos e só depois de todos os detalhes gravados"""
+    with transaction.atomic():
+        with stage_timer('user_risk_index', len(user_behaviors_data)):
+            update_user_risk_index(session, [
+                (u['username'], u['user_id'], u['suspicious_count'], u['total_count'], u['patterns'])
+                for u in user_behaviors_data
+            ])
+
+        # Só marca como concluída após gravar os detalhes (o cache de resultados depende disso)
+        session.suspicious_count = int(np.asarray(predictions).sum())
+        session.status = 'COMPLETED'
+        session.save()
+    return session
+
+
+def persist_analysis_results(session, comments_df, predictions, probabilities, detected_patterns,
+                             user_behaviors_data, post_analyses_data, posts_df=None, clusters_data=None,
+                             time_series_data=None):
+    """Grava os detalhes da análise (tabelas em paralelo) e só então marca a sessão como concluída"""
+    run_stages(
+        _persist_stages(session, comments_df, predictions, probabilities, detected_patterns, posts_df),
+        inputs={
+            'aggregation_users': user_behaviors_data,
+            'aggregation_posts': post_analyses_data,
+            'graph_clusters': clusters_data,
+            'time_series': time_series_data,
+        },
+        **_pipeline_options()
+    )
+    return _complete_analysis(session, predictions, user_behaviors_data)
+
+
+def run_analysis(dataset_info, chunk_size=None, session=None):
+    """Analisa o dataset carregado na sessão: treino, predição, agregações e gravação.
+
+    Trabalho síncrono e de CPU; as views o executam no executor limitado.
+    Depois da predição, agregações e gravações rodam como um pipeline de
+    etapas: cada tabela é gravada assim que seus dados ficam prontos, em
+    paralelo com as demais. Em caso de erro a sessão fica como FAILED.
+
+    chunk_size (modo em blocos, escolhido pelo controle de admissão): treina
+    numa amostra aleatória de chunk_size comentários e pontua todos em blocos
+    desse tamanho, limitando a memória de features, treino e predição.
+
+    session: AnalysisSession já criada pelo controle de admissão (RUNNING);
+    sem ela, a sessão é criada aqui.
+    """
+    # Carregar dados da sessão (JSON em memória)
+    with stage_timer('load', dataset_info['comments_count']):
+        posts_df = read_payload(dataset_info['posts_data'], POST_SCHEMA)
+        comments_df = read_payload(dataset_info['comments_data'], COMMENT_SCHEMA)
+
+    if session is None:
+        dataset = Dataset.objects.get(id=dataset_info['id'])
+        session = AnalysisSession.objects.create(
+            dataset=dataset,
+            total_comments=dataset_info['comments_count'],
+            status='RUNNING'
+        )
+
+    try:
+        detector = SuspiciousPatternDetector()
+
+        # Labels reais (se disponíveis) ou baseadas nos padrões
+        labels = build_labels(comments_df)
+
+        # Etapas 'feature_extraction', 'fit' e 'predict' medidas no detector
+        chunked = bool(chunk_size) and len(comments_df) > chunk_size
+        if chunked:
+            sample = np.sort(np.random.RandomState(42).choice(len(comments_df), chunk_size, replace=False))
+            session.accuracy = detector.train(comments_df.iloc[sample], labels[sample])
+        else:
+            session.accuracy = detector.train(comments_df, labels)
+        predictions, probabilities, detected_patterns = detector.predict(
+            comments_df, chunk_size=chunk_size if chunked else None
+        )
+
+        rows = len(comments_df)
+        compute_stages = [
+            Stage('aggregation_users', _timed('aggregation_users', lambda: detector.analyze_user_behavior(
+                comments_df, predictions, detected_patterns
+            ), rows)),
+            Stage('aggregation_posts', _timed('aggregation_posts', lambda: detector.analyze_posts_targeted(
+                posts_df, comments_df, predictions
+            ), rows)),
+            Stage('graph_clusters', _timed('graph_clusters', lambda: find_coordinated_clusters(
+                comments_df, predictions
+            ), rows)),
+            Stage('time_series', _timed('time_series', lambda: build_time_series(comments_df, predictions), rows)),
+        ]
+        results = run_stages(
+            compute_stages + _persist_stages(
+                session, comments_df, predictions, probabilities, detected_patterns, posts_df
+            ),
+            **_pipeline_options()
+        )
+        user_behaviors_data = results['aggregation_users']
+        post_analyses_data = results['aggregation_posts']
+        _complete_analysis(session, predictions, user_behaviors_data)
+    except Exception:
+        session.status = 'FAILED'
+        session.save(update_fields=['status'])
+        raise
+
+    logger.info('Análise concluída', extra={
+        'analysis_id': str(session.id), 'comments': len(comments_df), 'suspicious': session.suspicious_count,
+        'chunk_size': chunk_size if chunked else None
+    })
+    return session, len(user_behaviors_data), len(post_analyses_data)
+
+
+def build_preview_sample(posts_df, comments_df, sample_size=PREVIEW_SAMPLE_SIZE):
+    """Amostra estratificada serializada com o dataset: a prévia não relê os dados completos"""
+    with stage_timer('preview_sample', len(comments_df)):
+        sample, strata_sizes = draw_stratified_sample(comments_df, sample_size)
+        sample_posts = posts_df[posts_df['post_id'].isin(sample['post_id'].unique())]
+        return {
+            'comments_data': to_payload(sample),
+            'posts_data': to_payload(sample_posts),
+            'strata': strata_sizes,
+        }
+
+
+def run_preview(dataset_info):
+    """Prévia aproximada do dataset carregado na sessão.
+
+    Treina e pontua como a análise completa, mas só na amostra estratificada, e
+    grava estimativas com IC 95% numa sessão marcada como aproximada. Não
+    alimenta contadores nem o índice global de risco.
+    """
+    preview_sample = dataset_info.get('preview_sample')
+    if preview_sample is None:
+        # Dataset carregado sem amostra: sorteia agora a partir dos dados completos
+        preview_sample = build_preview_sample(
+            read_payload(dataset_info['posts_data'], POST_SCHEMA),
+            read_payload(dataset_info['comments_data'], COMMENT_SCHEMA)
+        )
+    with stage_timer('load'):
+        sample = read_payload(preview_sample['comments_data'], COMMENT_SCHEMA)
+        posts_df = read_payload(preview_sample['posts_data'], POST_SCHEMA)
+
+    dataset = Dataset.objects.get(id=dataset_info['id'])
+    session = AnalysisSession.objects.create(
+        dataset=dataset,
+        total_comments=dataset_info['comments_count'],
+        status='RUNNING',
+        is_approximate=True,
+        sample_size=len(sample)
+    )
+
+    try:
+        detector = SuspiciousPatternDetector()
+        session.accuracy = detector.train(sample, build_labels(sample))
+        predictions, probabilities, detected_patterns = detector.predict(sample)
+
+        with stage_timer('preview_estimates', len(sample)):
+            estimates = preview_estimates(
+                sample, preview_sample['strata'], posts_df, predictions, detected_patterns, TOP_RESULTS_LIMIT
+            )
+
+        save_suspicious_comments(session, sample, predictions, probabilities, detected_patterns)
+        save_user_behaviors(session, estimates['users'])
+        save_post_analyses(session, estimates['posts'])
+
+        session.suspicious_count = estimates['suspicious_count']
+        session.suspicious_ci_low = estimates['suspicious_low']
+        session.suspicious_ci_high = estimates['suspicious_high']
+        session.status = 'COMPLETED'
+        session.save()
+    except Exception:
+        session.status = 'FAILED'
+        session.save(update_fields=['status'])
+        raise
+
+    logger.info('Prévia concluída', extra={
+        'analysis_id': str(session.id), 'sample': len(sample), 'comments': session.total_comments,
+        'suspicious': session.suspicious_count
+    })
+    return session
+
+
+def refresh_top_results(session):
+    """Regrava o top N de usuários e posts a partir dos contadores (pelos índices de score)"""
+    session.user_behaviors.all().delete()
+    UserBehavior.objects.bulk_create([
+        UserBehavior(
+            analysis_session=session,
+            username=counter.username,
+            user_id=counter.user_id,
+            suspicious_comments_count=counter.suspicious_comments_count,
+            total_comments=counter.total_comments,
+            suspicion_score=counter.suspicion_score,
+            detected_patterns=counter.detected_patterns,
+            pattern_mask=patterns_to_mask(counter.detected_patterns)
+        )
+        for counter in session.user_counters.order_by('-suspicion_score', 'id')[:TOP_RESULTS_LIMIT]
+    ])
+
+    session.post_analyses.all().delete()
+    PostAnalysis.objects.bulk_create([
+        PostAnalysis(
+            analysis_session=session,
+            post_id=counter.post_id,
+            caption=counter.caption,
+            username=counter.username,
+            suspicious_comments_count=counter.suspicious_comments_count,
+            total_comments=counter.total_comments,
+            suspicion_ratio=counter.suspicion_ratio
+        )
+        for counter in session.post_counters.filter(
+            total_comments__gt=0
+        ).order_by('-suspicion_ratio', 'id')[:TOP_RESULTS_LIMIT]
+    ])
+
+
+def _existing_counters(queryset, field, keys):
+    """Contadores já gravados para as chaves tocadas pelo delta, em consultas IN limitadas"""
+    existing = {}
+    for start in range(0, len(keys), COUNTER_LOOKUP_BATCH):
+        batch = keys[start:start + COUNTER_LOOKUP_BATCH]
+        for counter in queryset.filter(**{f'{field}__in': batch}):
+            existing[getattr(counter, field)] = counter
+    return existing
+
+
+def _not_analyzed(session, comments_df):
+    """Máscara das linhas cujo comment_id ainda não foi contado na análise (original ou appends)"""
+    comment_ids = comments_df['comment_id'].tolist()
+    seen = set()
+    for start in range(0, len(comment_ids), COUNTER_LOOKUP_BATCH):
+        seen.update(session.analyzed_comments.filter(
+            comment_id__in=comment_ids[start:start + COUNTER_LOOKUP_BATCH]
+        ).values_list('comment_id', flat=True))
+    return ~comments_df['comment_id'].isin(seen).values
+
+
+def _append_posts(session, posts_df):
+    """Registra contadores zerados para os posts novos; retorna quantos foram criados"""
+    posts = posts_df.drop_duplicates('post_id').fillna({'caption': ''})
+    existing = _existing_counters(session.post_counters.all(), 'post_id', posts['post_id'].tolist())
+    new_posts = [
+        PostCounter(analysis_session=session, post_id=post['post_id'], caption=post['caption'], username=post['username'])
+        for post in posts[['post_id', 'caption', 'username']].to_dict('records')
+        if post['post_id'] not in existing
+    ]
+    PostCounter.objects.bulk_create(new_posts, batch_size=BULK_BATCH_SIZE)
+    return len(new_posts)
+
+
+def _update_user_counters(session, comments_df, suspicious, detected_patterns):
+    frame = pd.DataFrame({
+        'username': comments_df['username'].values,
+        'user_id': comments_df['user_id'].values,
+        'suspicious': suspicious,
+    })
+    users = frame.groupby('username', sort=False, observed=True).agg(
+        user_id=('user_id', 'first'), total=('suspicious', 'size'), suspicious=('suspicious', 'sum')
+    )
+    new_patterns = {}
+    usernames = frame['username'].values
+    for i in np.flatnonzero(suspicious):
+        new_patterns.setdefault(usernames[i], set()).update(detected_patterns[i])
+
+    existing = _existing_counters(session.user_counters.all(), 'username', users.index.tolist())
+    to_create, to_update, deltas = [], [], []
+    for username, row in zip(users.index, users.itertuples(index=False)):
+        deltas.append((username, row.user_id, row.suspicious, row.total, new_patterns.get(username, ())))
+        counter = existing.get(username)
+        if counter is None:
+            counter = UserCounter(analysis_session=session, username=username, user_id=int(row.user_id))
+            to_create.append(counter)
+        else:
+            to_update.append(counter)
+        counter.total_comments += int(row.total)
+        counter.suspicious_comments_count += int(row.suspicious)
+        counter.suspicion_score = (counter.suspicious_comments_count / counter.total_comments) * 100
+        if username in new_patterns:
+            counter.detected_patterns = sorted(set(counter.detected_patterns) | new_patterns[username])
+
+    UserCounter.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    UserCounter.objects.bulk_update(
+        to_update, ['total_comments', 'suspicious_comments_count', 'suspicion_score', 'detected_patterns'],
+        batch_size=BULK_BATCH_SIZE
+    )
+    return deltas
+
+
+def _update_post_counters(session, comments_df, suspicious):
+    posts = pd.DataFrame({'post_id': comments_df['post_id'].values, 'suspicious': suspicious}).groupby(
+        'post_id', sort=False, observed=True
+    )['suspicious'].agg(['size', 'sum'])
+
+    # Comentários de posts desconhecidos são ignorados, como na análise completa
+    existing = _existing_counters(session.post_counters.all(), 'post_id', posts.index.tolist())
+    to_update = []
+    for post_id, total, suspicious_count in zip(posts.index, posts['size'], posts['sum']):
+        counter = existing.get(post_id)
+        if counter is None:
+            continue
+        counter.total_comments += int(total)
+        counter.suspicious_comments_count += int(suspicious_count)
+        counter.suspicion_ratio = (counter.suspicious_comments_count / counter.total_comments) * 100
+        to_update.append(counter)
+
+    PostCounter.objects.bulk_update(
+        to_update, ['total_comments', 'suspicious_comments_count', 'suspicion_ratio'], batch_size=BULK_BATCH_SIZE
+    )
+    return len(to_update)
+
+
+def append_comments(session, comments_df, posts_df=None, detector=None):
+    """Acrescenta comentários a uma análise concluída pontuando apenas o delta.
+
+    Atualiza os contadores por usuário/post, o top N e os totais da sessão; o custo
+    depende das linhas novas (e dos usuários/posts que elas tocam), não do histórico.
+    """
+    if session.status != 'COMPLETED':
+        raise ValueError('Só é possível acrescentar comentários a uma análise concluída')
+    if session.is_approximate:
+        raise ValueError('Prévias aproximadas não aceitam append; execute a análise completa')
+    if session.archived_at is not None:
+        raise ValueError('Análise arquivada não aceita append; execute uma nova análise completa')
+    if not (session.user_counters.exists() or session.post_counters.exists()):
+        raise ValueError('Análise sem contadores incrementais; execute uma nova análise completa')
+
+    missing = [col for col in REQUIRED_COMMENT_COLUMNS if col not in comments_df.columns]
+    if posts_df is not None:
+        missing += [f'posts.{col}' for col in REQUIRED_POST_COLUMNS if col not in posts_df.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes: {', '.join(missing)}")
+
+    received = len(comments_df)
+    comments_df = comments_df.drop_duplicates('comment_id')
+    # Comentários da análise original ou de appends anteriores não são pontuados nem contados de novo
+    comments_df = comments_df[_not_analyzed(session, comments_df)].reset_index(drop=True)
+    if comments_df.empty:
+        return {'comments': 0, 'suspicious': 0, 'new_posts': 0, 'skipped': received}
+
+    # O modelo da análise original não é persistido: o delta usa o modelo de pontuação (como a API)
+    detector = detector or get_scoring_detector()
+    predictions, probabilities, detected_patterns = detector.predict(comments_df)
+    suspicious = np.asarray(predictions) == 1
+    suspicious_count = int(suspicious.sum())
+
+    with transaction.atomic():
+        # Serializa appends concorrentes na mesma análise
+        session = AnalysisSession.objects.select_for_update().get(pk=session.pk)
+        # Confere de novo com a trava: um append concorrente pode ter gravado parte do delta
+        fresh = _not_analyzed(session, comments_df)
+        if not fresh.all():
+            comments_df = comments_df[fresh].reset_index(drop=True)
+            predictions = np.asarray(predictions)[fresh]
+            probabilities = np.asarray(probabilities)[fresh]
+            detected_patterns = [patterns for patterns, keep in zip(detected_patterns, fresh) if keep]
+            suspicious = suspicious[fresh]
+            suspicious_count = int(suspicious.sum())
+            if comments_df.empty:
+                return {'comments': 0, 'suspicious': 0, 'new_posts': 0, 'skipped': received}
+        AnalyzedComment.objects.bulk_create([
+            AnalyzedComment(analysis_session=session, comment_id=comment_id)
+            for comment_id in comments_df['comment_id'].tolist()
+        ], batch_size=BULK_BATCH_SIZE)
+        new_posts = _append_posts(session, posts_df) if posts_df is not None else 0
+
+        with stage_timer('incremental_counters', len(comments_df)):
+            user_deltas = _update_user_counters(session, comments_df, suspicious, detected_patterns)
+            _update_post_counters(session, comments_df, suspicious)
+
+        with stage_timer('user_risk_index', len(user_deltas)):
+            update_user_risk_index(session, user_deltas)
+
+        with stage_timer('bulk_insert_comments', suspicious_count):
+            save_suspicious_comments(session, comments_df, predictions, probabilities, detected_patterns)
+
+        with stage_timer('incremental_top_results', TOP_RESULTS_LIMIT):
+            refresh_top_results(session)
+
+        Dataset.objects.filter(pk=session.dataset_id).update(
+            comments_count=F('comments_count') + len(comments_df),
+            posts_count=F('posts_count') + new_posts
+        )
+        session.total_comments += len(comments_df)
+        session.suspicious_count += suspicious_count
+        # Grupos e séries não são recalculados: a página indica que cobrem só a análise original
+        session.appended_count += len(comments_df)
+        # Revisão nova: todos os processos passam a usar chaves de cache novas
+        session.cache_revision += 1
+        session.save(update_fields=['total_comments', 'suspicious_count', 'appended_count', 'cache_revision'])
+
+    skipped = received - len(comments_df)
+    logger.info('Comentários acrescentados', extra={
+        'analysis_id': str(session.id), 'comments': len(comments_df),
+        'suspicious': suspicious_count, 'new_posts': new_posts, 'skipped': skipped
+    })
+    return {'comments': len(comments_df), 'suspicious': suspicious_count, 'new_posts': new_posts, 'skipped': skipped}
+
+
+def compact_analysis(session):
+    """Dobra os detalhes de uma análise concluída em um blob comprimido e os apaga das tabelas quentes.
+
+    Retorna o AnalysisArchive criado, ou None se a análise já estava arquivada
+    ou não está concluída.
+    """
+    with transaction.atomic():
+        # Trava a sessão: appends e outras compactações esperam
+        session = AnalysisSession.objects.select_for_update().get(pk=session.pk)
+        if session.archived_at is not None or session.status != 'COMPLETED':
+            return None
+
+        with stage_timer('archive_build'):
+            data, row_counts, raw_bytes = build_archive(session)
+        archive = AnalysisArchive.objects.create(
+            analysis_session=session, data=data, row_counts=row_counts, raw_bytes=raw_bytes
+        )
+        with stage_timer('archive_delete', sum(row_counts.values())):
+            text_ids = session_comment_text_ids(session)
+            for related_name, _ in ARCHIVE_TABLES.values():
+                getattr(session, related_name).all().delete()
+            # Análise arquivada não aceita append: os ids já contados não servem mais
+            session.analyzed_comments.all().delete()
+            delete_orphan_comment_texts(text_ids)
+
+        session.archived_at = timezone.now()
+        session.cache_revision += 1
+        session.save(update_fields=['archived_at', 'cache_revision'])
+
+    logger.info('Análise arquivada', extra={
+        'analysis_id': str(session.id), 'rows': row_counts, 'raw_bytes': raw_bytes, 'archive_bytes': len(data)
+    })
+    return archive
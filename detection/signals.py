@@ -0,0 +1,35 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .middleware import install_query_counter
+from .models import AnalysisSession
+from .utils.cache import invalidate_analysis_cache
+from .utils.comment_texts import delete_orphan_comment_texts, session_comment_text_ids
+from .utils.exporters import delete_cached_excel_report
+
+
+@receiver(post_save, sender=AnalysisSession)
+@receiver(post_delete, sender=AnalysisSession)
+def invalidate_analysis_results(sender, instance, **kwargs):
+    """Análise refeita ou excluída: descarta páginas, resumos e relatórios gerados"""
+    invalidate_analysis_cache(instance)
+    delete_cached_excel_report(instance)
+
+
+@receiver(pre_delete, sender=AnalysisSession)
+def collect_comment_texts(sender, instance, **kwargs):
+    """Guarda os textos da análise antes da exclusão em cascata dos comentários"""
+    instance._comment_text_ids = session_comment_text_ids(instance)
+
+
+@receiver(post_delete, sender=AnalysisSession)
+def delete_orphan_texts(sender, instance, **kwargs):
+    """Textos que só essa análise usava saem de CommentText (e do índice de busca)"""
+    delete_orphan_comment_texts(getattr(instance, '_comment_text_ids', ()))
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Novas conexões (inclusive nas threads do ASGI e do executor) entram na contagem de consultas"""
+    install_query_counter(connection)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'detection'
 
@@ -8,12 +8,24 @@ urlpatterns = [
     path('generate-dataset/', views.GenerateDatasetPageView.as_view(), name='generate_dataset_page'),
     path('analyze/', views.analyze_page, name='analyze_page'),
     path('analyses/', views.AllAnalysesView.as_view(), name='all_analyses'),
+    path('analyses/admission/', views.AdmissionStatusView.as_view(), name='analysis_admission'),
     path('generate-download/', views.GenerateAndDownloadDatasetView.as_view(), name='generate_and_download_dataset'),
     path('download-posts-csv/', views.DownloadPostsCSVView.as_view(), name='download_posts_csv'),
     path('download-comments-csv/', views.DownloadCommentsCSVView.as_view(), name='download_comments_csv'),
     path('upload-dataset/', views.UploadDatasetView.as_view(), name='upload_dataset'),
     path('analyze-dataset/', views.AnalyzeDatasetView.as_view(), name='analyze_dataset'),
+    path('preview-dataset/', views.PreviewDatasetView.as_view(), name='preview_dataset'),
     path('results/<uuid:analysis_id>/', views.AnalysisResultsView.as_view(), name='analysis_results'),
+    path('results/<uuid:analysis_id>/full/', views.RunFullAnalysisView.as_view(), name='run_full_analysis'),
+    path('results/<uuid:analysis_id>/append/', views.AppendCommentsView.as_view(), name='append_comments'),
+    path('results/<uuid:analysis_id>/status/', views.AnalysisStatusView.as_view(), name='analysis_status'),
+    path('results/<uuid:analysis_id>/summary/', views.AnalysisSummaryView.as_view(), name='analysis_summary'),
+    path('results/<uuid:analysis_id>/<str:kind>/', views.AnalysisResultsBrowseView.as_view(), name='analysis_results_browse'),
+    path('users/risk/', views.UserRiskLookupView.as_view(), name='user_risk'),
+    path('search/', views.CommentSearchView.as_view(), name='comment_search'),
     path('export/<uuid:analysis_id>/', views.ExportDataView.as_view(), name='export_data'),
+    path('api/v1/score/', api.ScoreCommentsView.as_view(), name='api_v1_score'),
+    path('api/v1/users/<str:username>/risk/', api.UserRiskView.as_view(), name='api_v1_user_risk'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
     path('debug-session/', views.DebugSessionView.as_view(), name='debug_session'),
 ]
\ No newline at end of file
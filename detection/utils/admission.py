@@ -0,0 +1,302 @@
+"""
+Controle de admissão das análises pela memória estimada.
+
+Antes de uma análise começar, o pico de memória é estimado a partir de
+posts_count e comments_count e reservado contra um orçamento único para todos
+os processos que usam o mesmo banco (ARGUS_ANALYSIS_MEMORY_BUDGET_MB). O que
+não cabe:
+
+- roda em blocos (treino numa amostra, pontuação bloco a bloco), se a
+  estimativa do modo em blocos couber;
+- senão espera na fila (FIFO, no event loop, sem ocupar o executor de CPU)
+  até ARGUS_ADMISSION_QUEUE_TIMEOUT segundos;
+- é recusado se nunca caberia no orçamento ou se a fila estiver cheia.
+
+As reservas são as próprias AnalysisSession: a sessão é criada como QUEUED
+antes da espera (e já aparece no status) e passa a RUNNING com a memória
+reservada. Cada decisão atualiza antes a linha de AdmissionLock, o que a
+serializa entre workers (trava de linha no PostgreSQL, escritor único no
+SQLite). O processo renova admission_heartbeat enquanto espera ou roda; a
+reserva de um processo que morreu deixa de contar depois de LEASE_SECONDS.
+Uma sessão cuja análise nunca começou (fila esgotada, erro antes de rodar) é
+apagada ao liberar a reserva, como na recusa, e não aparece nas listas.
+
+As reservas ativas e na fila aparecem em /metrics, no status da análise e em
+snapshot() (acompanhamento da página de análise).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import AdmissionLock, AnalysisSession, Dataset
+from .metrics import ADMISSION_DECISIONS, ANALYSIS_JOBS, MEMORY_BUDGET, MEMORY_RESERVED
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Crescimento do RSS medido em run_analysis (dados sintéticos, 20 mil a 300 mil comentários),
+# arredondado para cima. O pico é o parsing do payload ou o treino, o que for maior.
+BASE_BYTES = 32 * MB              # Modelo, pools de threads e estruturas fixas
+BYTES_PER_COMMENT = 450           # Payload, DataFrame, features, treino e predição
+BYTES_PER_COMMENT_CHUNKED = 300   # Payload, parsing e DataFrame: o que o modo em blocos não reduz
+BYTES_PER_CHUNK_ROW = 500         # Features, treino e predição de um bloco
+BYTES_PER_POST = 2048
+
+ADMISSION_POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 10
+LEASE_SECONDS = 60                # Reserva sem sinal de vida há mais que isso: o processo morreu
+HEARTBEAT_RETRIES = 3             # Tentativas de renovar o sinal de vida com o banco ocupado
+HEARTBEAT_RETRY_SECONDS = 0.5
+
+
+class AdmissionRejected(Exception):
+    """A análise não cabe no orçamento de memória (agora ou nunca)"""
+
+
+def estimate_analysis_bytes(posts_count, comments_count, chunk_size=None):
+    """Pico de memória estimado de uma análise (em blocos de chunk_size comentários, se informado)"""
+    estimate = BASE_BYTES + posts_count * BYTES_PER_POST
+    if chunk_size and comments_count > chunk_size:
+        return estimate + comments_count * BYTES_PER_COMMENT_CHUNKED + chunk_size * BYTES_PER_CHUNK_ROW
+    return estimate + comments_count * BYTES_PER_COMMENT
+
+
+class MemoryAdmission:
+    """Reservas de memória das análises, guardadas nas sessões (vistas por todos os processos)"""
+
+    def __init__(self, budget_bytes, chunk_size, max_queue, queue_timeout):
+        self.budget = budget_bytes
+        self.chunk_size = chunk_size
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock_row_ready = False
+
+    def _live(self):
+        """Sessões na fila ou rodando cujo processo ainda dá sinal de vida"""
+        cutoff = timezone.now() - timedelta(seconds=LEASE_SECONDS)
+        return AnalysisSession.objects.filter(status__in=('QUEUED', 'RUNNING'), admission_heartbeat__gte=cutoff)
+
+    @contextmanager
+    def _locked(self):
+        """Transação que começa escrevendo na linha de AdmissionLock (trava as decisões dos outros processos)"""
+        if not self._lock_row_ready:
+            AdmissionLock.objects.get_or_create(pk=1)
+            self._lock_row_ready = True
+        with transaction.atomic():
+            # A escrita vem primeiro: no SQLite, promover uma leitura a escrita falharia sem esperar
+            AdmissionLock.objects.filter(pk=1).update(updated_at=timezone.now())
+            yield
+
+    def _reserved(self):
+        return self._live().filter(status='RUNNING').aggregate(total=Sum('reserved_bytes'))['total'] or 0
+
+    def _estimates(self, posts_count, comments_count):
+        full_bytes = estimate_analysis_bytes(posts_count, comments_count)
+        chunked_bytes = None
+        if self.chunk_size and comments_count > self.chunk_size:
+            chunked_bytes = estimate_analysis_bytes(posts_count, comments_count, self.chunk_size)
+        return full_bytes, chunked_bytes
+
+    def _is_next(self, session):
+        return not self._live().filter(status='QUEUED', created_at__lt=session.created_at).exists()
+
+    def _fit(self, session):
+        """(bytes, chunk_size) que cabem agora no orçamento, ou None"""
+        full_bytes, chunked_bytes = self._estimates(session.dataset.posts_count, session.total_comments)
+        free = self.budget - self._reserved()
+        if full_bytes <= free:
+            return full_bytes, None
+        if chunked_bytes is not None and chunked_bytes <= free:
+            return chunked_bytes, self.chunk_size
+        return None
+
+    def _try_start(self, session):
+        """Passa a sessão a RUNNING se for a primeira da fila e couber; chamado com a trava"""
+        # FIFO: só a primeira da fila pode começar (análises grandes não ficam para trás)
+        fit = self._is_next(session) and self._fit(session)
+        if not fit:
+            return False
+        session.reserved_bytes, session.admission_chunk_size = fit
+        session.status = 'RUNNING'
+        session.admission_heartbeat = timezone.now()
+        AnalysisSession.objects.filter(pk=session.pk).update(
+            status='RUNNING', reserved_bytes=session.reserved_bytes,
+            admission_chunk_size=session.admission_chunk_size, admission_heartbeat=session.admission_heartbeat
+        )
+        return True
+
+    def _publish(self):
+        live = list(self._live().values_list('status', 'reserved_bytes'))
+        MEMORY_BUDGET.set(self.budget)
+        MEMORY_RESERVED.set(sum(size for status, size in live if status == 'RUNNING'), state='active')
+        MEMORY_RESERVED.set(sum(size for status, size in live if status == 'QUEUED'), state='queued')
+        ANALYSIS_JOBS.set(sum(status == 'RUNNING' for status, _ in live), state='active')
+        ANALYSIS_JOBS.set(sum(status == 'QUEUED' for status, _ in live), state='queued')
+
+    def _enqueue(self, dataset_id, posts_count, comments_count):
+        """Cria a sessão da análise (QUEUED) e tenta começá-la já; levanta AdmissionRejected"""
+        full_bytes, chunked_bytes = self._estimates(posts_count, comments_count)
+        if min(full_bytes, chunked_bytes or full_bytes) > self.budget:
+            ADMISSION_DECISIONS.inc(outcome='rejected')
+            raise AdmissionRejected(
+                f'A análise precisa de ~{full_bytes // MB} MB e o orçamento é de {self.budget // MB} MB'
+            )
+
+        dataset = Dataset.objects.get(id=dataset_id)
+        with self._locked():
+            session = AnalysisSession.objects.create(
+                dataset=dataset, total_comments=comments_count, status='QUEUED',
+                reserved_bytes=full_bytes, admission_heartbeat=timezone.now()
+            )
+            started = self._try_start(session)
+            if not started and self._live().filter(status='QUEUED').exclude(pk=session.pk).count() >= self.max_queue:
+                # A exceção desfaz a transação, e com ela a sessão criada
+                ADMISSION_DECISIONS.inc(outcome='rejected')
+                raise AdmissionRejected('Fila de análises cheia; tente novamente em alguns minutos')
+            self._publish()
+        return session, started
+
+    def _poll(self, session, refresh):
+        """Renova o sinal de vida (se pedido) e tenta começar; True se a sessão passou a RUNNING"""
+        if refresh:
+            self._heartbeat(session)
+        # Consulta sem trava primeiro: só disputa a trava quem pode começar
+        if not (self._is_next(session) and self._fit(session)):
+            return False
+        with self._locked():
+            started = self._try_start(session)
+            if started:
+                self._publish()
+        return started
+
+    def _heartbeat(self, session):
+        """Renova o sinal de vida; com o banco ocupado ('database is locked') tenta de novo antes de desistir"""
+        for attempt in range(HEARTBEAT_RETRIES):
+            try:
+                AnalysisSession.objects.filter(pk=session.pk, status__in=('QUEUED', 'RUNNING')).update(
+                    admission_heartbeat=timezone.now()
+                )
+                return
+            except OperationalError:
+                if attempt == HEARTBEAT_RETRIES - 1:
+                    raise
+                time.sleep(HEARTBEAT_RETRY_SECONDS * (attempt + 1))
+
+    def _release(self, session, started):
+        """Libera a reserva. Se a análise nunca começou, apaga a sessão; se começou e não terminou, fica FAILED"""
+        pending = AnalysisSession.objects.filter(pk=session.pk, status__in=('QUEUED', 'RUNNING'))
+        if not started:
+            # Nada rodou (fila esgotada, erro antes da análise): desfaz a sessão, como na recusa
+            pending.delete()
+        else:
+            pending.update(status='FAILED')
+            AnalysisSession.objects.filter(pk=session.pk).update(admission_heartbeat=None)
+        self._publish()
+
+    async def _keep_alive(self, session):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                await sync_to_async(self._heartbeat)(session)
+            except DatabaseError:
+                # Banco ocupado (ex.: SQLite gravando a análise): tenta de novo no próximo ciclo
+                logger.warning('Falha ao renovar a reserva de memória', extra={'analysis_id': str(session.pk)})
+
+    @asynccontextmanager
+    async def admit(self, dataset_id, posts_count, comments_count):
+        """Reserva a memória da análise enquanto o bloco roda.
+
+        O job traz a sessão já criada ('session', QUEUED até ser admitida) e
+        se a análise roda em blocos ('chunk_size'). Quem roda a análise marca
+        job['started'] = True ao começar; sem a marca, a sessão é apagada na saída.
+        """
+        if self.budget <= 0:
+            # Orçamento desligado: nada é reservado nem recusado; run_analysis cria a sessão
+            yield {'session': None, 'chunk_size': None}
+            return
+
+        session, started = await sync_to_async(self._enqueue)(dataset_id, posts_count, comments_count)
+        if not started:
+            ADMISSION_DECISIONS.inc(outcome='queued')
+
+        keep_alive = None
+        job = {'session': session, 'chunk_size': None, 'started': False}
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            last_refresh = time.monotonic()
+            while not started:
+                if time.monotonic() > deadline:
+                    ADMISSION_DECISIONS.inc(outcome='timeout')
+                    raise AdmissionRejected('Tempo de espera na fila esgotado; tente novamente')
+                await asyncio.sleep(ADMISSION_POLL_SECONDS)
+                refresh = time.monotonic() - last_refresh >= HEARTBEAT_SECONDS
+                try:
+                    started = await sync_to_async(self._poll)(session, refresh)
+                except DatabaseError:
+                    logger.warning('Falha ao consultar a fila de análises', extra={'analysis_id': str(session.pk)})
+                    continue
+                if refresh:
+                    last_refresh = time.monotonic()
+            ADMISSION_DECISIONS.inc(outcome='chunked' if session.admission_chunk_size else 'admitted')
+            keep_alive = asyncio.create_task(self._keep_alive(session))
+            job['chunk_size'] = session.admission_chunk_size
+            yield job
+        finally:
+            if keep_alive is not None:
+                keep_alive.cancel()
+            await sync_to_async(self._release)(session, job['started'])
+
+    def snapshot(self, dataset_id=None, analysis_id=None):
+        """Orçamento, reservas e análises na fila ou rodando (opcionalmente de um dataset ou de uma análise)"""
+        sessions = list(self._live().order_by('created_at'))
+        queue_ids = [session.pk for session in sessions if session.status == 'QUEUED']
+        return {
+            'budget_mb': round(self.budget / MB, 1),
+            'reserved_mb': round(sum(s.reserved_bytes for s in sessions if s.status == 'RUNNING') / MB, 1),
+            'queued_mb': round(sum(s.reserved_bytes for s in sessions if s.status == 'QUEUED') / MB, 1),
+            'active': sum(session.status == 'RUNNING' for session in sessions),
+            'queued': len(queue_ids),
+            'jobs': [
+                {
+                    'analysis_id': str(session.pk),
+                    'dataset_id': str(session.dataset_id),
+                    'state': 'active' if session.status == 'RUNNING' else 'queued',
+                    'queue_position': queue_ids.index(session.pk) + 1 if session.pk in queue_ids else None,
+                    'comments_count': session.total_comments,
+                    'reserved_mb': round(session.reserved_bytes / MB, 1),
+                    'chunked': bool(session.admission_chunk_size),
+                }
+                for session in sessions
+                if (dataset_id is None or str(session.dataset_id) == str(dataset_id))
+                and (analysis_id is None or str(session.pk) == str(analysis_id))
+            ],
+        }
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission():
+    global _admission
+    if _admission is None:
+        with _admission_lock:
+            if _admission is None:
+                _admission = MemoryAdmission(
+                    budget_bytes=settings.ARGUS_ANALYSIS_MEMORY_BUDGET_MB * MB,
+                    chunk_size=settings.ARGUS_ANALYSIS_CHUNK_SIZE,
+                    max_queue=settings.ARGUS_ADMISSION_MAX_QUEUE,
+                    queue_timeout=settings.ARGUS_ADMISSION_QUEUE_TIMEOUT,
+                )
+    return _admission
@@ -0,0 +1,82 @@
+"""
+Arquivo compacto dos detalhes de análises antigas.
+
+Os detalhes de uma análise (comentários suspeitos, top de usuários e posts e os
+contadores incrementais) viram um zip com um NDJSON por tabela, gravado em
+AnalysisArchive, e saem das tabelas quentes. Cada tabela é gravada na
+ordenação padrão do modelo, então o top N se lê descomprimindo só o começo.
+"""
+
+import io
+import json
+import zipfile
+from itertools import islice
+
+from ..models import SuspiciousComment, UserBehavior, PostAnalysis, UserCounter, PostCounter
+
+ARCHIVE_CHUNK_SIZE = 2000
+
+# Colunas arquivadas por valor em vez de referência: nome -> lookup do ORM
+ARCHIVE_LOOKUPS = {
+    'comments': {'comment_text': 'text__text'},
+}
+
+# Tabela no arquivo -> (related_name na AnalysisSession, modelo)
+ARCHIVE_TABLES = {
+    'comments': ('suspicious_comments', SuspiciousComment),
+    'users': ('user_behaviors', UserBehavior),
+    'posts': ('post_analyses', PostAnalysis),
+    'user_counters': ('user_counters', UserCounter),
+    'post_counters': ('post_counters', PostCounter),
+}
+
+
+def archive_columns(table, model):
+    """Colunas arquivadas (nome, lookup): campos concretos sem as FKs, mais os valores referenciados"""
+    columns = [(field.attname, field.attname) for field in model._meta.concrete_fields if not field.is_relation]
+    return columns + list(ARCHIVE_LOOKUPS.get(table, {}).items())
+
+
+def build_archive(session):
+    """Zip comprimido com as tabelas de detalhes: (bytes, linhas por tabela, bytes sem compressão)"""
+    buffer = io.BytesIO()
+    row_counts, raw_bytes = {}, 0
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        for table, (related_name, model) in ARCHIVE_TABLES.items():
+            columns = archive_columns(table, model)
+            names = [name for name, _ in columns]
+            rows = getattr(session, related_name).values_list(
+                *[lookup for _, lookup in columns]
+            ).iterator(chunk_size=ARCHIVE_CHUNK_SIZE)
+            row_counts[table] = 0
+            with bundle.open(f'{table}.ndjson', 'w') as entry:
+                lines = []
+                for row in rows:
+                    lines.append(json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str) + '\n')
+                    if len(lines) >= ARCHIVE_CHUNK_SIZE:
+                        raw_bytes += _write_lines(entry, lines)
+                        row_counts[table] += len(lines)
+                        lines = []
+                raw_bytes += _write_lines(entry, lines)
+                row_counts[table] += len(lines)
+    return buffer.getvalue(), row_counts, raw_bytes
+
+
+def _write_lines(entry, lines):
+    data = ''.join(lines).encode('utf-8')
+    entry.write(data)
+    return len(data)
+
+
+def iter_archived_rows(analysis, table, limit=None):
+    """Linhas (dicts) de uma tabela arquivada, na ordenação padrão do modelo"""
+    with zipfile.ZipFile(io.BytesIO(bytes(analysis.archive.data))) as bundle:
+        with bundle.open(f'{table}.ndjson') as entry:
+            for line in islice(entry, limit):
+                yield json.loads(line)
+
+
+def archived_objects(analysis, table, limit=None):
+    """Instâncias (não salvas) do modelo da tabela, para templates e paginação"""
+    model = ARCHIVE_TABLES[table][1]
+    return [model(**row) for row in iter_archived_rows(analysis, table, limit)]
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from .archive import iter_archived_rows
+
+# Fragmentos de results.html guardados com {% cache %}
+RESULTS_FRAGMENTS = ['comments', 'users', 'posts', 'clusters', 'timeline']
+RESULTS_FRAGMENT_NAME = 'analysis_results'
+
+def summary_cache_key(analysis, revision=None):
+    revision = analysis.cache_revision if revision is None else revision
+    return f'analysis_summary:{analysis.id}:{revision}'
+
+def results_cache_timeout(analysis):
+    """Somente análises concluídas são imutáveis; as demais não entram no cache (timeout 0)"""
+    if analysis.status != 'COMPLETED':
+        return 0
+    return settings.ARGUS_RESULTS_CACHE_TIMEOUT
+
+def _build_summary(analysis):
+    return {
+        'id': str(analysis.id),
+        'dataset': analysis.dataset.name,
+        'status': analysis.status,
+        'created_at': analysis.created_at.isoformat(),
+        'total_comments': analysis.total_comments,
+        'suspicious_count': analysis.suspicious_count,
+        'suspicious_percentage': analysis.suspicious_percentage(),
+        'accuracy': analysis.accuracy,
+        'archived': analysis.archived_at is not None,
+        'is_approximate': analysis.is_approximate,
+        'sample_size': analysis.sample_size,
+        'suspicious_count_interval': (
+            [analysis.suspicious_ci_low, analysis.suspicious_ci_high] if analysis.is_approximate else None
+        ),
+        'top_users': _top_rows(analysis, 'users', 'user_behaviors', [
+            'username', 'suspicious_comments_count', 'total_comments', 'suspicion_score'
+        ]),
+        'top_posts': _top_rows(analysis, 'posts', 'post_analyses', [
+            'post_id', 'username', 'suspicious_comments_count', 'total_comments', 'suspicion_ratio'
+        ]),
+    }
+
+def _top_rows(analysis, table, related_name, fields, limit=20):
+    if analysis.archived_at is not None:
+        return [
+            {field: row[field] for field in fields}
+            for row in iter_archived_rows(analysis, table, limit)
+        ]
+    return list(getattr(analysis, related_name).values(*fields)[:limit])
+
+def get_analysis_summary(analysis):
+    """Resumo da análise, lido do cache quando possível"""
+    timeout = results_cache_timeout(analysis)
+    if not timeout:
+        return _build_summary(analysis)
+
+    key = summary_cache_key(analysis)
+    summary = cache.get(key)
+    if summary is None:
+        summary = _build_summary(analysis)
+        cache.set(key, summary, timeout)
+    return summary
+
+def invalidate_analysis_cache(analysis):
+    """Descarta deste cache o resumo e os fragmentos da revisão atual e da anterior.
+
+    Só libera espaço: os outros processos já deixam de ler as entradas antigas
+    porque a revisão faz parte das chaves.
+    """
+    keys = []
+    for revision in {max(analysis.cache_revision - 1, 0), analysis.cache_revision}:
+        keys.append(summary_cache_key(analysis, revision))
+        keys.extend(
+            make_template_fragment_key(RESULTS_FRAGMENT_NAME, [analysis.id, revision, fragment])
+            for fragment in RESULTS_FRAGMENTS
+        )
+    cache.delete_many(keys)
@@ -0,0 +1,28 @@
+"""
+Limpeza dos textos internados (CommentText).
+
+Os textos são compartilhados entre análises. Quando uma análise é excluída ou
+compactada, saem só os textos que nenhum comentário suspeito referencia mais,
+e com eles a entrada no índice de busca.
+"""
+
+from ..models import CommentText, SuspiciousComment
+
+LOOKUP_BATCH = 500  # Ids por consulta IN
+
+
+def session_comment_text_ids(session):
+    """Ids distintos de CommentText referenciados pelos comentários suspeitos da sessão"""
+    return list(session.suspicious_comments.values_list('text_id', flat=True).distinct())
+
+
+def delete_orphan_comment_texts(text_ids):
+    """Apaga, entre text_ids, os CommentText que nenhum comentário suspeito referencia mais"""
+    text_ids = list(text_ids)
+    deleted = 0
+    for offset in range(0, len(text_ids), LOOKUP_BATCH):
+        batch = text_ids[offset:offset + LOOKUP_BATCH]
+        deleted += CommentText.objects.filter(id__in=batch).exclude(
+            id__in=SuspiciousComment.objects.filter(text_id__in=batch).values('text_id')
+        ).delete()[0]
+    return deleted
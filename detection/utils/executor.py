@@ -0,0 +1,48 @@
+"""
+Executor limitado para o trabalho de CPU (pandas / scikit-learn) das views assíncronas.
+
+Parsing de CSV, treino e predição rodam em no máximo ARGUS_CPU_WORKERS threads;
+requisições excedentes esperam na fila do executor sem ocupar o event loop,
+que continua atendendo dashboard, resultados e polling de status.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_cpu_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ARGUS_CPU_WORKERS, thread_name_prefix='argus-cpu'
+                )
+    return _executor
+
+
+def _run_job(func, args, kwargs):
+    # As threads do executor vivem fora do ciclo de requisição: fecham conexões vencidas elas mesmas
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """Executa func(*args, **kwargs) no executor de CPU sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    # Propaga o contexto da requisição (contagem de consultas das métricas)
+    context = contextvars.copy_context()
+    job = functools.partial(_run_job, func, args, kwargs)
+    return await loop.run_in_executor(get_cpu_executor(), context.run, job)
@@ -0,0 +1,207 @@
+"""
+Instrumentação leve: contadores, histogramas e timers por etapa, exportados em
+formato texto do Prometheus e registrados em logs estruturados (JSON).
+
+As métricas ficam em memória no processo; com vários workers do gunicorn cada
+um expõe os próprios números (os logs de etapa trazem o `pid`).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('detection.metrics')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.extend(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.label_names, key)} {value}'
+
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            return dict(series, buckets=list(series['buckets'])) if series else None
+
+    def samples(self):
+        with self._lock:
+            items = [(key, dict(series, buckets=list(series['buckets']))) for key, series in self._series.items()]
+        for key, series in items:
+            for bound, count in zip(self.buckets, series['buckets']):
+                yield f'{self.name}_bucket{_format_labels(self.label_names, key, [("le", bound)])} {count}'
+            yield f'{self.name}_bucket{_format_labels(self.label_names, key, [("le", "+Inf")])} {series["count"]}'
+            yield f'{self.name}_sum{_format_labels(self.label_names, key)} {series["sum"]}'
+            yield f'{self.name}_count{_format_labels(self.label_names, key)} {series["count"]}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        """Todas as métricas no formato de exposição texto do Prometheus (0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'argus_stage_duration_seconds', 'Duração de cada etapa do pipeline de análise', labels=('stage',)
+)
+STAGE_ROWS = REGISTRY.counter(
+    'argus_stage_rows_total', 'Linhas processadas por etapa', labels=('stage',)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'argus_stage_errors_total', 'Etapas que terminaram com exceção', labels=('stage',)
+)
+MEMORY_BUDGET = REGISTRY.gauge(
+    'argus_analysis_memory_budget_bytes', 'Orçamento de memória das análises (único para todos os processos)'
+)
+MEMORY_RESERVED = REGISTRY.gauge(
+    'argus_analysis_memory_reserved_bytes', 'Memória estimada reservada pelas análises', labels=('state',)
+)
+ANALYSIS_JOBS = REGISTRY.gauge(
+    'argus_analysis_jobs', 'Análises em execução e na fila do controle de admissão', labels=('state',)
+)
+ADMISSION_DECISIONS = REGISTRY.counter(
+    'argus_analysis_admission_total', 'Decisões do controle de admissão', labels=('outcome',)
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    'argus_request_duration_seconds', 'Latência das requisições HTTP por view', labels=('view', 'method', 'status')
+)
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    'argus_request_db_queries', 'Consultas ao banco por requisição', labels=('view',), buckets=QUERY_BUCKETS
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'argus_request_db_seconds', 'Tempo gasto em consultas ao banco por requisição', labels=('view',)
+)
+
+
+@contextmanager
+def stage_timer(stage, rows=None, **fields):
+    """Mede uma etapa: alimenta o histograma, o contador de linhas e um log estruturado"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.observe(duration, stage=stage)
+        if rows is not None:
+            STAGE_ROWS.inc(rows, stage=stage)
+        logger.info('stage', extra={
+            'stage': stage, 'duration_s': round(duration, 4), 'rows': rows, 'pid': os.getpid(), **fields
+        })
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formata registros de log como uma linha JSON, incluindo os campos de `extra`"""
+    RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record):
+        payload = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        payload.update({key: value for key, value in vars(record).items() if key not in self.RESERVED})
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
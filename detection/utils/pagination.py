@@ -0,0 +1,128 @@
+import base64
+import binascii
+import bisect
+import json
+from datetime import datetime
+from uuid import UUID
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """Página de resultados obtida por cursor"""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginação por keyset: sem OFFSET e sem COUNT(*), custo constante em qualquer página.
+
+    `ordering` deve terminar em um campo único (ex.: '-id') para que o cursor
+    identifique exatamente a última linha entregue.
+    """
+
+    def __init__(self, queryset, ordering, page_size=50):
+        self.ordering = tuple(ordering)
+        self.queryset = queryset.order_by(*self.ordering)
+        self.page_size = page_size
+
+    def get_page(self, cursor=None):
+        return self._build_page(list(self._page_queryset(cursor)))
+
+    async def aget_page(self, cursor=None):
+        """Versão assíncrona de get_page, para views async"""
+        return self._build_page([obj async for obj in self._page_queryset(cursor)])
+
+    def _page_queryset(self, cursor):
+        queryset = self.queryset
+        values = self.decode_cursor(cursor)
+        if values is not None:
+            queryset = queryset.filter(self._after(values))
+
+        # Busca uma linha extra só para saber se existe próxima página
+        return queryset[:self.page_size + 1]
+
+    def _build_page(self, rows):
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            next_cursor = self.encode_cursor(rows[-1])
+
+        return KeysetPage(rows, next_cursor)
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif isinstance(value, UUID):
+                value = str(value)
+            values.append(value)
+        raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        """Retorna os valores do cursor ou None se ausente/inválido (volta à primeira página)"""
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, binascii.Error, UnicodeError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            return None
+        return values
+
+    def _after(self, values):
+        """Monta (a < x) OR (a = x AND b < y) ... respeitando a direção de cada campo"""
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+
+class SequenceKeysetPaginator(KeysetPaginator):
+    """A mesma paginação por cursor sobre uma lista em memória (ex.: linhas de uma análise arquivada).
+
+    Os campos da ordenação precisam ser numéricos; os cursores são compatíveis
+    com os do KeysetPaginator.
+    """
+
+    def __init__(self, objects, ordering, page_size=50):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.objects = sorted(objects, key=self._key)
+        self.keys = [self._key(obj) for obj in self.objects]
+
+    def _sort_values(self, values):
+        return tuple(-value if field.startswith('-') else value for field, value in zip(self.ordering, values))
+
+    def _key(self, obj):
+        return self._sort_values([getattr(obj, field.lstrip('-')) for field in self.ordering])
+
+    def _page_queryset(self, cursor):
+        values = self.decode_cursor(cursor)
+        start = 0
+        if values is not None:
+            try:
+                start = bisect.bisect_right(self.keys, self._sort_values(values))
+            except TypeError:
+                start = 0  # Cursor com valores não numéricos: volta à primeira página
+        return self.objects[start:start + self.page_size + 1]
@@ -0,0 +1,99 @@
+"""
+Executor de etapas com dependências para o pipeline de análise.
+
+Cada etapa declara de quais outras depende e começa assim que elas terminam,
+num pool limitado de threads: etapas independentes (as agregações entre si, a
+gravação de uma tabela enquanto a próxima é calculada) se sobrepõem, e a
+latência tende à do caminho mais longo em vez da soma das etapas.
+
+Threads em vez de processos: as etapas compartilham os DataFrames sem
+serializá-los, e o que pesa (numpy/pandas, I/O do banco) solta o GIL.
+
+Cada thread usa a própria conexão do Django, fora da transação de quem
+chamou: etapas que gravam abrem o próprio transaction.atomic(). Quem já está
+numa transação deve rodar as etapas em linha (max_workers=1). Com db_lock, as
+etapas marcadas com db=True rodam uma de cada vez (o SQLite aceita um único
+escritor).
+"""
+
+import contextlib
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import connections
+
+
+class Stage:
+    """Etapa do pipeline: func recebe os resultados de `requires`, nessa ordem"""
+
+    def __init__(self, name, func, requires=(), db=False):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.db = db
+
+
+def _check_graph(stages, known):
+    names = set(known)
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining if all(dep in names for dep in stage.requires)]
+        if not ready:
+            raise ValueError(f'Etapas com dependências desconhecidas ou circulares: {[s.name for s in remaining]}')
+        names.update(stage.name for stage in ready)
+        remaining = [stage for stage in remaining if stage not in ready]
+
+
+def _run_stage(stage, args, db_lock):
+    lock = db_lock if stage.db and db_lock is not None else contextlib.nullcontext()
+    try:
+        with lock:
+            return stage.func(*args)
+    finally:
+        # Threads do pool não voltam ao ciclo de requisição: fecham a conexão que a etapa abriu
+        connections.close_all()
+
+
+def run_stages(stages, inputs=None, max_workers=1, db_lock=None):
+    """Executa as etapas respeitando as dependências e devolve {nome: resultado}.
+
+    inputs: resultados já prontos, que satisfazem dependências sem virar etapa.
+    Com max_workers <= 1 tudo roda em linha, na thread (e transação) de quem
+    chamou. Na primeira falha nenhuma etapa nova começa; as que já rodam
+    terminam e a exceção é relançada.
+    """
+    results = dict(inputs or {})
+    _check_graph(stages, results)
+
+    if max_workers <= 1:
+        pending = list(stages)
+        while pending:
+            stage = next(s for s in pending if all(dep in results for dep in s.requires))
+            results[stage.name] = stage.func(*(results[dep] for dep in stage.requires))
+            pending.remove(stage)
+        return results
+
+    pending = list(stages)
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='argus-stage') as pool:
+        while pending or running:
+            if error is None:
+                for stage in [s for s in pending if all(dep in results for dep in s.requires)]:
+                    pending.remove(stage)
+                    args = [results[dep] for dep in stage.requires]
+                    # Propaga o contexto de quem chamou (ex.: métricas da requisição)
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, _run_stage, stage, args, db_lock)] = stage
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except Exception as e:
+                    error = error or e
+    if error is not None:
+        raise error
+    return results
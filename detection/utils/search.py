@@ -0,0 +1,67 @@
+"""
+Busca textual nos comentários suspeitos de todas as análises.
+
+A busca roda sobre CommentText (os textos distintos), com o índice próprio de
+cada banco: no SQLite, uma tabela FTS5 de conteúdo externo mantida por
+triggers; no PostgreSQL, um índice GIN sobre to_tsvector. Cada termo casa por
+prefixo de palavra e todos precisam aparecer. Outros bancos, ou SQLite sem
+FTS5, caem no icontains (varredura, mas ainda só dos textos distintos).
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from ..models import CommentText, SuspiciousComment
+
+FTS_TABLE = 'detection_commenttext_fts'
+PG_SEARCH_CONFIG = 'simple'  # Sem stemming: mesmo comportamento de prefixo do FTS5
+MAX_SEARCH_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+')
+
+
+def search_terms(query):
+    """Palavras da busca em minúsculas, sem repetição (os operadores das sintaxes FTS são descartados)"""
+    terms = dict.fromkeys(term.lower() for term in _TERM_RE.findall(query or ''))
+    return list(terms)[:MAX_SEARCH_TERMS]
+
+
+def fts_available():
+    """Se a tabela FTS5 foi criada pela migração (o SQLite pode ter sido compilado sem FTS5)"""
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def matching_texts(query):
+    """CommentText cujo texto contém todos os termos da busca"""
+    terms = search_terms(query)
+    if not terms:
+        return CommentText.objects.none()
+
+    if fts_available():
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return CommentText.objects.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+    if connection.vendor == 'postgresql':
+        # A expressão precisa ser a mesma do índice GIN criado na migração
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return CommentText.objects.filter(id__in=RawSQL(
+            f"SELECT id FROM detection_commenttext "
+            f"WHERE to_tsvector('{PG_SEARCH_CONFIG}', text) @@ to_tsquery('{PG_SEARCH_CONFIG}', %s)",
+            [tsquery]
+        ))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(text__icontains=term)
+    return CommentText.objects.filter(condition)
+
+
+def search_comments(query):
+    """Comentários suspeitos das análises não compactadas cujo texto casa com a busca"""
+    return SuspiciousComment.objects.filter(
+        text__in=matching_texts(query)
+    ).select_related('text', 'session__dataset')
@@ -0,0 +1,48 @@
+"""
+Respostas em streaming que funcionam tanto sob WSGI quanto sob ASGI.
+
+Os exportadores e a API de pontuação geram o corpo com geradores síncronos
+que leem o banco em blocos. Sob WSGI o servidor consome o gerador direto.
+Sob ASGI, o Django 4.2 leria um gerador síncrono inteiro com
+sync_to_async(list) antes de enviar o primeiro byte. Por isso o gerador é
+trocado por um iterador assíncrono, que lê lotes numa thread dedicada à
+resposta. Assim o cursor do banco fica na mesma conexão do começo ao fim.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+
+# Pedaços (linhas de CSV, blocos de NDJSON, row groups) lidos por ida à thread
+STREAM_BATCH = 256
+
+
+def _next_batch(iterator):
+    return list(islice(iterator, STREAM_BATCH))
+
+
+async def _read_in_thread(iterator):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='argus-stream')
+    try:
+        while True:
+            batch = await loop.run_in_executor(executor, _next_batch, iterator)
+            if not batch:
+                break
+            data = b''.join(batch)
+            if data:
+                yield data
+    finally:
+        # A conexão que o gerador abriu pertence à thread da resposta: fecha antes de descartá-la
+        await loop.run_in_executor(executor, connections.close_all)
+        executor.shutdown(wait=False)
+
+
+def serve_streaming(request, response):
+    """Sob ASGI, troca o gerador síncrono da resposta por um assíncrono; sob WSGI, não muda nada"""
+    if isinstance(request, ASGIRequest) and getattr(response, 'streaming', False) and not response.is_async:
+        response.streaming_content = _read_in_thread(iter(response.streaming_content))
+    return response
@@ -0,0 +1,51 @@
+"""
+Empacotamento das séries temporais (arrays int32 little-endian) e dados de gráfico.
+
+Só usa a biblioteca padrão (`array`), para que a página de resultados não
+precise importar numpy/pandas.
+"""
+
+import sys
+from array import array
+from datetime import timedelta
+
+COUNT_TYPECODE = 'i'  # int32 nas plataformas suportadas
+CHART_POSTS = 5
+
+
+def pack_counts(values):
+    """Sequência de inteiros -> bytes int32 little-endian"""
+    counts = array(COUNT_TYPECODE, (int(v) for v in values))
+    if sys.byteorder != 'little':
+        counts.byteswap()
+    return counts.tobytes()
+
+
+def unpack_counts(raw):
+    counts = array(COUNT_TYPECODE)
+    counts.frombytes(bytes(raw))
+    if sys.byteorder != 'little':
+        counts.byteswap()
+    return counts.tolist()
+
+
+def timeline_chart_data(analysis, frequency='D'):
+    """Séries de uma análise no formato do gráfico de results.html (rótulos, taxas, picos e posts)"""
+    series = list(analysis.time_series.filter(frequency=frequency).order_by('post_id'))
+    overall = next((s for s in series if s.post_id is None), None)
+    if overall is None:
+        return None
+
+    label_format = '%d/%m %Hh' if frequency == 'H' else '%d/%m/%Y'
+    totals, suspicious = overall.totals(), overall.suspicious()
+    return {
+        'labels': [(overall.start + timedelta(seconds=overall.step_seconds * i)).strftime(label_format)
+                   for i in range(len(totals))],
+        'rates': [round(s / t * 100, 2) if t else 0 for s, t in zip(suspicious, totals)],
+        'suspicious': suspicious,
+        'bursts': overall.bursts,
+        'posts': [
+            {'post_id': s.post_id, 'suspicious': s.suspicious()}
+            for s in series if s.post_id is not None
+        ][:CHART_POSTS],
+    }
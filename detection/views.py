@@ -1,65 +1,80 @@
 import json
-import pandas as pd
-import tempfile
-import os
+import logging
+from functools import partial
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.http import JsonResponse, HttpResponse
 from django.views import View
 from django.contrib import messages
-from django.db import transaction
-import io
-import zipfile
-import numpy as np
-
-
-from .models import Dataset, AnalysisSession, SuspiciousComment, UserBehavior, PostAnalysis
-from .ml.data_generator import DataGenerator
-from .ml.detector import SuspiciousPatternDetector
-from .utils.exporters import export_to_csv, export_to_excel
-from django.shortcuts import render
-from django.db.models import Sum
-from django.core.paginator import Paginator
-from django.views import View
-from django.shortcuts import render
-from .models import AnalysisSession
+from django.utils.functional import SimpleLazyObject
+
+from .models import Dataset, AnalysisSession, UserRiskIndex
+from .ml.patterns import PATTERN_BITS, get_all_keywords
+from .utils.exporters import (
+    EXPORT_TABLES, export_to_csv, export_to_excel, export_to_ndjson, export_to_columnar, export_to_zip
+)
+from .utils.archive import archived_objects
+from .utils.pagination import KeysetPaginator, SequenceKeysetPaginator
+from .utils.search import search_comments, search_terms
+from .utils.cache import get_analysis_summary, results_cache_timeout
+from .utils.admission import AdmissionRejected, get_admission
+from .utils.executor import run_cpu_bound
+from .utils.streaming import serve_streaming
+from .utils.timeline import timeline_chart_data
+from .utils.metrics import REGISTRY, stage_timer
+from django.db.models import F, Sum
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
 
 
 def analyze_page(request):
     return render(request, 'detection/analyze.html')
 
 class DashboardView(View):
-    def get(self, request):
-        datasets = Dataset.objects.all().order_by('-created_at')
-        analyses = AnalysisSession.objects.all().order_by('-created_at')[:10]
-
-        total_posts_analyzed = AnalysisSession.objects.aggregate(
-        total_posts=Sum('dataset__posts_count')
-        )['total_posts'] or 0
+    async def get(self, request):
+        recent_analyses = [
+            analysis async for analysis in
+            AnalysisSession.objects.select_related('dataset').order_by('-created_at')[:10]
+        ]
+        total_datasets = await Dataset.objects.acount()
 
-        total_comments_analyzed = AnalysisSession.objects.aggregate(
-        total_comments=Sum('total_comments')
-        )['total_comments'] or 0
+        totals = await AnalysisSession.objects.aaggregate(
+            total_posts=Sum('dataset__posts_count'),
+            total_comments=Sum('total_comments')
+        )
 
         context = {
-            'datasets': datasets,
-            'recent_analyses': analyses,
-            'total_analyses': analyses.count(),
-            'total_datasets': datasets.count(),
-            'total_posts_analyzed': total_posts_analyzed,
-            'total_comments_analyzed': total_comments_analyzed
+            'recent_analyses': recent_analyses,
+            'total_analyses': len(recent_analyses),
+            'total_datasets': total_datasets,
+            'total_posts_analyzed': totals['total_posts'] or 0,
+            'total_comments_analyzed': totals['total_comments'] or 0
         }
         return render(request, 'detection/dashboard.html', context)
 
 class AllAnalysesView(View):
-    def get(self, request):
-        analyses = AnalysisSession.objects.all().order_by('-created_at')
+    PAGE_SIZE = 10  # 10 análises por página
+    TOTAL_CACHE_KEY = 'all_analyses_total'
+    TOTAL_CACHE_TIMEOUT = 60
+
+    async def get(self, request):
+        analyses = AnalysisSession.objects.select_related('dataset')
 
-        paginator = Paginator(analyses, 10)  # 10 análises por página
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        paginator = KeysetPaginator(analyses, ('-created_at', '-id'), self.PAGE_SIZE)
+        page = await paginator.aget_page(request.GET.get('cursor'))
+
+        # Total aproximado: COUNT(*) no máximo uma vez por minuto
+        total = await cache.aget(self.TOTAL_CACHE_KEY)
+        if total is None:
+            total = await AnalysisSession.objects.acount()
+            await cache.aset(self.TOTAL_CACHE_KEY, total, self.TOTAL_CACHE_TIMEOUT)
 
         context = {
-            'page_obj': page_obj
+            'page': page,
+            'approximate_total': total,
+            'is_first_page': not request.GET.get('cursor'),
         }
 
         return render(request, 'detection/all_analyses.html', context)
@@ -78,7 +93,7 @@ class GenerateAndDownloadDatasetView(View):
             comments_count = data.get('comments_count', 5000)
             suspicious_ratio = data.get('suspicious_ratio', 0.05)
             
-            print(f"🎯 Gerando dataset: {posts_count} posts, {comments_count} comentários, {suspicious_ratio*100}% suspeitos")
+            from .ml.data_generator import DataGenerator
             
             # Gerar dataset
             posts_df, comments_df, actual_suspicious = DataGenerator.generate_dataset(
@@ -110,7 +125,7 @@ class GenerateAndDownloadDatasetView(View):
             })
             
         except Exception as e:
-            print(f"❌ Erro ao gerar dataset: {str(e)}")
+            logger.exception('Erro ao gerar dataset')
             return JsonResponse({'success': False, 'error': str(e)})
 
 class DownloadPostsCSVView(View):
@@ -135,9 +150,88 @@ class DownloadCommentsCSVView(View):
         response['Content-Disposition'] = 'attachment; filename="comments.csv"'
         return response
 
+def _load_uploaded_dataset(posts_file, comments_file):
+    """Lê e valida os CSVs enviados e os serializa para a sessão (roda no executor de CPU)"""
+    from .ml.schema import COMMENT_SCHEMA, POST_SCHEMA, read_csv, to_payload
+
+    with stage_timer('upload_parse', posts_file.size + comments_file.size):
+        posts_df = read_csv(posts_file, POST_SCHEMA)
+        comments_df = read_csv(comments_file, COMMENT_SCHEMA)
+
+    # Validar colunas básicas
+    required_posts_cols = ['post_id', 'user_id', 'username', 'caption']
+    required_comments_cols = ['comment_id', 'post_id', 'user_id', 'username', 'comment_text']
+
+    if not all(col in posts_df.columns for col in required_posts_cols):
+        raise ValueError('posts.csv não tem as colunas necessárias')
+
+    if not all(col in comments_df.columns for col in required_comments_cols):
+        raise ValueError('comments.csv não tem as colunas necessárias')
+
+    # Criar registro no banco
+    dataset = Dataset.objects.create(
+        name=f"Uploaded_Dataset_{Dataset.objects.count() + 1}",
+        description=f"Dataset carregado via upload - {posts_df.shape[0]} posts, {comments_df.shape[0]} comentários",
+        posts_count=posts_df.shape[0],
+        comments_count=comments_df.shape[0]
+    )
+
+    from .services import build_preview_sample
+
+    with stage_timer('upload_serialize', comments_df.shape[0]):
+        dataset_info = {
+            'id': str(dataset.id),
+            'posts_count': posts_df.shape[0],
+            'comments_count': comments_df.shape[0],
+            'actual_suspicious': 0,  # Desconhecido em upload
+            'posts_data': to_payload(posts_df),
+            'comments_data': to_payload(comments_df),
+            'is_uploaded': True,
+            # Sorteada agora, com os dados já em memória: a prévia só lê a amostra
+            'preview_sample': build_preview_sample(posts_df, comments_df)
+        }
+
+    logger.info('Dataset salvo na sessão', extra={
+        'dataset': dataset.name, 'posts': posts_df.shape[0], 'comments': comments_df.shape[0]
+    })
+    return dataset, dataset_info
+
+
+def _run_analysis(dataset_info, job):
+    # Importa o pipeline de ML já na thread do executor, fora do event loop
+    from .services import run_analysis
+    # A partir daqui a análise começou: o controle de admissão não apaga mais a sessão
+    job['started'] = True
+    return run_analysis(dataset_info, chunk_size=job['chunk_size'], session=job['session'])
+
+
+def _admit_analysis(dataset_info):
+    """Reserva de memória da análise completa; cria a sessão (QUEUED) antes de esperar na fila"""
+    return get_admission().admit(
+        dataset_info['id'], dataset_info.get('posts_count', 0), dataset_info['comments_count']
+    )
+
+
+def _run_preview(dataset_info):
+    from .services import run_preview
+    return run_preview(dataset_info)
+
+
+def _append_uploaded_comments(analysis_id, comments_file, posts_file):
+    """Lê os CSVs do delta e os acrescenta à análise (roda no executor de CPU)"""
+    from .ml.schema import COMMENT_SCHEMA, POST_SCHEMA, read_csv
+    from .services import append_comments
+
+    analysis = AnalysisSession.objects.get(id=analysis_id)
+    with stage_timer('upload_parse', comments_file.size + (posts_file.size if posts_file else 0)):
+        comments_df = read_csv(comments_file, COMMENT_SCHEMA)
+        posts_df = read_csv(posts_file, POST_SCHEMA) if posts_file else None
+    return append_comments(analysis, comments_df, posts_df)
+
+
 class UploadDatasetView(View):
     """Faz upload de dataset CSV"""
-    def post(self, request):
+    async def post(self, request):
         try:
             posts_file = request.FILES.get('posts_file')
             comments_file = request.FILES.get('comments_file')
@@ -145,181 +239,41 @@ class UploadDatasetView(View):
             if not posts_file or not comments_file:
                 return JsonResponse({'success': False, 'error': 'Ambos os arquivos são necessários'})
             
-            # Ler arquivos CSV
-            posts_df = pd.read_csv(posts_file)
-            comments_df = pd.read_csv(comments_file)
-            
-            print(f"📁 Arquivos carregados: Posts {posts_df.shape}, Comentários {comments_df.shape}")
-            
-            # Validar colunas básicas
-            required_posts_cols = ['post_id', 'user_id', 'username', 'caption']
-            required_comments_cols = ['comment_id', 'post_id', 'user_id', 'username', 'comment_text']
+            dataset, dataset_info = await run_cpu_bound(_load_uploaded_dataset, posts_file, comments_file)
             
-            if not all(col in posts_df.columns for col in required_posts_cols):
-                return JsonResponse({'success': False, 'error': 'posts.csv não tem as colunas necessárias'})
-            
-            if not all(col in comments_df.columns for col in required_comments_cols):
-                return JsonResponse({'success': False, 'error': 'comments.csv não tem as colunas necessárias'})
-            
-            # Criar registro no banco
-            dataset = Dataset.objects.create(
-                name=f"Uploaded_Dataset_{Dataset.objects.count() + 1}",
-                description=f"Dataset carregado via upload - {posts_df.shape[0]} posts, {comments_df.shape[0]} comentários",
-                posts_count=posts_df.shape[0],
-                comments_count=comments_df.shape[0]
-            )
-            
-            # Salvar dados na sessão
-            request.session['current_dataset'] = {
-                'id': str(dataset.id),
-                'posts_count': posts_df.shape[0],
-                'comments_count': comments_df.shape[0],
-                'actual_suspicious': 0,  # Desconhecido em upload
-                'posts_data': posts_df.to_json(orient='records'),
-                'comments_data': comments_df.to_json(orient='records'),
-                'is_uploaded': True
-            }
-            
-            print(f"✅ Dataset salvo na sessão: {dataset.name}")
+            # Salvar dados na sessão (o backend de sessão consulta o banco: fora do event loop)
+            await sync_to_async(request.session.__setitem__)('current_dataset', dataset_info)
             
             return JsonResponse({
                 'success': True,
                 'dataset': {
                     'id': str(dataset.id),
                     'name': dataset.name,
-                    'posts_count': posts_df.shape[0],
-                    'comments_count': comments_df.shape[0],
+                    'posts_count': dataset.posts_count,
+                    'comments_count': dataset.comments_count,
                     'actual_suspicious': 'Desconhecido (será detectado)'
                 }
             })
             
         except Exception as e:
-            print(f"❌ Erro no upload: {str(e)}")
+            logger.exception('Erro no upload')
             return JsonResponse({'success': False, 'error': str(e)})
 
 class AnalyzeDatasetView(View):
-    def post(self, request):
+    async def post(self, request):
         try:
-            dataset_info = request.session.get('current_dataset')
+            dataset_info = await sync_to_async(request.session.get)('current_dataset')
             if not dataset_info:
                 return JsonResponse({'success': False, 'error': 'Nenhum dataset carregado'})
             
-            print("📊 Iniciando análise do dataset...")
-            
-            # Carregar dados da sessão (JSON em memória)
-            posts_df = pd.read_json(io.StringIO(dataset_info['posts_data']))
-            comments_df = pd.read_json(io.StringIO(dataset_info['comments_data']))
-            
-            print(f"📁 Dados carregados: {len(posts_df)} posts, {len(comments_df)} comentários")
-            
-            # Criar sessão de análise
-            dataset = Dataset.objects.get(id=dataset_info['id'])
-            session = AnalysisSession.objects.create(
-                dataset=dataset,
-                total_comments=dataset_info['comments_count'],
-                status='RUNNING'
-            )
-            
-            # Treinar e executar detector
-            detector = SuspiciousPatternDetector()
-            
-            # Criar labels baseadas nos dados reais (se disponível)
-            if 'is_suspicious_actual' in comments_df.columns:
-                labels = comments_df['is_suspicious_actual'].astype(int).values
-            else:
-                # Para datasets uploadados, criar labels baseadas nos padrões
-                labels = []
-                for _, row in comments_df.iterrows():
-                    comment = str(row['comment_text']).lower()
-                    suspicious = any(pattern in comment for pattern in [
-                        '👧💕', '💜💜', '👧🏻💖', '💕👧', '💖💖',
-                        '🌀👦', '👦🌀', '💙🌀', '🌀💙', '👦💙',
-                        'menina linda', 'garotinha fofa', 'menino bonito'
-                    ])
-                    labels.append(1 if suspicious else 0)
-                labels = np.array(labels)
-            
-            print("🤖 Treinando modelo...")
-            # Treinar modelo
-            accuracy = detector.train(comments_df, labels)
-            
-            print("🔍 Fazendo predições...")
-            # Fazer predições
-            predictions, probabilities, detected_patterns = detector.predict(comments_df)
-            
-            print("👥 Analisando comportamento de usuários...")
-            # Analisar comportamento de usuários - CORREÇÃO AQUI
-            user_behaviors_data = detector.analyze_user_behavior(comments_df, predictions, detected_patterns)
-            
-            print("📝 Analisando posts mais visados...")
-            # Analisar posts mais visados - CORREÇÃO AQUI
-            post_analyses_data = detector.analyze_posts_targeted(posts_df, comments_df, predictions)
-            
-            # Salvar resultados
-            suspicious_count = int(predictions.sum())
-            session.suspicious_count = suspicious_count
-            session.accuracy = accuracy
-            session.status = 'COMPLETED'
-            session.save()
-            
-            print("💾 Salvando comentários suspeitos...")
-            # Salvar comentários suspeitos
-            suspicious_comments = []
-            for i, (pred, prob) in enumerate(zip(predictions, probabilities)):
-                if pred == 1:
-                    row = comments_df.iloc[i]
-                    suspicious_comments.append(SuspiciousComment(
-                        session=session,
-                        comment_id=row['comment_id'],
-                        username=row['username'],
-                        comment_text=row['comment_text'],
-                        probability=prob,
-                        detected_patterns=detected_patterns[i]
-                    ))
-            
-            if suspicious_comments:
-                SuspiciousComment.objects.bulk_create(suspicious_comments)
-            
-            print("💾 Salvando comportamentos de usuários...")
-            # Salvar comportamentos de usuários - CORREÇÃO: usar user_behaviors_data
-            user_behavior_objs = []
-            for user_behavior in user_behaviors_data[:100]:  # Top 100 usuários
-                user_behavior_objs.append(UserBehavior(
-                    analysis_session=session,
-                    username=user_behavior['username'],
-                    user_id=user_behavior['user_id'],
-                    suspicious_comments_count=user_behavior['suspicious_count'],
-                    total_comments=user_behavior['total_count'],
-                    suspicion_score=user_behavior['suspicion_score'],
-                    detected_patterns=user_behavior['patterns']
-                ))
-            
-            if user_behavior_objs:
-                UserBehavior.objects.bulk_create(user_behavior_objs)
-            
-            print("💾 Salvando análises de posts...")
-            # Salvar análises de posts - CORREÇÃO: usar post_analyses_data
-            post_analysis_objs = []
-            for post_analysis in post_analyses_data[:100]:  # Top 100 posts
-                post_analysis_objs.append(PostAnalysis(
-                    analysis_session=session,
-                    post_id=post_analysis['post_id'],
-                    caption=post_analysis['caption'],
-                    username=post_analysis['username'],
-                    suspicious_comments_count=post_analysis['suspicious_count'],
-                    total_comments=post_analysis['total_count'],
-                    suspicion_ratio=post_analysis['suspicion_ratio']
-                ))
-            
-            if post_analysis_objs:
-                PostAnalysis.objects.bulk_create(post_analysis_objs)
+            # Espera memória no event loop; treino, predição e gravação no executor limitado
+            async with _admit_analysis(dataset_info) as job:
+                session, top_users_count, top_posts_count = await run_cpu_bound(_run_analysis, dataset_info, job)
             
             # Limpar session
-            if 'current_dataset' in request.session:
-                del request.session['current_dataset']
-            
-            print(f"✅ Análise concluída: {suspicious_count} suspeitos detectados")
+            await sync_to_async(request.session.pop)('current_dataset', None)
             
+            suspicious_count = session.suspicious_count
             return JsonResponse({
                 'success': True,
                 'analysis': {
@@ -330,58 +284,364 @@ class AnalyzeDatasetView(View):
                     'accuracy': session.accuracy,
                     'actual_suspicious': dataset_info.get('actual_suspicious', 'Desconhecido'),
                     'detection_accuracy': (suspicious_count / dataset_info.get('actual_suspicious', 1) * 100) if dataset_info.get('actual_suspicious', 0) > 0 else 0,
-                    'top_users_count': len(user_behaviors_data),
-                    'top_posts_count': len(post_analyses_data)
+                    'top_users_count': top_users_count,
+                    'top_posts_count': top_posts_count,
+                    'chunked': bool(job['chunk_size'])
                 }
             })
             
+        except AdmissionRejected as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=503)
+        except Exception as e:
+            logger.exception('Erro na análise')
+            return JsonResponse({'success': False, 'error': str(e)})
+
+class PreviewDatasetView(View):
+    """Prévia aproximada do dataset carregado (amostra estratificada); mantém o dataset para a análise completa"""
+    async def post(self, request):
+        try:
+            dataset_info = await sync_to_async(request.session.get)('current_dataset')
+            if not dataset_info:
+                return JsonResponse({'success': False, 'error': 'Nenhum dataset carregado'})
+
+            session = await run_cpu_bound(_run_preview, dataset_info)
+            interval = session.suspicious_percentage_interval()
+            return JsonResponse({
+                'success': True,
+                'analysis': {
+                    'id': str(session.id),
+                    'is_approximate': True,
+                    'sample_size': session.sample_size,
+                    'total_comments': session.total_comments,
+                    'suspicious_count': session.suspicious_count,
+                    'suspicious_percentage': session.suspicious_percentage(),
+                    'suspicious_percentage_interval': interval,
+                }
+            })
+
+        except Exception as e:
+            logger.exception('Erro na prévia')
+            return JsonResponse({'success': False, 'error': str(e)})
+
+class RunFullAnalysisView(View):
+    """Executa a análise completa do dataset de uma prévia, se ele ainda estiver na sessão"""
+    async def post(self, request, analysis_id):
+        try:
+            preview = await AnalysisSession.objects.aget(id=analysis_id)
+        except AnalysisSession.DoesNotExist:
+            return JsonResponse({'success': False, 'error': 'Análise não encontrada'}, status=404)
+        if not preview.is_approximate:
+            return JsonResponse({'success': False, 'error': 'A análise já é completa'}, status=400)
+
+        dataset_info = await sync_to_async(request.session.get)('current_dataset')
+        if not dataset_info or dataset_info['id'] != str(preview.dataset_id):
+            return JsonResponse({
+                'success': False,
+                'error': 'Os dados deste dataset não estão mais na sessão; faça o upload novamente'
+            }, status=400)
+
+        try:
+            async with _admit_analysis(dataset_info) as job:
+                session, _, _ = await run_cpu_bound(_run_analysis, dataset_info, job)
+        except AdmissionRejected as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=503)
         except Exception as e:
-            print(f"❌ Erro na análise: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            logger.exception('Erro na análise')
             return JsonResponse({'success': False, 'error': str(e)})
 
+        await sync_to_async(request.session.pop)('current_dataset', None)
+        return JsonResponse({
+            'success': True,
+            'analysis': {
+                'id': str(session.id),
+                'total_comments': session.total_comments,
+                'suspicious_count': session.suspicious_count,
+                'suspicious_percentage': session.suspicious_percentage(),
+            }
+        })
+
+class AppendCommentsView(View):
+    """Modo incremental: acrescenta comentários (e posts novos) a uma análise concluída"""
+    async def post(self, request, analysis_id):
+        comments_file = request.FILES.get('comments_file')
+        if not comments_file:
+            return JsonResponse({'success': False, 'error': 'Arquivo de comentários é necessário'}, status=400)
+
+        try:
+            result = await run_cpu_bound(
+                _append_uploaded_comments, analysis_id, comments_file, request.FILES.get('posts_file')
+            )
+        except AnalysisSession.DoesNotExist:
+            return JsonResponse({'success': False, 'error': 'Análise não encontrada'}, status=404)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        except Exception as e:
+            logger.exception('Erro ao acrescentar comentários')
+            return JsonResponse({'success': False, 'error': str(e)})
+
+        return JsonResponse({'success': True, 'appended': result})
+
 class AnalysisResultsView(View):
-    def get(self, request, analysis_id):
+    async def get(self, request, analysis_id):
         try:
-            analysis = AnalysisSession.objects.get(id=analysis_id)
-            suspicious_comments = analysis.suspicious_comments.all()[:50]
-            top_users = analysis.user_behaviors.all()[:20]
-            top_posts = analysis.post_analyses.all()[:20]
+            analysis = await AnalysisSession.objects.select_related('dataset').aget(id=analysis_id)
+            if analysis.archived_at is not None:
+                # Análise compactada: lê só o começo de cada tabela do arquivo, e só se o fragmento não estiver em cache
+                suspicious_comments = SimpleLazyObject(partial(archived_objects, analysis, 'comments', 50))
+                top_users = SimpleLazyObject(partial(archived_objects, analysis, 'users', 20))
+                top_posts = SimpleLazyObject(partial(archived_objects, analysis, 'posts', 20))
+            else:
+                # Querysets preguiçosos: não são avaliados se o fragmento estiver em cache
+                suspicious_comments = analysis.suspicious_comments.select_related('text')[:50]
+                top_users = analysis.user_behaviors.all()[:20]
+                top_posts = analysis.post_analyses.all()[:20]
+            clusters = analysis.clusters.all()[:10]
+            # Chamável: o template só consulta as séries se o fragmento não estiver em cache
+            timeline = partial(timeline_chart_data, analysis)
             
             context = {
                 'analysis': analysis,
                 'suspicious_comments': suspicious_comments,
                 'top_users': top_users,
                 'top_posts': top_posts,
+                'clusters': clusters,
+                'timeline': timeline,
                 'detection_rate': analysis.suspicious_percentage(),
                 'accuracy_percentage': analysis.accuracy * 100,
+                'results_cache_timeout': results_cache_timeout(analysis),
             }
-            return render(request, 'detection/results.html', context)
+            # Renderiza em thread: os querysets só são avaliados quando o fragmento não está em cache
+            return await sync_to_async(render)(request, 'detection/results.html', context)
         
         except AnalysisSession.DoesNotExist:
             messages.error(request, 'Análise não encontrada.')
             return redirect('detection:dashboard')
 
-class ExportDataView(View):
+class AnalysisStatusView(View):
+    """Status da análise em JSON, para polling (uma consulta, sem joins)"""
+    async def get(self, request, analysis_id):
+        try:
+            analysis = await AnalysisSession.objects.values(
+                'status', 'total_comments', 'suspicious_count', 'dataset_id'
+            ).aget(id=analysis_id)
+        except AnalysisSession.DoesNotExist:
+            return JsonResponse({'error': 'Análise não encontrada'}, status=404)
+        dataset_id = analysis.pop('dataset_id')
+        if analysis['status'] in ('PENDING', 'QUEUED', 'RUNNING'):
+            # Reserva de memória da análise (posição na fila enquanto QUEUED), vista por todos os workers
+            analysis['memory'] = await sync_to_async(get_admission().snapshot)(dataset_id, analysis_id)
+        return JsonResponse({'id': str(analysis_id), **analysis})
+
+class AdmissionStatusView(View):
+    """Orçamento de memória, análises em execução e fila (opcionalmente de um dataset), para acompanhamento"""
+    def get(self, request):
+        return JsonResponse(get_admission().snapshot(request.GET.get('dataset') or None))
+
+class AnalysisSummaryView(View):
+    """Resumo da análise em JSON (em cache para análises concluídas)"""
     def get(self, request, analysis_id):
+        try:
+            analysis = AnalysisSession.objects.select_related('dataset').get(id=analysis_id)
+        except AnalysisSession.DoesNotExist:
+            return JsonResponse({'error': 'Análise não encontrada'}, status=404)
+        return JsonResponse(get_analysis_summary(analysis))
+
+def _parse_float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+def _matches_filters(obj, kind, score_field, filters):
+    """Os mesmos filtros da navegação, aplicados a uma linha de análise arquivada"""
+    score = getattr(obj, score_field)
+    if filters['min_score'] is not None and score < filters['min_score']:
+        return False
+    if filters['max_score'] is not None and score > filters['max_score']:
+        return False
+    if filters['username'] and obj.username != filters['username']:
+        return False
+    if filters['pattern'] and filters['pattern'] not in obj.detected_patterns:
+        return False
+    return True
+
+class AnalysisResultsBrowseView(View):
+    """Navegação paginada (keyset) e filtrável dos resultados de uma análise"""
+    BROWSERS = {
+        'comments': {
+            'related_name': 'suspicious_comments',
+            'ordering': ('-probability', '-id'),
+            'page_size': 50,
+            'title': 'Comentários Suspeitos',
+        },
+        'users': {
+            'related_name': 'user_behaviors',
+            'ordering': ('-suspicion_score', '-id'),
+            'page_size': 50,
+            'title': 'Perfis Suspeitos',
+        },
+        'posts': {
+            'related_name': 'post_analyses',
+            'ordering': ('-suspicion_ratio', '-id'),
+            'page_size': 50,
+            'title': 'Posts Visados',
+        },
+    }
+    # Tabelas com detected_patterns (posts não guardam padrões)
+    PATTERN_KINDS = ('comments', 'users')
+    # Campo de pontuação usado pelos filtros de faixa em cada tabela
+    SCORE_FIELDS = {
+        'comments': 'probability',
+        'users': 'suspicion_score',
+        'posts': 'suspicion_ratio',
+    }
+
+    def get(self, request, analysis_id, kind):
+        browser = self.BROWSERS.get(kind)
+        if browser is None:
+            messages.error(request, 'Tipo de resultado inválido.')
+            return redirect('detection:analysis_results', analysis_id=analysis_id)
+
         try:
             analysis = AnalysisSession.objects.get(id=analysis_id)
+        except AnalysisSession.DoesNotExist:
+            messages.error(request, 'Análise não encontrada.')
+            return redirect('detection:dashboard')
+
+        filters = {
+            'min_score': _parse_float(request.GET.get('min_score')),
+            'max_score': _parse_float(request.GET.get('max_score')),
+            'username': request.GET.get('username', '').strip(),
+            'pattern': request.GET.get('pattern', '').strip() if kind in self.PATTERN_KINDS else '',
+        }
+
+        score_field = self.SCORE_FIELDS[kind]
+        if analysis.archived_at is not None:
+            # Análise compactada: filtra e pagina em memória as linhas do arquivo
+            rows = [
+                obj for obj in archived_objects(analysis, kind)
+                if _matches_filters(obj, kind, score_field, filters)
+            ]
+            paginator = SequenceKeysetPaginator(rows, browser['ordering'], browser['page_size'])
+        else:
+            queryset = getattr(analysis, browser['related_name']).all()
+            if kind == 'comments':
+                queryset = queryset.select_related('text')
+            if filters['min_score'] is not None:
+                queryset = queryset.filter(**{f'{score_field}__gte': filters['min_score']})
+            if filters['max_score'] is not None:
+                queryset = queryset.filter(**{f'{score_field}__lte': filters['max_score']})
+            if filters['username']:
+                # Igualdade exata para aproveitar o índice (sessão, username)
+                queryset = queryset.filter(username=filters['username'])
+            if filters['pattern']:
+                # Padrões gravados pelo detector, pelo bit da máscara (padrão desconhecido: nada)
+                bit = PATTERN_BITS.get(filters['pattern'], 0)
+                queryset = queryset.annotate(
+                    pattern_hit=F('pattern_mask').bitand(bit)
+                ).filter(pattern_hit__gt=0)
+            paginator = KeysetPaginator(queryset, browser['ordering'], browser['page_size'])
+        page = paginator.get_page(request.GET.get('cursor'))
+
+        next_query = None
+        if page.has_next:
+            params = request.GET.copy()
+            params['cursor'] = page.next_cursor
+            next_query = params.urlencode()
+        first_params = request.GET.copy()
+        first_params.pop('cursor', None)
+
+        context = {
+            'analysis': analysis,
+            'kind': kind,
+            'title': browser['title'],
+            'page': page,
+            'filters': filters,
+            'next_query': next_query,
+            'first_query': first_params.urlencode(),
+            'is_first_page': not request.GET.get('cursor'),
+            'pattern_choices': get_all_keywords(),
+        }
+        return render(request, 'detection/browse_results.html', context)
+
+class UserRiskLookupView(View):
+    """Consulta de moderação: histórico de risco de uma conta em todas as análises"""
+    async def get(self, request):
+        username = request.GET.get('username', '').strip()
+        entry = None
+        if username:
+            entry = await UserRiskIndex.objects.filter(username=username).afirst()
+
+        context = {
+            'username': username,
+            'entry': entry,
+        }
+        return render(request, 'detection/user_risk.html', context)
+
+class CommentSearchView(View):
+    """Busca indexada no texto dos comentários suspeitos das análises não compactadas (paginação por cursor)"""
+    PAGE_SIZE = 50
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        page = None
+        next_query = None
+        if search_terms(query):
+            paginator = KeysetPaginator(search_comments(query), ('-id',), self.PAGE_SIZE)
+            page = paginator.get_page(request.GET.get('cursor'))
+            if page.has_next:
+                params = request.GET.copy()
+                params['cursor'] = page.next_cursor
+                next_query = params.urlencode()
+        first_params = request.GET.copy()
+        first_params.pop('cursor', None)
+
+        context = {
+            'query': query,
+            'page': page,
+            # Análises compactadas não têm mais linhas de SuspiciousComment: ficam fora da busca
+            'archived_count': AnalysisSession.objects.filter(archived_at__isnull=False).count() if page is not None else 0,
+            'next_query': next_query,
+            'first_query': first_params.urlencode(),
+            'is_first_page': not request.GET.get('cursor'),
+        }
+        return render(request, 'detection/comment_search.html', context)
+
+class ExportDataView(View):
+    def get(self, request, analysis_id):
+        try:
+            analysis = AnalysisSession.objects.select_related('dataset').get(id=analysis_id)
             suspicious_comments = analysis.suspicious_comments.all()
             
             format_type = request.GET.get('format', 'csv')
             
+            table = request.GET.get('table', 'comments')
+            columns = request.GET.get('columns')
+            
+            if table not in EXPORT_TABLES:
+                return JsonResponse({'error': 'Tabela não suportada'}, status=400)
+            
             if format_type == 'csv':
-                response = export_to_csv(suspicious_comments, analysis)
+                response = export_to_csv(suspicious_comments, analysis, table, columns)
             elif format_type == 'excel':
-                response = export_to_excel(suspicious_comments, analysis)
+                response = export_to_excel(analysis)
+            elif format_type == 'ndjson':
+                response = export_to_ndjson(analysis, table, columns)
+            elif format_type in ('parquet', 'arrow'):
+                response = export_to_columnar(analysis, table, columns, format_type)
+            elif format_type == 'zip':
+                response = export_to_zip(analysis)
             else:
                 return JsonResponse({'error': 'Formato não suportado'})
             
-            return response
+            return serve_streaming(request, response)
             
         except AnalysisSession.DoesNotExist:
             return JsonResponse({'error': 'Análise não encontrada'})
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except ImportError:
+            return JsonResponse({'error': 'Exportação colunar requer o pacote pyarrow'})
 
 # View para debug
 class DebugSessionView(View):
@@ -390,4 +650,11 @@ class DebugSessionView(View):
             'current_dataset': bool(request.session.get('current_dataset')),
             'generated_dataset': bool(request.session.get('generated_dataset')),
             'session_keys': list(request.session.keys())
-        })
\ No newline at end of file
+        })
+
+class MetricsView(View):
+    """Métricas do processo no formato texto do Prometheus (somente IPs permitidos)"""
+    def get(self, request):
+        if request.META.get('REMOTE_ADDR') not in settings.ARGUS_METRICS_ALLOWED_IPS:
+            return HttpResponse(status=403)
+        return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')